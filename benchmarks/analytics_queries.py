@@ -0,0 +1,138 @@
+"""Query count and latency of the analytics report as order volume grows.
+
+Run from the repository root:
+
+    python -m benchmarks.analytics_queries --volumes 100 1000 10000 100000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+WORKDIR = tempfile.mkdtemp(prefix="storebot-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(WORKDIR, 'bench.db')}"
+
+from sqlalchemy import event, insert, delete
+
+from database import engine, SessionLocal, create_tables, User, Product, Order, OrderItem, DailySales
+from services.analytics import build_report
+from services.rollup import rebuild_daily_sales
+
+ITEMS_PER_ORDER = 3
+PRODUCTS = 200
+
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+    
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+async def seed(orders_count: int, seed_value: int = 42) -> int:
+    rnd = random.Random(seed_value)
+    now = datetime.utcnow()
+    
+    async with engine.begin() as conn:
+        for table in (DailySales, OrderItem, Order, Product, User):
+            await conn.execute(delete(table))
+        
+        user_id = (await conn.execute(
+            insert(User).values(telegram_id=1, email="bench@example.com", store_name="Bench")
+        )).inserted_primary_key[0]
+        
+        await conn.execute(insert(Product), [
+            {
+                "id": product_id,
+                "name": f"Product {product_id}",
+                "quantity": rnd.randint(0, 500),
+                "purchase_price": round(rnd.uniform(1, 50), 2),
+                "sale_price": round(rnd.uniform(50, 100), 2),
+                "user_id": user_id
+            }
+            for product_id in range(1, PRODUCTS + 1)
+        ])
+        
+        orders, items = [], []
+        for order_id in range(1, orders_count + 1):
+            orders.append({
+                "id": order_id,
+                "order_number": f"B{order_id:09d}",
+                "total_amount": round(rnd.uniform(10, 500), 2),
+                "total_profit": round(rnd.uniform(1, 100), 2),
+                "user_id": user_id,
+                "created_at": now - timedelta(minutes=rnd.randint(0, 60 * 24 * 365 * 2))
+            })
+            for _ in range(ITEMS_PER_ORDER):
+                items.append({
+                    "order_id": order_id,
+                    "product_id": rnd.randint(1, PRODUCTS),
+                    "quantity": rnd.randint(1, 5),
+                    "price": round(rnd.uniform(50, 100), 2),
+                    "unit_cost": round(rnd.uniform(1, 50), 2)
+                })
+            
+            if len(items) >= 30000:
+                await conn.execute(insert(Order), orders)
+                await conn.execute(insert(OrderItem), items)
+                orders, items = [], []
+        
+        if orders:
+            await conn.execute(insert(Order), orders)
+            await conn.execute(insert(OrderItem), items)
+    
+    async with SessionLocal() as db:
+        await rebuild_daily_sales(db)
+        await db.commit()
+    
+    return user_id
+
+async def measure(user_id: int, repeats: int) -> dict:
+    counter = StatementCounter()
+    event.listen(engine.sync_engine, "before_cursor_execute", counter)
+    
+    try:
+        timings = []
+        for _ in range(repeats):
+            counter.count = 0
+            async with SessionLocal() as db:
+                started = time.perf_counter()
+                await build_report(db, user_id, None, datetime.utcnow())
+                timings.append(time.perf_counter() - started)
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", counter)
+    
+    return {"queries": counter.count, "best_ms": min(timings) * 1000}
+
+async def run(volumes: list, repeats: int) -> int:
+    await create_tables()
+    
+    results = []
+    print(f"{'orders':>10} {'queries':>8} {'best ms':>10}")
+    for volume in volumes:
+        user_id = await seed(volume)
+        result = await measure(user_id, repeats)
+        results.append(result)
+        print(f"{volume:>10} {result['queries']:>8} {result['best_ms']:>10.2f}")
+    
+    await engine.dispose()
+    
+    if len({result["queries"] for result in results}) != 1:
+        print("FAIL: query count depends on order volume")
+        return 1
+    
+    print("OK: query count is constant")
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--volumes", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.volumes, args.repeats)))
+
+if __name__ == "__main__":
+    main()
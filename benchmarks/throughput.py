@@ -0,0 +1,391 @@
+"""Updates per second and latency of the whole bot, driven through the dispatcher.
+
+Builds the dispatcher exactly as main.py does (all routers and middlewares)
+on a seeded SQLite database, with a Bot whose session records API calls
+instead of sending them, and replays scripted user flows from concurrent
+virtual users. The outbound rate limiter is left out: it would measure
+Telegram's limits, not the bot. Run from the repository root:
+
+    python -m benchmarks.throughput --concurrency 1 10 50 --rounds 5
+    python -m benchmarks.throughput --flows analytics products --compare throughput-1a2b3c4d.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+WORKDIR = tempfile.mkdtemp(prefix="storebot-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(WORKDIR, 'bench.db')}"
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import TelegramMethod
+from aiogram.types import CallbackQuery, Chat, InlineKeyboardMarkup, Message, Update, User as TelegramUser
+from sqlalchemy import event, insert
+
+from database import engine, SessionLocal, Category, Order, OrderItem, Product, User
+from main import create_dispatcher, prepare_database
+from services.rollup import rebuild_daily_sales
+
+# Seeded stores get telegram ids from here; registrations from REGISTRATION_IDS
+STORE_IDS = 1_000_000
+REGISTRATION_IDS = 2_000_000
+BOT_ID = 42
+CATEGORIES = 5
+ITEMS_PER_ORDER = 3
+
+_update_ids = itertools.count(1)
+_message_ids = itertools.count(1)
+_registrations = itertools.count(REGISTRATION_IDS)
+
+class FakeSession(BaseSession):
+    """Records API calls and answers them without the network.
+
+    Methods returning a Message get one in the target chat; the last inline
+    keyboard sent to each chat is kept so flows can press its buttons.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+        self.keyboards: Dict[int, InlineKeyboardMarkup] = {}
+
+    async def make_request(self, bot: Bot, method: TelegramMethod, timeout: Optional[int] = None):
+        self.calls += 1
+        chat_id = getattr(method, "chat_id", None)
+        markup = getattr(method, "reply_markup", None)
+        if chat_id is not None and isinstance(markup, InlineKeyboardMarkup):
+            self.keyboards[chat_id] = markup
+
+        returning = method.__returning__
+        if returning is Message or Message in getattr(returning, "__args__", ()):
+            return Message(
+                message_id=next(_message_ids),
+                date=datetime.now(),
+                chat=Chat(id=chat_id or 0, type="private"),
+                text=getattr(method, "text", None)
+            )
+        return True
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        yield b""
+
+    async def close(self):
+        pass
+
+class FlowBroken(Exception):
+    """A flow expected a button the bot did not send."""
+
+def _user(telegram_id: int) -> TelegramUser:
+    return TelegramUser(id=telegram_id, is_bot=False, first_name="Bench")
+
+def text(value: str) -> Callable[[int, FakeSession], Update]:
+    def build(telegram_id: int, session: FakeSession) -> Update:
+        return Update(update_id=next(_update_ids), message=Message(
+            message_id=next(_message_ids),
+            date=datetime.now(),
+            chat=Chat(id=telegram_id, type="private"),
+            from_user=_user(telegram_id),
+            text=value
+        ))
+    return build
+
+def press(prefix: str) -> Callable[[int, FakeSession], Update]:
+    """The first button of the chat's last inline keyboard whose callback data starts with `prefix`."""
+    def build(telegram_id: int, session: FakeSession) -> Update:
+        markup = session.keyboards.get(telegram_id)
+        buttons = [button for row in (markup.inline_keyboard if markup else []) for button in row]
+        data = next((button.callback_data for button in buttons if (button.callback_data or "").startswith(prefix)), None)
+        if data is None:
+            raise FlowBroken(f"no '{prefix}' button in chat {telegram_id}")
+        return Update(update_id=next(_update_ids), callback_query=CallbackQuery(
+            id=str(next(_message_ids)),
+            chat_instance=str(telegram_id),
+            from_user=_user(telegram_id),
+            message=Message(
+                message_id=next(_message_ids),
+                date=datetime.now(),
+                chat=Chat(id=telegram_id, type="private"),
+                from_user=TelegramUser(id=BOT_ID, is_bot=True, first_name="Bot"),
+                text="..."
+            ),
+            data=data
+        ))
+    return build
+
+def registration(telegram_id: int) -> list:
+    # A new user each time: the flow ends once the store exists
+    new_id = next(_registrations)
+    return [(new_id, step) for step in (
+        text("/start"), text("🇬🇧 English"), text(f"bench{new_id}@example.com"), text(f"Bench store {new_id}")
+    )]
+
+def add_product(telegram_id: int) -> list:
+    return [(telegram_id, step) for step in (
+        text("➕ Add product"), text(f"Bench product {next(_message_ids)}"), text("100"), text("10"), text("15"), press("c:")
+    )]
+
+def create_order(telegram_id: int) -> list:
+    return [(telegram_id, step) for step in (
+        text("🛒 Create order"), text("1,2,3"), text("1,1,1"), press("y:1")
+    )]
+
+def analytics(telegram_id: int) -> list:
+    steps = []
+    for period in ("day", "week", "month", "year", "all"):
+        steps += [text("📊 Analytics"), press(f"ap:{period}")]
+    return [(telegram_id, step) for step in steps]
+
+def products(telegram_id: int) -> list:
+    return [(telegram_id, step) for step in (text("📦 Products"), press("pg:"), press("pg:"))]
+
+FLOWS = {
+    "registration": registration,
+    "add_product": add_product,
+    "create_order": create_order,
+    "analytics": analytics,
+    "products": products
+}
+
+# Statements run while feeding the current update
+_statements: ContextVar[Optional[List[int]]] = ContextVar("bench_statements", default=None)
+
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+        counter = _statements.get()
+        if counter is not None:
+            counter[0] += 1
+
+STATEMENTS = StatementCounter()
+
+async def seed(stores: int, products_per_store: int, orders_per_store: int, seed_value: int = 42) -> List[int]:
+    """Registered stores with categories, products and a year of orders; returns their telegram ids."""
+    rnd = random.Random(seed_value)
+    now = datetime.utcnow()
+    telegram_ids = [STORE_IDS + index for index in range(stores)]
+
+    async with engine.begin() as conn:
+        user_ids = (await conn.execute(insert(User).returning(User.id), [
+            {"telegram_id": telegram_id, "email": f"store{telegram_id}@example.com",
+             "language": "en", "store_name": f"Store {telegram_id}"}
+            for telegram_id in telegram_ids
+        ])).scalars().all()
+
+        for user_id in user_ids:
+            category_ids = (await conn.execute(insert(Category).returning(Category.id), [
+                {"name": f"Category {index}", "user_id": user_id} for index in range(CATEGORIES)
+            ])).scalars().all()
+
+            product_rows = []
+            for index in range(products_per_store):
+                purchase_price = round(rnd.uniform(1, 50), 2)
+                sale_price = round(purchase_price * rnd.uniform(1.1, 2), 2)
+                product_rows.append({
+                    "name": f"Product {index}",
+                    # Enough stock for every order the benchmark creates
+                    "quantity": 1_000_000,
+                    "purchase_price": purchase_price,
+                    "sale_price": sale_price,
+                    "profit": round(sale_price - purchase_price, 2),
+                    "category_id": rnd.choice(category_ids),
+                    "user_id": user_id
+                })
+            product_ids = (await conn.execute(insert(Product).returning(Product.id), product_rows)).scalars().all()
+            prices = {product_id: {**row, "id": product_id} for product_id, row in zip(product_ids, product_rows)}
+
+            orders, lines = [], []
+            for index in range(orders_per_store):
+                picked = [
+                    (prices[product_id], rnd.randint(1, 5))
+                    for product_id in rnd.sample(product_ids, min(ITEMS_PER_ORDER, len(product_ids)))
+                ]
+                orders.append({
+                    "order_number": f"S{user_id}-{index:07d}",
+                    "user_id": user_id,
+                    "total_amount": round(sum(row["sale_price"] * quantity for row, quantity in picked), 2),
+                    "total_profit": round(sum(row["profit"] * quantity for row, quantity in picked), 2),
+                    "created_at": now - timedelta(minutes=rnd.randint(0, 60 * 24 * 365))
+                })
+                lines.append(picked)
+            if not orders:
+                continue
+
+            order_ids = (await conn.execute(insert(Order).returning(Order.id), orders)).scalars().all()
+            await conn.execute(insert(OrderItem), [
+                {"order_id": order_id, "product_id": row["id"], "quantity": quantity,
+                 "price": row["sale_price"], "unit_cost": row["purchase_price"]}
+                for order_id, picked in zip(order_ids, lines)
+                for row, quantity in picked
+            ])
+
+    async with SessionLocal() as db:
+        await rebuild_daily_sales(db)
+        await db.commit()
+
+    return telegram_ids
+
+def percentile(ordered: List[float], quantile: float) -> float:
+    return ordered[min(len(ordered) - 1, int(quantile * len(ordered)))] if ordered else 0.0
+
+def summarize(latencies: List[float], statements: int, elapsed: float) -> dict:
+    ordered = sorted(latencies)
+    return {
+        "updates": len(ordered),
+        "updates_per_second": round(len(ordered) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(ordered, 0.5) * 1000, 2),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2) if ordered else 0.0,
+        "queries_per_update": round(statements / len(ordered), 2) if ordered else 0.0
+    }
+
+async def run_level(dp, bot: Bot, telegram_ids: List[int], flows: List[str], concurrency: int, rounds: int) -> dict:
+    """`concurrency` virtual users, each replaying every flow `rounds` times in its own store."""
+    latencies: Dict[str, List[float]] = {name: [] for name in flows}
+    statements: Dict[str, int] = {name: 0 for name in flows}
+    errors: Dict[str, int] = {name: 0 for name in flows}
+
+    async def virtual_user(telegram_id: int):
+        for _ in range(rounds):
+            for name in flows:
+                for chat_id, step in FLOWS[name](telegram_id):
+                    try:
+                        update = step(chat_id, bot.session)
+                    except FlowBroken as error:
+                        logging.warning(f"{name}: {error}")
+                        errors[name] += 1
+                        break
+                    counter = [0]
+                    token = _statements.set(counter)
+                    started = time.perf_counter()
+                    try:
+                        await dp.feed_update(bot, update)
+                    except Exception as error:
+                        logging.warning(f"{name}: {error!r}")
+                        errors[name] += 1
+                    finally:
+                        latencies[name].append(time.perf_counter() - started)
+                        _statements.reset(token)
+                    statements[name] += counter[0]
+
+    total_statements = STATEMENTS.count
+    started = time.perf_counter()
+    await asyncio.gather(*(virtual_user(telegram_id) for telegram_id in telegram_ids[:concurrency]))
+    elapsed = time.perf_counter() - started
+
+    result = summarize([value for values in latencies.values() for value in values], STATEMENTS.count - total_statements, elapsed)
+    result["errors"] = sum(errors.values())
+    result["seconds"] = round(elapsed, 3)
+    result["flows"] = {}
+    for name in flows:
+        flow = summarize(latencies[name], statements[name], elapsed)
+        # Flows share the wall clock, so their own rate is not meaningful
+        flow.pop("updates_per_second")
+        flow["errors"] = errors[name]
+        result["flows"][name] = flow
+    return result
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short=8", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_level(concurrency: int, result: dict, baseline: Optional[dict]):
+    print(f"\nconcurrency {concurrency}: {result['updates']} updates in {result['seconds']} s, "
+          f"{result['updates_per_second']} updates/s, {result['errors']} errors")
+    print(f"{'flow':<14} {'updates':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'queries':>8}")
+    rows = list(result["flows"].items()) + [("all", result)]
+    for name, flow in rows:
+        line = (f"{name:<14} {flow['updates']:>8} {flow['p50_ms']:>9.2f} {flow['p95_ms']:>9.2f} "
+                f"{flow['p99_ms']:>9.2f} {flow['queries_per_update']:>8.2f}")
+        before = (baseline or {}).get("flows", {}).get(name) if name != "all" else baseline
+        if before and before.get("p95_ms"):
+            line += f"   p95 {flow['p95_ms'] / before['p95_ms'] - 1:+.0%}"
+            if name == "all" and before.get("updates_per_second"):
+                line += f", updates/s {flow['updates_per_second'] / before['updates_per_second'] - 1:+.0%}"
+        print(line)
+
+async def run(args) -> int:
+    await prepare_database()
+    session = FakeSession()
+    bot = Bot(token="123456:BENCHMARK", session=session)
+    dp = create_dispatcher()
+    event.listen(engine.sync_engine, "before_cursor_execute", STATEMENTS)
+
+    started = time.perf_counter()
+    telegram_ids = await seed(max(args.concurrency), args.products, args.orders, args.seed)
+    print(f"Seeded {len(telegram_ids)} stores ({args.products} products, {args.orders} orders each) "
+          f"in {time.perf_counter() - started:.1f} s")
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            baseline = json.load(file).get("levels", {})
+
+    # Fills caches and the SQLite page cache; not reported
+    await run_level(dp, bot, telegram_ids, args.flows, max(args.concurrency), 1)
+
+    levels = {}
+    for concurrency in args.concurrency:
+        result = await run_level(dp, bot, telegram_ids, args.flows, concurrency, args.rounds)
+        levels[str(concurrency)] = result
+        print_level(concurrency, result, baseline.get(str(concurrency)))
+
+    await dp.storage.close()
+    await engine.dispose()
+
+    commit = git_commit()
+    output = args.output or f"throughput-{commit or 'unknown'}.json"
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump({
+            "commit": commit,
+            "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "parameters": {
+                "flows": args.flows, "rounds": args.rounds, "products": args.products,
+                "orders": args.orders, "seed": args.seed
+            },
+            "api_calls": session.calls,
+            "levels": levels
+        }, file, indent=2)
+    print(f"\nResults saved to {output}")
+
+    return 1 if any(level["errors"] for level in levels.values()) else 0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50], help="virtual users, one level per value")
+    parser.add_argument("--rounds", type=int, default=3, help="times each virtual user replays the flows")
+    parser.add_argument("--flows", nargs="+", choices=list(FLOWS), default=list(FLOWS))
+    parser.add_argument("--products", type=int, default=200, help="products per seeded store")
+    parser.add_argument("--orders", type=int, default=2000, help="orders per seeded store")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="JSON results file (default: throughput-<commit>.json)")
+    parser.add_argument("--compare", help="results of an earlier run to compare against")
+    args = parser.parse_args()
+
+    # aiogram logs every update at INFO
+    logging.disable(logging.INFO)
+    sys.exit(asyncio.run(run(args)))
+
+if __name__ == "__main__":
+    main()
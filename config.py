@@ -7,6 +7,92 @@ BOT_TOKEN = os.getenv("BOT_TOKEN", "")
 ADMIN_IDS = list(map(int, os.getenv("ADMIN_IDS", "").split(','))) if os.getenv("ADMIN_IDS") else []
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///store_bot.db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+# SQLite storage profile, applied to every new connection
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+# Page cache for the whole pool, split evenly: every connection has its own
+SQLITE_CACHE_BUDGET_KB = int(os.getenv("SQLITE_CACHE_BUDGET_KB", "32768"))
+SQLITE_CACHE_SIZE_KB = int(os.getenv(
+    "SQLITE_CACHE_SIZE_KB",
+    str(max(2048, SQLITE_CACHE_BUDGET_KB // (DB_POOL_SIZE + DB_MAX_OVERFLOW)))
+))
+# Mapped pages are shared between connections but count towards the
+# container's memory limit (512Mi on Northflank)
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(64 * 1024 * 1024)))
+
+# Maintenance jobs (seconds between runs, 0 disables a job)
+WAL_CHECKPOINT_INTERVAL = int(os.getenv("WAL_CHECKPOINT_INTERVAL", "300"))
+ANALYZE_INTERVAL = int(os.getenv("ANALYZE_INTERVAL", str(6 * 3600)))
+VACUUM_INTERVAL = int(os.getenv("VACUUM_INTERVAL", "3600"))
+VACUUM_PAGES = int(os.getenv("VACUUM_PAGES", "1000"))
+
+# Low-stock alerts: default per-store threshold, seconds between checks
+# (0 disables the job), products read per query
+LOW_STOCK_THRESHOLD = int(os.getenv("LOW_STOCK_THRESHOLD", "5"))
+LOW_STOCK_INTERVAL = int(os.getenv("LOW_STOCK_INTERVAL", "900"))
+LOW_STOCK_BATCH_SIZE = int(os.getenv("LOW_STOCK_BATCH_SIZE", "500"))
+# Outgoing notifications per second (Telegram allows about 30)
+NOTIFY_RATE = int(os.getenv("NOTIFY_RATE", "25"))
+# Users read per broadcast page; progress is checkpointed after each page
+BROADCAST_BATCH_SIZE = int(os.getenv("BROADCAST_BATCH_SIZE", "100"))
+
+# Outbound queue: bot-wide and per-chat sends per second
+OUTBOUND_RATE = float(os.getenv("OUTBOUND_RATE", "30"))
+OUTBOUND_CHAT_RATE = float(os.getenv("OUTBOUND_CHAT_RATE", "1"))
+OUTBOUND_CHAT_BURST = int(os.getenv("OUTBOUND_CHAT_BURST", "3"))
+OUTBOUND_CHATS_TRACKED = int(os.getenv("OUTBOUND_CHATS_TRACKED", "10000"))
+# RetryAfter from this many chats within the window (seconds) pauses all sends
+OUTBOUND_FLOOD_CHATS = int(os.getenv("OUTBOUND_FLOOD_CHATS", "3"))
+OUTBOUND_FLOOD_WINDOW = float(os.getenv("OUTBOUND_FLOOD_WINDOW", "10"))
+
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", "300"))
+ANALYTICS_CACHE_SIZE = int(os.getenv("ANALYTICS_CACHE_SIZE", "2000"))
+# Seconds a report is reused, a shorter time for periods ending now; bounds
+# how stale a report gets when another replica changed the store
+ANALYTICS_CACHE_TTL = int(os.getenv("ANALYTICS_CACHE_TTL", "600"))
+ANALYTICS_OPEN_CACHE_TTL = int(os.getenv("ANALYTICS_OPEN_CACHE_TTL", "60"))
+# Stores whose data version is tracked
+ANALYTICS_VERSIONS_SIZE = int(os.getenv("ANALYTICS_VERSIONS_SIZE", "10000"))
+CATEGORIES_KEYBOARD_CACHE_SIZE = int(os.getenv("CATEGORIES_KEYBOARD_CACHE_SIZE", "5000"))
+
+FSM_STORAGE_URL = os.getenv("FSM_STORAGE_URL", "")
+FSM_STATE_TTL = int(os.getenv("FSM_STATE_TTL", str(2 * 24 * 3600)))
+FSM_FLUSH_INTERVAL = float(os.getenv("FSM_FLUSH_INTERVAL", "0.5"))
+# Records kept in memory while FSM_FLUSH_INTERVAL > 0 (single bot process)
+FSM_CACHE_SIZE = int(os.getenv("FSM_CACHE_SIZE", "10000"))
+
+QUERY_MONITORING = os.getenv("QUERY_MONITORING", "1") == "1"
+QUERY_BUDGET = int(os.getenv("QUERY_BUDGET", "10"))
+QUERY_REPEAT_THRESHOLD = int(os.getenv("QUERY_REPEAT_THRESHOLD", "5"))
+QUERY_BUDGET_RAISE = os.getenv("QUERY_BUDGET_RAISE", "0") == "1"
+
+# Update tracing: share of updates traced (0 turns spans off), handler
+# latencies kept for percentiles, traces kept in memory, optional JSONL file
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0"))
+TRACE_WINDOW = int(os.getenv("TRACE_WINDOW", "1000"))
+TRACE_KEEP = int(os.getenv("TRACE_KEEP", "200"))
+TRACE_FILE = os.getenv("TRACE_FILE", "")
+
+PRODUCTS_PAGE_SIZE = int(os.getenv("PRODUCTS_PAGE_SIZE", "10"))
+
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "2000"))
+IMPORT_MAX_FILE_SIZE = int(os.getenv("IMPORT_MAX_FILE_SIZE", str(20 * 1024 * 1024)))
+IMPORT_MAX_REPORTED_ERRORS = int(os.getenv("IMPORT_MAX_REPORTED_ERRORS", "1000"))
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "").rstrip('/')
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+WEB_HOST = os.getenv("WEB_HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8080"))
+HEALTH_DB_TIMEOUT = float(os.getenv("HEALTH_DB_TIMEOUT", "2"))
 
 LANGUAGES = {
     'ru': '🇷🇺 Русский',
@@ -1,11 +1,73 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Text, JSON, event
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Boolean, ForeignKey, Text, JSON, Index, event, make_url
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import relationship
 from datetime import datetime
 import config
 
-engine = create_engine(config.DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgres': 'postgresql+asyncpg',
+    'postgresql': 'postgresql+asyncpg',
+    'postgresql+psycopg2': 'postgresql+asyncpg',
+}
+
+def get_async_url(url: str) -> str:
+    scheme, sep, rest = url.partition('://')
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}{sep}{rest}"
+
+def get_engine_options(url: str) -> dict:
+    url = make_url(url)
+    if url.get_backend_name() == 'sqlite':
+        if url.database in (None, '', ':memory:'):
+            return {}
+        options = {'poolclass': AsyncAdaptedQueuePool}
+    else:
+        options = {'pool_pre_ping': True}
+    options.update(
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT,
+        pool_recycle=config.DB_POOL_RECYCLE,
+    )
+    return options
+
+def get_upsert(dialect_name: str):
+    """Returns the dialect insert() that supports on_conflict_do_update()."""
+    if dialect_name == 'postgresql':
+        return postgresql.insert
+    return sqlite.insert
+
+engine = create_async_engine(
+    get_async_url(config.DATABASE_URL),
+    **get_engine_options(config.DATABASE_URL)
+)
+
+def get_sqlite_pragmas() -> list:
+    return [
+        # Only takes effect on a new database (or after a full VACUUM)
+        "PRAGMA auto_vacuum=INCREMENTAL",
+        f"PRAGMA journal_mode={config.SQLITE_JOURNAL_MODE}",
+        f"PRAGMA synchronous={config.SQLITE_SYNCHRONOUS}",
+        f"PRAGMA busy_timeout={config.SQLITE_BUSY_TIMEOUT_MS}",
+        # Negative cache_size is in KiB rather than pages; per connection,
+        # so config sizes it from the pool's total budget
+        f"PRAGMA cache_size=-{config.SQLITE_CACHE_SIZE_KB}",
+        f"PRAGMA mmap_size={config.SQLITE_MMAP_SIZE}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+
+if engine.dialect.name == 'sqlite':
+    @event.listens_for(engine.sync_engine, 'connect')
+    def apply_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in get_sqlite_pragmas():
+            cursor.execute(pragma)
+        cursor.close()
+
+SessionLocal = async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
 class User(Base):
@@ -17,6 +79,8 @@ class User(Base):
     language = Column(String(2), default=config.DEFAULT_LANGUAGE)
     store_name = Column(String(255))
     is_active = Column(Boolean, default=True)
+    # Products with fewer units trigger a low-stock alert; 0 disables alerts
+    low_stock_threshold = Column(Integer, default=config.LOW_STOCK_THRESHOLD)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     categories = relationship("Category", back_populates="user", cascade="all, delete-orphan")
@@ -33,6 +97,10 @@ class Category(Base):
     
     user = relationship("User", back_populates="categories")
     products = relationship("Product", back_populates="category", cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        Index('ix_categories_user_id', 'user_id'),
+    )
 
 class Product(Base):
     __tablename__ = "products"
@@ -52,6 +120,13 @@ class Product(Base):
     category = relationship("Category", back_populates="products")
     order_items = relationship("OrderItem", back_populates="product")
     
+    __table_args__ = (
+        Index('ix_products_user_id_id', 'user_id', 'id'),
+        Index('ix_products_user_id_quantity', 'user_id', 'quantity'),
+        Index('ix_products_category_id', 'category_id'),
+        Index('ix_products_user_id_name', 'user_id', 'name'),
+    )
+    
     def calculate_profit(self):
         if self.sale_price is not None and self.purchase_price is not None:
             self.profit = self.sale_price - self.purchase_price
@@ -77,6 +152,10 @@ class Order(Base):
     
     user = relationship("User", back_populates="orders")
     items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        Index('ix_orders_user_id_created_at', 'user_id', 'created_at'),
+    )
 
 class OrderItem(Base):
     __tablename__ = "order_items"
@@ -86,14 +165,20 @@ class OrderItem(Base):
     product_id = Column(Integer, ForeignKey("products.id"))
     quantity = Column(Integer)
     price = Column(Float)
+    unit_cost = Column(Float, default=0.0)
     profit = Column(Float, default=0.0)
     
     order = relationship("Order", back_populates="items")
     product = relationship("Product", back_populates="order_items")
     
+    __table_args__ = (
+        Index('ix_order_items_order_id', 'order_id'),
+        Index('ix_order_items_product_id', 'product_id'),
+    )
+    
     def calculate_profit(self):
-        if self.price is not None and self.product is not None:
-            self.profit = (self.price - self.product.purchase_price) * self.quantity
+        if self.price is not None and self.unit_cost is not None:
+            self.profit = (self.price - self.unit_cost) * self.quantity
         return self.profit
 
 @event.listens_for(OrderItem, 'before_update')
@@ -104,12 +189,58 @@ def calculate_order_item_profit_before_update(mapper, connection, target):
 def calculate_order_item_profit_before_insert(mapper, connection, target):
     target.calculate_profit()
 
-def create_tables():
-    Base.metadata.create_all(bind=engine)
+class DailySales(Base):
+    __tablename__ = "daily_sales"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    orders_count = Column(Integer, default=0)
+    items_sold = Column(Integer, default=0)
+    revenue = Column(Float, default=0.0)
+    profit = Column(Float, default=0.0)
+    expenses = Column(Float, default=0.0)
+
+class LowStockAlert(Base):
+    """A product the owner was already warned about; removed once it is
+    restocked, so the next shortage alerts again."""
+    __tablename__ = "low_stock_alerts"
+    
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    quantity = Column(Integer)
+    sent_at = Column(DateTime, default=datetime.utcnow)
+
+class Broadcast(Base):
+    """An admin message to all active users. last_user_id is the keyset
+    checkpoint: users up to it have been handled."""
+    __tablename__ = "broadcasts"
+    
+    id = Column(Integer, primary_key=True)
+    admin_telegram_id = Column(Integer)
+    text = Column(Text)
+    status = Column(String(16), default='running', index=True)
+    last_user_id = Column(Integer, default=0)
+    sent = Column(Integer, default=0)
+    failed = Column(Integer, default=0)
+    blocked = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+class FsmRecord(Base):
+    __tablename__ = "fsm_records"
+    
+    key = Column(String(255), primary_key=True)
+    state = Column(String(255), nullable=True)
+    data = Column(JSON, default=dict)
+    updated_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+class SchemaVersion(Base):
+    __tablename__ = "schema_version"
+    
+    version = Column(Integer, primary_key=True)
+    name = Column(String(255))
+    applied_at = Column(DateTime, default=datetime.utcnow)
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+async def create_tables():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
@@ -6,8 +6,20 @@ from .products import router as products_router
 from .categories import router as categories_router
 from .orders import router as orders_router
 from .analytics import router as analytics_router
+from .imports import router as imports_router
+from .exports import router as exports_router
+from .admin import router as admin_router
+from .dispatch import dispatch
+
+# Button texts and callbacks are routed by the dispatch table, ahead of
+# the routers that only handle FSM text input and commands.
+dispatch_router = dispatch.create_router()
 
 routers = [
+    dispatch_router,
+    # Documents are imports in any state, so the FSM text handlers never see them
+    imports_router,
+    admin_router,
     start_router,
     registration_router,
     language_router,
@@ -15,7 +27,8 @@ routers = [
     products_router,
     categories_router,
     orders_router,
-    analytics_router
+    analytics_router,
+    exports_router
 ]
 
 __all__ = [
@@ -27,5 +40,10 @@ __all__ = [
     'categories_router',
     'orders_router',
     'analytics_router',
+    'imports_router',
+    'exports_router',
+    'admin_router',
+    'dispatch',
+    'dispatch_router',
     'routers'
 ]
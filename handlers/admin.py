@@ -0,0 +1,66 @@
+import os
+import tempfile
+
+from aiogram import Bot, Router, F
+from aiogram.filters import Command, CommandObject
+from aiogram.types import FSInputFile, Message
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import config
+from database import Broadcast, engine
+from monitoring.tracing import tracer
+from services.broadcasts import running_broadcasts, start_broadcast
+from services.notifications import Notifier
+
+router = Router()
+router.message.filter(F.from_user.id.in_(config.ADMIN_IDS))
+
+@router.message(Command("broadcast"))
+async def broadcast_command(message: Message, command: CommandObject, bot: Bot, db: AsyncSession):
+    text = (command.args or '').strip()
+    if not text:
+        last = await db.scalar(select(Broadcast).order_by(Broadcast.id.desc()).limit(1))
+        status = "No broadcasts yet." if last is None else (
+            f"Last broadcast #{last.id}: {last.status}\n"
+            f"✅ Sent: {last.sent}\n❌ Failed: {last.failed}\n🚫 Blocked the bot: {last.blocked}"
+        )
+        await message.answer(f"📣 /broadcast <text> sends the text to every active user.\n\n{status}", parse_mode=None)
+        return
+    
+    if running_broadcasts:
+        await message.answer(f"⏳ Broadcast #{next(iter(running_broadcasts))} is still running.")
+        return
+    
+    broadcast = Broadcast(admin_telegram_id=message.from_user.id, text=text)
+    db.add(broadcast)
+    await db.commit()
+    
+    start_broadcast(engine, Notifier(bot), broadcast.id)
+    await message.answer(f"📣 Broadcast #{broadcast.id} started. You will get a report when it is done.")
+
+# Handlers listed by /latency, slowest p95 first
+LATENCY_ROWS = 15
+
+@router.message(Command("latency"))
+async def latency_command(message: Message, command: CommandObject):
+    if (command.args or '').strip() == 'dump':
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'traces.jsonl')
+            count = tracer.dump(path)
+            if not count:
+                await message.answer("No traces kept. Set TRACE_SAMPLE_RATE to sample updates.", parse_mode=None)
+                return
+            await message.answer_document(FSInputFile(path), caption=f"🔎 {count} traces")
+        return
+
+    rows = tracer.report()
+    if not rows:
+        await message.answer("No handler latencies recorded yet.")
+        return
+    lines = [f"{row['handler']}: {row['p50']} / {row['p95']} / {row['p99']} ms ({row['count']})" for row in rows[:LATENCY_ROWS]]
+    await message.answer(
+        "⏱ Handler latency p50 / p95 / p99 (updates)\n\n" + "\n".join(lines)
+        + f"\n\nTraced: {tracer.sample_rate:.0%} of updates. /latency dump sends the kept traces.",
+        parse_mode=None
+    )
@@ -1,16 +1,19 @@
-from aiogram import Router, F
+from aiogram import Router
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
 
-from database import get_db, User, Order, Product, OrderItem
+from services.analytics import get_report
+from services.users import CachedUser
 from keyboards.builders import (
+    MAIN_MENU_TEXTS, button_texts,
     get_main_menu_keyboard, get_analytics_period_keyboard,
     get_cancel_keyboard
 )
+from keyboards.callbacks import AnalyticsPeriod
+from handlers.dispatch import dispatch
 
 router = Router()
 
@@ -19,11 +22,8 @@ class AnalyticsStates(StatesGroup):
     custom_period_start = State()
     custom_period_end = State()
 
-@router.message(F.text.in_(["📊 Аналитика", "📊 Analytics"]))
-async def analytics_menu(message: Message, state: FSMContext):
-    db: Session = next(get_db())
-    user = db.query(User).filter(User.telegram_id == message.from_user.id).first()
-    
+@dispatch.text(*button_texts(MAIN_MENU_TEXTS, 'analytics'))
+async def analytics_menu(message: Message, state: FSMContext, user: CachedUser):
     if not user:
         return
     
@@ -39,15 +39,12 @@ async def analytics_menu(message: Message, state: FSMContext):
     await state.set_state(AnalyticsStates.selecting_period)
     await state.update_data(language=user.language)
 
-@router.callback_query(F.data.startswith("analytics_"), AnalyticsStates.selecting_period)
-async def process_period_selection(callback: CallbackQuery, state: FSMContext):
-    period = callback.data.split("_")[1]
+@dispatch.callback(AnalyticsPeriod, AnalyticsStates.selecting_period)
+async def process_period_selection(callback: CallbackQuery, callback_data: AnalyticsPeriod, state: FSMContext, db: AsyncSession, user: CachedUser):
+    period = callback_data.period
     data = await state.get_data()
     language = data.get('language', 'ru')
     
-    db: Session = next(get_db())
-    user = db.query(User).filter(User.telegram_id == callback.from_user.id).first()
-    
     now = datetime.now()
     
     if period == 'day':
@@ -72,7 +69,7 @@ async def process_period_selection(callback: CallbackQuery, state: FSMContext):
         else:
             text = "📅 Enter start date (format: DD.MM.YYYY):"
         
-        await callback.message.edit_text(
+        await callback.message.answer(
             text,
             reply_markup=get_cancel_keyboard(language)
         )
@@ -80,7 +77,7 @@ async def process_period_selection(callback: CallbackQuery, state: FSMContext):
         await callback.answer()
         return
     
-    await show_analytics(callback.message, user.id, start_date, end_date, language)
+    await show_analytics(callback.message, db, user.id, start_date, end_date, language, open_ended=True)
     await state.clear()
     await callback.answer()
 
@@ -99,7 +96,7 @@ async def process_custom_start_date(message: Message, state: FSMContext):
     
     try:
         start_date = datetime.strptime(message.text.strip(), '%d.%m.%Y')
-        await state.update_data(start_date=start_date)
+        await state.update_data(start_date=start_date.isoformat())
         
         if language == 'ru':
             text = "📅 Введите конечную дату (формат: ДД.ММ.ГГГГ):"
@@ -117,19 +114,16 @@ async def process_custom_start_date(message: Message, state: FSMContext):
         await message.answer(error_text)
 
 @router.message(AnalyticsStates.custom_period_end)
-async def process_custom_end_date(message: Message, state: FSMContext):
+async def process_custom_end_date(message: Message, state: FSMContext, db: AsyncSession, user: CachedUser):
     data = await state.get_data()
     language = data.get('language', 'ru')
-    start_date = data.get('start_date')
+    start_date = datetime.fromisoformat(data['start_date'])
     
     try:
         end_date = datetime.strptime(message.text.strip(), '%d.%m.%Y')
         end_date = end_date.replace(hour=23, minute=59, second=59)
         
-        db: Session = next(get_db())
-        user = db.query(User).filter(User.telegram_id == message.from_user.id).first()
-        
-        await show_analytics(message, user.id, start_date, end_date, language)
+        await show_analytics(message, db, user.id, start_date, end_date, language)
         await state.clear()
     except ValueError:
         if language == 'ru':
@@ -145,35 +139,16 @@ def safe_divide(numerator, denominator, default=0):
         return default
     return numerator / denominator
 
-async def show_analytics(message: Message, user_id: int, start_date: datetime, end_date: datetime, language: str):
-    db: Session = next(get_db())
-    
-    query = db.query(Order).filter(Order.user_id == user_id)
-    
-    if start_date:
-        query = query.filter(Order.created_at >= start_date)
-    
-    if end_date:
-        query = query.filter(Order.created_at <= end_date)
-    
-    orders = query.all()
-    
-    total_orders = len(orders)
-    total_amount = sum(order.total_amount for order in orders)
-    total_profit = sum(order.total_profit for order in orders)
-    
-    total_items_sold = 0
-    total_expenses = 0
-    
-    for order in orders:
-        for item in order.items:
-            total_items_sold += item.quantity
-            if item.product:
-                total_expenses += item.quantity * item.product.purchase_price
+async def show_analytics(message: Message, db: AsyncSession, user_id: int, start_date: datetime, end_date: datetime, language: str, open_ended: bool = False):
+    report = await get_report(db, user_id, start_date, end_date, open_ended)
     
-    current_products = db.query(Product).filter(Product.user_id == user_id).all()
-    inventory_value = sum(product.quantity * product.purchase_price for product in current_products)
-    inventory_items = sum(product.quantity for product in current_products)
+    total_orders = report.total_orders
+    total_amount = report.total_amount
+    total_profit = report.total_profit
+    total_items_sold = report.total_items_sold
+    total_expenses = report.total_expenses
+    inventory_items = report.inventory_items
+    inventory_value = report.inventory_value
     
     if start_date and end_date:
         date_range = f"{start_date.strftime('%d.%m.%Y')} - {end_date.strftime('%d.%m.%Y')}"
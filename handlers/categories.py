@@ -1,14 +1,16 @@
-from aiogram import Router, F
+from aiogram import Router
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from database import get_db, User, Category, Product
-from keyboards.builders import (
-    get_main_menu_keyboard, get_cancel_keyboard,
-    get_categories_keyboard
-)
+from database import Category, Product
+from services.users import CachedUser
+from services.categories import get_categories_picker
+from keyboards.builders import MAIN_MENU_TEXTS, button_texts, get_main_menu_keyboard, get_cancel_keyboard
+from keyboards.callbacks import AddCategory, CategoryPick
+from handlers.dispatch import dispatch
 
 router = Router()
 
@@ -16,43 +18,42 @@ class CategoryStates(StatesGroup):
     adding_name = State()
     editing_name = State()
 
-@router.message(F.text.in_(["📁 Категории", "📁 Categories"]))
-async def categories_menu(message: Message):
-    db: Session = next(get_db())
-    user = db.query(User).filter(User.telegram_id == message.from_user.id).first()
-    
+@dispatch.text(*button_texts(MAIN_MENU_TEXTS, 'categories'))
+async def categories_menu(message: Message, db: AsyncSession, user: CachedUser):
     if not user:
         return
     
-    categories = db.query(Category).filter(Category.user_id == user.id).all()
+    rows = (await db.execute(
+        select(Category, func.count(Product.id))
+        .outerjoin(Product, Product.category_id == Category.id)
+        .where(Category.user_id == user.id)
+        .group_by(Category.id)
+    )).all()
+
+    categories = [category for category, _ in rows]
     
     if user.language == 'ru':
         if not categories:
             text = "📁 У вас пока нет категорий.\n\nЧтобы добавить категорию, нажмите 'Добавить категорию'"
         else:
             text = f"📁 Ваши категории ({len(categories)}):\n\n"
-            for idx, category in enumerate(categories, 1):
-                product_count = len(category.products)
+            for idx, (category, product_count) in enumerate(rows, 1):
                 text += f"{idx}. {category.name} ({product_count} товаров)\n"
     else:
         if not categories:
             text = "📁 You have no categories yet.\n\nTo add a category, click 'Add category'"
         else:
             text = f"📁 Your categories ({len(categories)}):\n\n"
-            for idx, category in enumerate(categories, 1):
-                product_count = len(category.products)
+            for idx, (category, product_count) in enumerate(rows, 1):
                 text += f"{idx}. {category.name} ({product_count} products)\n"
     
     await message.answer(
         text,
-        reply_markup=get_categories_keyboard(categories, user.language)
+        reply_markup=(await get_categories_picker(db, user.id, user.language)).markup
     )
 
-@router.callback_query(F.data == "add_category")
-async def add_category_callback(callback: CallbackQuery, state: FSMContext):
-    db: Session = next(get_db())
-    user = db.query(User).filter(User.telegram_id == callback.from_user.id).first()
-    
+@dispatch.callback(AddCategory)
+async def add_category_callback(callback: CallbackQuery, state: FSMContext, user: CachedUser):
     if not user:
         return
     
@@ -72,7 +73,7 @@ async def add_category_callback(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 @router.message(CategoryStates.adding_name)
-async def process_category_name(message: Message, state: FSMContext):
+async def process_category_name(message: Message, state: FSMContext, db: AsyncSession, user: CachedUser):
     data = await state.get_data()
     language = data.get('language', 'ru')
     
@@ -91,17 +92,14 @@ async def process_category_name(message: Message, state: FSMContext):
         await message.answer(error_text)
         return
     
-    db: Session = next(get_db())
-    user = db.query(User).filter(User.telegram_id == message.from_user.id).first()
-    
     category = Category(
         name=category_name,
         user_id=user.id
     )
     
     db.add(category)
-    db.commit()
-    
+    await db.commit()
+
     if language == 'ru':
         success_text = f"✅ Категория '{category_name}' успешно добавлена!"
     else:
@@ -113,28 +111,25 @@ async def process_category_name(message: Message, state: FSMContext):
     )
     await state.clear()
 
-@router.callback_query(F.data.startswith("category_"))
-async def category_selected(callback: CallbackQuery):
-    category_id = int(callback.data.split("_")[1])
-    
-    db: Session = next(get_db())
-    user = db.query(User).filter(User.telegram_id == callback.from_user.id).first()
+@dispatch.callback(CategoryPick)
+async def category_selected(callback: CallbackQuery, callback_data: CategoryPick, db: AsyncSession, user: CachedUser):
+    category_id = callback_data.id
     
     if not user:
         await callback.answer()
         return
     
-    category = db.query(Category).filter(
+    category = await db.scalar(select(Category).where(
         Category.id == category_id,
         Category.user_id == user.id
-    ).first()
+    ))
     
     if not category:
         await callback.answer("❌ Категория не найдена")
         return
     
-    products = db.query(Product).filter(Product.category_id == category_id).all()
-    
+    products = (await db.scalars(select(Product).where(Product.category_id == category_id))).all()
+
     if user.language == 'ru':
         text = f"📁 Категория: {category.name}\n\n"
         text += f"Товаров в категории: {len(products)}\n\n"
@@ -0,0 +1,102 @@
+from typing import Any, Callable, Dict, Iterable, Optional, Type, Union
+
+from aiogram import Router, F
+from aiogram.dispatcher.event.handler import CallableObject
+from aiogram.filters.callback_data import CallbackData
+from aiogram.fsm.state import State
+from aiogram.types import Message, CallbackQuery
+
+class DispatchTable:
+    """Routes reply-button texts and callback data prefixes to handlers with
+    one dictionary lookup per update, instead of evaluating every router's
+    filters in turn.
+
+    Text routes fire in any state. Callback routes may be bound to an FSM
+    state; a route for the current state wins over the stateless one.
+    Registering the same text, or the same prefix for the same state, twice
+    raises ValueError, so ambiguous routes fail at import time.
+    """
+
+    def __init__(self):
+        self.texts: Dict[str, CallableObject] = {}
+        self.callbacks: Dict[str, Dict[Optional[str], CallableObject]] = {}
+        self.callback_data: Dict[str, Type[CallbackData]] = {}
+
+    def text(self, *texts: str) -> Callable:
+        def register(callback: Callable) -> Callable:
+            route = CallableObject(callback)
+            for text in texts:
+                if text in self.texts:
+                    raise ValueError(
+                        f"Button text {text!r} is already routed to {self.texts[text].callback.__qualname__}"
+                    )
+                self.texts[text] = route
+            return callback
+        return register
+
+    def callback(self, callback_data: Type[CallbackData], state: Union[State, str, None] = None) -> Callable:
+        prefix = callback_data.__prefix__
+        state_name = state.state if isinstance(state, State) else state
+
+        def register(callback: Callable) -> Callable:
+            known = self.callback_data.setdefault(prefix, callback_data)
+            if known is not callback_data:
+                raise ValueError(f"Callback prefix {prefix!r} is used by both {known.__name__} and {callback_data.__name__}")
+
+            routes = self.callbacks.setdefault(prefix, {})
+            if state_name in routes:
+                raise ValueError(
+                    f"Callback {callback_data.__name__} in state {state_name} is already routed to "
+                    f"{routes[state_name].callback.__qualname__}"
+                )
+            routes[state_name] = CallableObject(callback)
+            return callback
+        return register
+
+    def resolve_text(self, message: Message) -> Union[bool, Dict[str, Any]]:
+        route = self.texts.get(message.text)
+        if route is None:
+            return False
+        return {'route': route}
+
+    def resolve_callback(self, callback: CallbackQuery, raw_state: Optional[str] = None) -> Union[bool, Dict[str, Any]]:
+        # ':' is the default CallbackData separator used by all our callbacks
+        prefix = callback.data.split(':', 1)[0]
+        routes = self.callbacks.get(prefix)
+        if routes is None:
+            return False
+
+        route = routes.get(raw_state) or routes.get(None)
+        if route is None:
+            return False
+
+        try:
+            callback_data = self.callback_data[prefix].unpack(callback.data)
+        except (TypeError, ValueError):
+            return False
+        return {'route': route, 'callback_data': callback_data}
+
+    def validate(self, required_texts: Iterable[str] = (), required_callbacks: Iterable[Type[CallbackData]] = ()) -> None:
+        """Startup check: every button the keyboards show must have a route."""
+        missing = [text for text in required_texts if text not in self.texts]
+        missing += [
+            callback_data.__name__ for callback_data in required_callbacks
+            if self.callback_data.get(callback_data.__prefix__) is not callback_data
+        ]
+        if missing:
+            raise ValueError(f"Buttons without a handler: {', '.join(missing)}")
+
+    def create_router(self) -> Router:
+        router = Router(name='dispatch')
+
+        @router.message(F.text, self.resolve_text)
+        async def dispatch_message(message: Message, route: CallableObject, **data: Any) -> Any:
+            return await route.call(message, **data)
+
+        @router.callback_query(F.data, self.resolve_callback)
+        async def dispatch_callback(callback: CallbackQuery, route: CallableObject, **data: Any) -> Any:
+            return await route.call(callback, **data)
+
+        return router
+
+dispatch = DispatchTable()
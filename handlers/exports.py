@@ -0,0 +1,65 @@
+import os
+import tempfile
+from datetime import datetime
+
+from aiogram import Router
+from aiogram.filters import Command, CommandObject
+from aiogram.types import Message, FSInputFile
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from services.users import CachedUser
+from services.exports import EXPORTS, write_export
+from utils.validators import parse_date
+
+router = Router()
+
+def get_export_help(language: str) -> str:
+    if language == 'ru':
+        return """📤 Экспорт данных в CSV
+
+/export orders — все заказы
+/export orders 01.01.2024 31.01.2024 — заказы за период
+/export inventory — текущие остатки товаров"""
+    return """📤 Export data as CSV
+
+/export orders — all orders
+/export orders 01.01.2024 31.01.2024 — orders of a period
+/export inventory — current stock"""
+
+@router.message(Command("export"))
+async def export_command(message: Message, command: CommandObject, db: AsyncSession, user: CachedUser):
+    if not user:
+        return
+
+    args = (command.args or '').split()
+    if not args or args[0].lower() not in EXPORTS or len(args) > 3:
+        await message.answer(get_export_help(user.language))
+        return
+
+    kind = args[0].lower()
+    try:
+        start_date = parse_date(args[1]) if len(args) > 1 else None
+        end_date = parse_date(args[2]).replace(hour=23, minute=59, second=59) if len(args) > 2 else None
+    except ValueError:
+        if user.language == 'ru':
+            await message.answer("❌ Неверный формат даты. Используйте ДД.ММ.ГГГГ")
+        else:
+            await message.answer("❌ Invalid date format. Use DD.MM.YYYY")
+        return
+
+    filename = f"{kind}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.csv"
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, filename)
+        # utf-8-sig so Excel detects the encoding
+        with open(path, 'w', encoding='utf-8-sig', newline='') as file:
+            count = await write_export(db, kind, user.id, file, start_date, end_date)
+
+        if not count:
+            await message.answer("📭 Нет данных для экспорта" if user.language == 'ru' else "📭 Nothing to export")
+            return
+
+        if user.language == 'ru':
+            caption = f"📤 Экспорт: {kind}, строк: {count}"
+        else:
+            caption = f"📤 Export: {kind}, rows: {count}"
+        await message.answer_document(FSInputFile(path, filename=filename), caption=caption)
@@ -0,0 +1,109 @@
+import asyncio
+import csv
+import io
+import os
+import tempfile
+
+from aiogram import Bot, Router, F
+from aiogram.filters import Command
+from aiogram.types import Message, BufferedInputFile
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import config
+from services.users import CachedUser
+from services.imports import SUPPORTED_EXTENSIONS, ImportFormatError, ImportResult, read_records, import_products
+
+router = Router()
+
+# Errors listed in the reply; the full list goes into an attached CSV
+ERRORS_IN_MESSAGE = 10
+
+def get_import_help(language: str) -> str:
+    if language == 'ru':
+        return """📥 Импорт товаров
+
+Отправьте файл CSV или XLSX. Первая строка — заголовки:
+name, quantity, purchase_price, sale_price, category (необязательно)
+
+Товары с существующим названием обновляются, остальные добавляются. Недостающие категории создаются."""
+    return """📥 Product import
+
+Send a CSV or XLSX file. The first row holds the headers:
+name, quantity, purchase_price, sale_price, category (optional)
+
+Products with an existing name are updated, the rest are added. Missing categories are created."""
+
+def get_import_report(result: ImportResult, language: str) -> str:
+    if language == 'ru':
+        text = f"""✅ Импорт завершен
+
+➕ Добавлено: {result.created}
+🔄 Обновлено: {result.updated}
+📁 Новых категорий: {result.categories_created}
+⚠️ Строк с ошибками: {result.errors_count}"""
+    else:
+        text = f"""✅ Import finished
+
+➕ Added: {result.created}
+🔄 Updated: {result.updated}
+📁 New categories: {result.categories_created}
+⚠️ Rows with errors: {result.errors_count}"""
+
+    if result.errors:
+        text += "\n\n" + "\n".join(
+            f"{row_number}: {message}" for row_number, message in result.errors[:ERRORS_IN_MESSAGE]
+        )
+    return text
+
+def get_errors_file(result: ImportResult) -> BufferedInputFile:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(['row', 'error'])
+    writer.writerows(result.errors)
+    return BufferedInputFile(buffer.getvalue().encode('utf-8-sig'), filename='import_errors.csv')
+
+@router.message(Command("import"))
+async def import_help(message: Message, user: CachedUser):
+    if not user:
+        return
+
+    await message.answer(get_import_help(user.language))
+
+@router.message(F.document)
+async def import_document(message: Message, bot: Bot, db: AsyncSession, user: CachedUser):
+    if not user:
+        return
+
+    document = message.document
+    filename = document.file_name or ''
+    if os.path.splitext(filename)[1].lower() not in SUPPORTED_EXTENSIONS:
+        await message.answer(get_import_help(user.language))
+        return
+
+    if document.file_size and document.file_size > config.IMPORT_MAX_FILE_SIZE:
+        if user.language == 'ru':
+            await message.answer(f"❌ Файл слишком большой. Максимум {config.IMPORT_MAX_FILE_SIZE // (1024 * 1024)} МБ.")
+        else:
+            await message.answer(f"❌ The file is too large. The limit is {config.IMPORT_MAX_FILE_SIZE // (1024 * 1024)} MB.")
+        return
+
+    await message.answer("⏳ Импортирую товары..." if user.language == 'ru' else "⏳ Importing products...")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'upload' + os.path.splitext(filename)[1].lower())
+        await bot.download(document, destination=path)
+
+        try:
+            records = await asyncio.to_thread(read_records, path, filename)
+            result = await import_products(db, user.id, records)
+        except ImportFormatError as error:
+            await db.rollback()
+            if user.language == 'ru':
+                await message.answer(f"❌ Не удалось прочитать файл: {error}")
+            else:
+                await message.answer(f"❌ Could not read the file: {error}")
+            return
+
+    await message.answer(get_import_report(result, user.language))
+    if len(result.errors) > ERRORS_IN_MESSAGE:
+        await message.answer_document(get_errors_file(result))
@@ -1,44 +1,44 @@
-from aiogram import Router, F
+from aiogram import Router
 from aiogram.types import Message
 from aiogram.filters import Command
-from sqlalchemy.orm import Session
 
-from database import get_db, User
-from keyboards.builders import get_language_keyboard, get_main_menu_keyboard
+from services.users import CachedUser
+from keyboards.builders import MAIN_MENU_TEXTS, button_texts, get_language_keyboard
+from handlers.dispatch import dispatch
 
 router = Router()
 
-def get_main_menu_text(language: str) -> str:
-    texts = {
-        'ru': """🏪 Добро пожаловать в StoreBot!
+WELCOME_TEXTS = {
+    'ru': """🏪 Добро пожаловать в StoreBot!
 
 Выберите действие из меню ниже:""",
-        'en': """🏪 Welcome to StoreBot!
+    'en': """🏪 Welcome to StoreBot!
 
 Choose an action from the menu below:"""
-    }
-    return texts.get(language, texts['ru'])
+}
 
-@router.message(F.text.in_(["⚙️ Настройки", "⚙️ Settings"]))
-async def settings_menu(message: Message):
-    db: Session = next(get_db())
-    user = db.query(User).filter(User.telegram_id == message.from_user.id).first()
-    
-    if not user:
-        return
-    
-    if user.language == 'ru':
-        text = """⚙️ Настройки:
+SETTINGS_TEXTS = {
+    'ru': """⚙️ Настройки:
 
 • Изменить язык
 • Изменить название магазина
-• Изменить email"""
-    else:
-        text = """⚙️ Settings:
+• Изменить email""",
+    'en': """⚙️ Settings:
 
 • Change language
 • Change store name
 • Change email"""
+}
+
+def get_main_menu_text(language: str) -> str:
+    return WELCOME_TEXTS.get(language) or WELCOME_TEXTS['ru']
+
+@dispatch.text(*button_texts(MAIN_MENU_TEXTS, 'settings'))
+async def settings_menu(message: Message, user: CachedUser):
+    if not user:
+        return
+    
+    text = SETTINGS_TEXTS.get(user.language) or SETTINGS_TEXTS['ru']
     
     await message.answer(text)
 
@@ -1,16 +1,21 @@
-from aiogram import Router, F
+from aiogram import Router
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
-import uuid
 
-from database import get_db, User, Product, Order, OrderItem
+from database import Product, Order, OrderItem
+from services.orders import place_order
+from services.users import CachedUser
 from keyboards.builders import (
+    MAIN_MENU_TEXTS, button_texts,
     get_main_menu_keyboard, get_cancel_keyboard,
     get_yes_no_keyboard
 )
+from keyboards.callbacks import Confirm
+from handlers.dispatch import dispatch
 
 router = Router()
 
@@ -19,54 +24,67 @@ class OrderStates(StatesGroup):
     entering_quantities = State()
     confirming_order = State()
 
-@router.message(F.text.in_(["💰 Заказы", "💰 Orders"]))
-async def orders_menu(message: Message):
-    db: Session = next(get_db())
-    user = db.query(User).filter(User.telegram_id == message.from_user.id).first()
-    
+def product_snapshot(product: Product) -> dict:
+    return {
+        "id": product.id,
+        "name": product.name,
+        "quantity": product.quantity,
+        "sale_price": product.sale_price,
+        "profit": product.profit
+    }
+
+@dispatch.text(*button_texts(MAIN_MENU_TEXTS, 'orders'))
+async def orders_menu(message: Message, db: AsyncSession, user: CachedUser):
     if not user:
         return
     
-    orders = db.query(Order).filter(Order.user_id == user.id).order_by(Order.created_at.desc()).limit(10).all()
-    
+    items_count = (
+        select(func.count(OrderItem.id))
+        .where(OrderItem.order_id == Order.id)
+        .scalar_subquery()
+    )
+    orders = (await db.execute(
+        select(Order, items_count)
+        .where(Order.user_id == user.id)
+        .order_by(Order.created_at.desc())
+        .limit(10)
+    )).all()
+
     if user.language == 'ru':
         if not orders:
             text = "💰 У вас пока нет заказов.\n\nЧтобы создать заказ, нажмите 'Создать заказ'"
         else:
             text = f"💰 Последние заказы ({len(orders)}):\n\n"
-            for idx, order in enumerate(orders, 1):
+            for idx, (order, order_items_count) in enumerate(orders, 1):
                 text += f"📦 Заказ #{order.order_number}\n"
                 text += f"   📅 Дата: {order.created_at.strftime('%d.%m.%Y %H:%M')}\n"
                 text += f"   💰 Сумма: ${order.total_amount:.2f}\n"
                 text += f"   📈 Прибыль: ${order.total_profit:.2f}\n"
-                text += f"   🛍️ Товаров: {len(order.items)}\n\n"
+                text += f"   🛍️ Товаров: {order_items_count}\n\n"
     else:
         if not orders:
             text = "💰 You have no orders yet.\n\nTo create an order, click 'Create order'"
         else:
             text = f"💰 Recent orders ({len(orders)}):\n\n"
-            for idx, order in enumerate(orders, 1):
+            for idx, (order, order_items_count) in enumerate(orders, 1):
                 text += f"📦 Order #{order.order_number}\n"
                 text += f"   📅 Date: {order.created_at.strftime('%d.%m.%Y %H:%M')}\n"
                 text += f"   💰 Amount: ${order.total_amount:.2f}\n"
                 text += f"   📈 Profit: ${order.total_profit:.2f}\n"
-                text += f"   🛍️ Items: {len(order.items)}\n\n"
+                text += f"   🛍️ Items: {order_items_count}\n\n"
     
     await message.answer(text)
 
-@router.message(F.text.in_(["🛒 Создать заказ", "🛒 Create order"]))
-async def create_order_start(message: Message, state: FSMContext):
-    db: Session = next(get_db())
-    user = db.query(User).filter(User.telegram_id == message.from_user.id).first()
-    
+@dispatch.text("🛒 Создать заказ", "🛒 Create order")
+async def create_order_start(message: Message, state: FSMContext, db: AsyncSession, user: CachedUser):
     if not user:
         return
     
-    products = db.query(Product).filter(
+    products = (await db.scalars(select(Product).where(
         Product.user_id == user.id,
         Product.quantity > 0
-    ).all()
-    
+    ).order_by(Product.id))).all()
+
     if not products:
         if user.language == 'ru':
             text = "❌ Нет товаров для продажи. Добавьте товары сначала."
@@ -94,7 +112,7 @@ async def create_order_start(message: Message, state: FSMContext):
     await state.update_data(language=user.language, products={})
 
 @router.message(OrderStates.selecting_products)
-async def process_product_selection(message: Message, state: FSMContext):
+async def process_product_selection(message: Message, state: FSMContext, db: AsyncSession, user: CachedUser):
     data = await state.get_data()
     language = data.get('language', 'ru')
     
@@ -106,14 +124,11 @@ async def process_product_selection(message: Message, state: FSMContext):
         )
         return
     
-    db: Session = next(get_db())
-    user = db.query(User).filter(User.telegram_id == message.from_user.id).first()
-    
-    products = db.query(Product).filter(
+    products = (await db.scalars(select(Product).where(
         Product.user_id == user.id,
         Product.quantity > 0
-    ).all()
-    
+    ).order_by(Product.id))).all()
+
     if not products:
         await state.clear()
         return
@@ -138,7 +153,7 @@ async def process_product_selection(message: Message, state: FSMContext):
         await message.answer(error_text)
         return
     
-    selected_data = {str(product.id): {"product": product, "quantity": None} for product in selected_products}
+    selected_data = {str(product.id): {"product": product_snapshot(product), "quantity": None} for product in selected_products}
     await state.update_data(selected_products=selected_data)
     
     if language == 'ru':
@@ -180,7 +195,6 @@ async def process_quantities(message: Message, state: FSMContext):
         await message.answer(error_text)
         return
     
-    db: Session = next(get_db())
     valid_items = []
     total_amount = 0
     total_profit = 0
@@ -195,19 +209,19 @@ async def process_quantities(message: Message, state: FSMContext):
             if quantity <= 0:
                 raise ValueError("Quantity must be positive")
             
-            if quantity > product.quantity:
+            if quantity > product['quantity']:
                 if language == 'ru':
-                    error_text = f"❌ Для товара '{product.name}' доступно только {product.quantity} единиц"
+                    error_text = f"❌ Для товара '{product['name']}' доступно только {product['quantity']} единиц"
                 else:
-                    error_text = f"❌ For product '{product.name}' only {product.quantity} units available"
+                    error_text = f"❌ For product '{product['name']}' only {product['quantity']} units available"
                 
                 await message.answer(error_text)
                 return
             
-            selected_products[str(product.id)]["quantity"] = quantity
+            selected_products[str(product['id'])]["quantity"] = quantity
             
-            item_amount = quantity * product.sale_price
-            item_profit = quantity * product.profit
+            item_amount = quantity * product['sale_price']
+            item_profit = quantity * product['profit']
             
             valid_items.append({
                 "product": product,
@@ -236,7 +250,7 @@ async def process_quantities(message: Message, state: FSMContext):
         text = "📋 Order Summary:\n\n"
     
     for item in valid_items:
-        text += f"• {item['product'].name} x{item['quantity']} = ${item['amount']:.2f}\n"
+        text += f"• {item['product']['name']} x{item['quantity']} = ${item['amount']:.2f}\n"
     
     text += f"\n💰 Итого: ${total_amount:.2f}\n"
     text += f"📈 Прибыль: ${total_profit:.2f}\n\n"
@@ -252,13 +266,15 @@ async def process_quantities(message: Message, state: FSMContext):
     )
     await state.set_state(OrderStates.confirming_order)
 
-@router.callback_query(F.data == "confirm_yes", OrderStates.confirming_order)
-async def confirm_order(callback: CallbackQuery, state: FSMContext):
+@dispatch.callback(Confirm, OrderStates.confirming_order)
+async def confirm_order(callback: CallbackQuery, callback_data: Confirm, state: FSMContext, db: AsyncSession, user: CachedUser):
+    if not callback_data.answer:
+        await cancel_order(callback, state)
+        return
+    
     data = await state.get_data()
     language = data.get('language', 'ru')
     valid_items = data.get('valid_items', [])
-    total_amount = data.get('total_amount', 0)
-    total_profit = data.get('total_profit', 0)
     
     if not valid_items:
         if language == 'ru':
@@ -271,80 +287,59 @@ async def confirm_order(callback: CallbackQuery, state: FSMContext):
         await callback.answer()
         return
     
-    db: Session = next(get_db())
-    user = db.query(User).filter(User.telegram_id == callback.from_user.id).first()
-    
-    order_number = str(uuid.uuid4())[:8].upper()
-    
-    order = Order(
-        order_number=order_number,
-        total_amount=total_amount,
-        total_profit=total_profit,
-        user_id=user.id
+    result = await place_order(
+        db,
+        user.id,
+        {item['product']['id']: item['quantity'] for item in valid_items}
     )
     
-    db.add(order)
-    db.flush()
-    
-    try:
-        for item in valid_items:
-            product = item['product']
-            quantity = item['quantity']
-            
-            if quantity > product.quantity:
-                raise ValueError(f"Недостаточно товара: {product.name}")
-            
-            order_item = OrderItem(
-                order_id=order.id,
-                product_id=product.id,
-                quantity=quantity,
-                price=product.sale_price
-            )
-            
-            order_item.calculate_profit()
-            
-            product.quantity -= quantity
-            
-            db.add(order_item)
-        
-        db.commit()
-        
+    if not result.ok:
         if language == 'ru':
-            success_text = f"""✅ Заказ создан успешно!
-
-📦 Номер заказа: #{order_number}
-💰 Сумма: ${total_amount:.2f}
-📈 Прибыль: ${total_profit:.2f}
-📅 Дата: {order.created_at.strftime('%d.%m.%Y %H:%M')}
-🛍️ Товаров: {len(valid_items)}"""
+            error_text = "❌ Заказ не создан, товара недостаточно:\n\n"
         else:
-            success_text = f"""✅ Order created successfully!
-
-📦 Order number: #{order_number}
-💰 Amount: ${total_amount:.2f}
-📈 Profit: ${total_profit:.2f}
-📅 Date: {order.created_at.strftime('%d.%m.%Y %H:%M')}
-🛍️ Items: {len(valid_items)}"""
-        
-        await callback.message.edit_text(
-            success_text,
-            reply_markup=get_main_menu_keyboard(language)
-        )
+            error_text = "❌ Order not created, not enough stock:\n\n"
         
-    except Exception as e:
-        db.rollback()
-        
-        if language == 'ru':
-            error_text = f"❌ Ошибка при создании заказа: {str(e)}"
-        else:
-            error_text = f"❌ Error creating order: {str(e)}"
+        for failure in result.failures:
+            name = failure.name or ("товар удален" if language == 'ru' else "product removed")
+            if language == 'ru':
+                error_text += f"• {name}: нужно {failure.requested}, доступно {failure.available}\n"
+            else:
+                error_text += f"• {name}: requested {failure.requested}, available {failure.available}\n"
         
         await callback.message.edit_text(error_text)
+        await callback.message.answer(
+            "🚫 Создание заказа отменено" if language == 'ru' else "🚫 Order creation cancelled",
+            reply_markup=get_main_menu_keyboard(language)
+        )
+        await state.clear()
+        await callback.answer()
+        return
     
+    if language == 'ru':
+        success_text = f"""✅ Заказ создан успешно!
+
+📦 Номер заказа: #{result.order_number}
+💰 Сумма: ${result.total_amount:.2f}
+📈 Прибыль: ${result.total_profit:.2f}
+📅 Дата: {result.created_at.strftime('%d.%m.%Y %H:%M')}
+🛍️ Товаров: {result.items_count}"""
+    else:
+        success_text = f"""✅ Order created successfully!
+
+📦 Order number: #{result.order_number}
+💰 Amount: ${result.total_amount:.2f}
+📈 Profit: ${result.total_profit:.2f}
+📅 Date: {result.created_at.strftime('%d.%m.%Y %H:%M')}
+🛍️ Items: {result.items_count}"""
+    
+    await callback.message.delete_reply_markup()
+    await callback.message.answer(
+        success_text,
+        reply_markup=get_main_menu_keyboard(language)
+    )
     await state.clear()
     await callback.answer()
 
-@router.callback_query(F.data == "confirm_no", OrderStates.confirming_order)
 async def cancel_order(callback: CallbackQuery, state: FSMContext):
     data = await state.get_data()
     language = data.get('language', 'ru')
@@ -356,7 +351,8 @@ async def cancel_order(callback: CallbackQuery, state: FSMContext):
     else:
         text = "🚫 Order creation cancelled"
     
-    await callback.message.edit_text(
+    await callback.message.delete_reply_markup()
+    await callback.message.answer(
         text,
         reply_markup=get_main_menu_keyboard(language)
     )
@@ -1,16 +1,25 @@
-from aiogram import Router, F
+from aiogram import Router
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import select, update, delete
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 
-from database import get_db, User, Product, Category
+import config
+from database import Product, Category, OrderItem
+from services.analytics import mark_store_changed
+from services.users import CachedUser
+from services.categories import get_categories_picker
 from keyboards.builders import (
+    MAIN_MENU_TEXTS, button_texts,
     get_main_menu_keyboard, get_cancel_keyboard,
-    get_product_actions_keyboard, get_categories_keyboard,
+    get_products_page_keyboard,
     get_yes_no_keyboard
 )
+from keyboards.callbacks import CategoryPick, Confirm, ProductAction, ProductsPage
+from handlers.dispatch import dispatch
+from handlers.orders import OrderStates, product_snapshot
 from utils.validators import is_valid_price, is_valid_quantity
 
 router = Router()
@@ -23,47 +32,93 @@ class ProductStates(StatesGroup):
     adding_category = State()
     editing_product = State()
     editing_field = State()
+    deleting_product = State()
 
-@router.message(F.text.in_(["📦 Товары", "📦 Products"]))
-async def products_menu(message: Message):
-    db: Session = next(get_db())
-    user = db.query(User).filter(User.telegram_id == message.from_user.id).first()
-    
-    if not user:
-        return
+# Field number in the edit menu -> Product attribute
+EDIT_FIELDS = {
+    '1': 'name',
+    '2': 'quantity',
+    '3': 'purchase_price',
+    '4': 'sale_price',
+    '5': 'category_id'
+}
+
+async def render_products_page(db: AsyncSession, user: CachedUser, cursor: int = 0, backwards: bool = False, page: int = 1):
+    """Keyset-paginated page of the catalog: products after `cursor` (or
+    before it when `backwards`), ordered by id. Returns (text, reply_markup)."""
+    page_size = config.PRODUCTS_PAGE_SIZE
+    query = (
+        select(Product.id, Product.name, Product.quantity, Product.sale_price, Category.name.label('category_name'))
+        .outerjoin(Category, Product.category_id == Category.id)
+        .where(Product.user_id == user.id)
+        .limit(page_size + 1)
+    )
+    if backwards:
+        query = query.where(Product.id < cursor).order_by(Product.id.desc())
+    else:
+        query = query.where(Product.id > cursor).order_by(Product.id)
+    
+    rows = (await db.execute(query)).all()
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if backwards:
+        rows.reverse()
+        has_prev, has_next = has_more, True
+    else:
+        has_prev, has_next = cursor > 0, has_more
     
-    products = db.query(Product).filter(Product.user_id == user.id).all()
+    if not rows:
+        if user.language == 'ru':
+            return "📦 У вас пока нет товаров.\n\nЧтобы добавить товар, нажмите 'Добавить товар'", None
+        return "📦 You have no products yet.\n\nTo add a product, click 'Add product'", None
     
+    first_number = (page - 1) * page_size + 1
     if user.language == 'ru':
-        if not products:
-            text = "📦 У вас пока нет товаров.\n\nЧтобы добавить товар, нажмите 'Добавить товар'"
-        else:
-            text = f"📦 Ваши товары ({len(products)}):\n\n"
-            for idx, product in enumerate(products, 1):
-                category_name = product.category.name if product.category else "Без категории"
-                text += f"{idx}. {product.name}\n"
-                text += f"   📊 Количество: {product.quantity}\n"
-                text += f"   💰 Цена: ${product.sale_price:.2f}\n"
-                text += f"   📁 Категория: {category_name}\n\n"
+        text = f"📦 Ваши товары (стр. {page}):\n\n"
+        for idx, row in enumerate(rows, first_number):
+            text += f"{idx}. {row.name}\n"
+            text += f"   📊 Количество: {row.quantity}\n"
+            text += f"   💰 Цена: ${row.sale_price:.2f}\n"
+            text += f"   📁 Категория: {row.category_name or 'Без категории'}\n\n"
     else:
-        if not products:
-            text = "📦 You have no products yet.\n\nTo add a product, click 'Add product'"
-        else:
-            text = f"📦 Your products ({len(products)}):\n\n"
-            for idx, product in enumerate(products, 1):
-                category_name = product.category.name if product.category else "No category"
-                text += f"{idx}. {product.name}\n"
-                text += f"   📊 Quantity: {product.quantity}\n"
-                text += f"   💰 Price: ${product.sale_price:.2f}\n"
-                text += f"   📁 Category: {category_name}\n\n"
+        text = f"📦 Your products (page {page}):\n\n"
+        for idx, row in enumerate(rows, first_number):
+            text += f"{idx}. {row.name}\n"
+            text += f"   📊 Quantity: {row.quantity}\n"
+            text += f"   💰 Price: ${row.sale_price:.2f}\n"
+            text += f"   📁 Category: {row.category_name or 'No category'}\n\n"
+    
+    keyboard = get_products_page_keyboard(
+        [row.id for row in rows], first_number, page, has_prev, has_next, user.language
+    )
+    return text, keyboard
+
+@dispatch.text(*button_texts(MAIN_MENU_TEXTS, 'products'))
+async def products_menu(message: Message, db: AsyncSession, user: CachedUser):
+    if not user:
+        return
     
-    await message.answer(text)
+    text, keyboard = await render_products_page(db, user)
+    await message.answer(text, reply_markup=keyboard)
 
-@router.message(F.text.in_(["➕ Добавить товар", "➕ Add product"]))
-async def add_product_start(message: Message, state: FSMContext):
-    db: Session = next(get_db())
-    user = db.query(User).filter(User.telegram_id == message.from_user.id).first()
+@dispatch.callback(ProductsPage)
+async def products_page(callback: CallbackQuery, callback_data: ProductsPage, db: AsyncSession, user: CachedUser):
+    if not user:
+        await callback.answer()
+        return
+    
+    text, keyboard = await render_products_page(
+        db, user, callback_data.cursor, callback_data.backwards, callback_data.page
+    )
+    if keyboard is None:
+        # The page emptied out (products were deleted meanwhile), start over
+        text, keyboard = await render_products_page(db, user)
     
+    await callback.message.edit_text(text, reply_markup=keyboard)
+    await callback.answer()
+
+@dispatch.text("➕ Добавить товар", "➕ Add product")
+async def add_product_start(message: Message, state: FSMContext, user: CachedUser):
     if not user:
         return
     
@@ -156,7 +211,7 @@ async def process_purchase_price(message: Message, state: FSMContext):
     await state.set_state(ProductStates.adding_sale_price)
 
 @router.message(ProductStates.adding_sale_price)
-async def process_sale_price(message: Message, state: FSMContext):
+async def process_sale_price(message: Message, state: FSMContext, db: AsyncSession, user: CachedUser):
     data = await state.get_data()
     language = data.get('language', 'ru')
     
@@ -183,12 +238,8 @@ async def process_sale_price(message: Message, state: FSMContext):
     
     await state.update_data(sale_price=sale_price, profit=profit)
     
-    db: Session = next(get_db())
-    user = db.query(User).filter(User.telegram_id == message.from_user.id).first()
-    
-    categories = db.query(Category).filter(Category.user_id == user.id).all()
-    
-    if categories:
+    picker = await get_categories_picker(db, user.id, language)
+    if picker.count:
         if language == 'ru':
             text = "📁 Выберите категорию для товара:"
         else:
@@ -196,19 +247,16 @@ async def process_sale_price(message: Message, state: FSMContext):
         
         await message.answer(
             text,
-            reply_markup=get_categories_keyboard(categories, language)
+            reply_markup=picker.markup
         )
         await state.set_state(ProductStates.adding_category)
     else:
-        await create_product(message, state, None)
+        await create_product(message, state, db, user, None)
 
-async def create_product(message: Message, state: FSMContext, category_id: int = None):
+async def create_product(message: Message, state: FSMContext, db: AsyncSession, user: CachedUser, category_id: int = None):
     data = await state.get_data()
     language = data.get('language', 'ru')
     
-    db: Session = next(get_db())
-    user = db.query(User).filter(User.telegram_id == message.from_user.id).first()
-    
     product = Product(
         name=data['name'],
         quantity=data['quantity'],
@@ -221,8 +269,8 @@ async def create_product(message: Message, state: FSMContext, category_id: int =
     product.calculate_profit()
     
     db.add(product)
-    db.commit()
-    
+    await db.commit()
+
     if language == 'ru':
         success_text = f"""✅ Товар успешно добавлен!
 
@@ -246,24 +294,22 @@ async def create_product(message: Message, state: FSMContext, category_id: int =
     )
     await state.clear()
 
-@router.callback_query(F.data.startswith("category_"))
-async def process_category_selection(callback: CallbackQuery, state: FSMContext):
-    category_id = int(callback.data.split("_")[1])
-    
-    await create_product(callback.message, state, category_id)
+@dispatch.callback(CategoryPick, ProductStates.adding_category)
+async def process_category_selection(callback: CallbackQuery, callback_data: CategoryPick, state: FSMContext, db: AsyncSession, user: CachedUser):
+    await create_product(callback.message, state, db, user, callback_data.id)
     await callback.answer()
 
-@router.callback_query(F.data == "confirm_yes")
-async def confirm_yes_price(callback: CallbackQuery, state: FSMContext):
+@dispatch.callback(Confirm, ProductStates.adding_sale_price)
+async def confirm_price(callback: CallbackQuery, callback_data: Confirm, state: FSMContext, db: AsyncSession, user: CachedUser):
+    if not callback_data.answer:
+        await confirm_no_price(callback, state)
+        return
+    
     data = await state.get_data()
     language = data.get('language', 'ru')
     
-    db: Session = next(get_db())
-    user = db.query(User).filter(User.telegram_id == callback.from_user.id).first()
-    
-    categories = db.query(Category).filter(Category.user_id == user.id).all()
-    
-    if categories:
+    picker = await get_categories_picker(db, user.id, language)
+    if picker.count:
         if language == 'ru':
             text = "📁 Выберите категорию для товара:"
         else:
@@ -271,15 +317,14 @@ async def confirm_yes_price(callback: CallbackQuery, state: FSMContext):
         
         await callback.message.edit_text(
             text,
-            reply_markup=get_categories_keyboard(categories, language)
+            reply_markup=picker.markup
         )
         await state.set_state(ProductStates.adding_category)
     else:
-        await create_product(callback.message, state, None)
+        await create_product(callback.message, state, db, user, None)
     
     await callback.answer()
 
-@router.callback_query(F.data == "confirm_no")
 async def confirm_no_price(callback: CallbackQuery, state: FSMContext):
     data = await state.get_data()
     language = data.get('language', 'ru')
@@ -293,30 +338,35 @@ async def confirm_no_price(callback: CallbackQuery, state: FSMContext):
     await state.set_state(ProductStates.adding_sale_price)
     await callback.answer()
 
-@router.callback_query(F.data.startswith("edit_product_"))
-async def edit_product_start(callback: CallbackQuery, state: FSMContext):
-    product_id = int(callback.data.split("_")[2])
-    
-    db: Session = next(get_db())
-    user = db.query(User).filter(User.telegram_id == callback.from_user.id).first()
-    
-    if not user:
+@dispatch.callback(ProductAction)
+async def product_action(callback: CallbackQuery, callback_data: ProductAction, state: FSMContext, db: AsyncSession, user: CachedUser):
+    if callback_data.action == 'edit':
+        await edit_product_start(callback, state, db, user, callback_data.id)
+    elif callback_data.action == 'delete':
+        await delete_product_start(callback, state, db, user, callback_data.id)
+    elif callback_data.action == 'sell':
+        await sell_product_start(callback, state, db, user, callback_data.id)
+    else:
         await callback.answer()
-        return
-    
-    product = db.query(Product).filter(
+
+async def get_user_product(db: AsyncSession, user: CachedUser, product_id: int):
+    return await db.scalar(select(Product).where(
         Product.id == product_id,
         Product.user_id == user.id
-    ).first()
+    ))
+
+async def answer_not_found(callback: CallbackQuery, language: str):
+    await callback.message.answer("❌ Товар не найден" if language == 'ru' else "❌ Product not found")
+    await callback.answer()
+
+async def edit_product_start(callback: CallbackQuery, state: FSMContext, db: AsyncSession, user: CachedUser, product_id: int):
+    if not user:
+        await callback.answer()
+        return
     
+    product = await get_user_product(db, user, product_id)
     if not product:
-        if user.language == 'ru':
-            text = "❌ Товар не найден"
-        else:
-            text = "❌ Product not found"
-        
-        await callback.message.answer(text)
-        await callback.answer()
+        await answer_not_found(callback, user.language)
         return
     
     if user.language == 'ru':
@@ -349,3 +399,218 @@ Enter field number to edit:"""
     await state.set_state(ProductStates.editing_product)
     await state.update_data(language=user.language, product_id=product_id)
     await callback.answer()
+
+async def cancel_edit(message: Message, state: FSMContext, language: str):
+    await state.clear()
+    await message.answer(
+        "🚫 Редактирование отменено" if language == 'ru' else "🚫 Editing cancelled",
+        reply_markup=get_main_menu_keyboard(language)
+    )
+
+@router.message(ProductStates.editing_product)
+async def process_edit_field(message: Message, state: FSMContext, db: AsyncSession, user: CachedUser):
+    data = await state.get_data()
+    language = data.get('language', 'ru')
+    
+    if message.text == ("❌ Отмена" if language == 'ru' else "❌ Cancel"):
+        await cancel_edit(message, state, language)
+        return
+    
+    field = EDIT_FIELDS.get((message.text or '').strip())
+    if field is None:
+        error_text = "❌ Введите номер поля от 1 до 5:" if language == 'ru' else "❌ Enter a field number from 1 to 5:"
+        await message.answer(error_text)
+        return
+    
+    await state.update_data(field=field)
+    await state.set_state(ProductStates.editing_field)
+    
+    if field == 'category_id':
+        picker = await get_categories_picker(db, user.id, language)
+        text = "📁 Выберите новую категорию:" if language == 'ru' else "📁 Choose the new category:"
+        await message.answer(text, reply_markup=picker.markup)
+        return
+    
+    if language == 'ru':
+        prompts = {
+            'name': "📝 Введите новое название:",
+            'quantity': "🔢 Введите новое количество:",
+            'purchase_price': "💰 Введите новую закупочную цену:",
+            'sale_price': "💰 Введите новую цену продажи:"
+        }
+    else:
+        prompts = {
+            'name': "📝 Enter the new name:",
+            'quantity': "🔢 Enter the new quantity:",
+            'purchase_price': "💰 Enter the new purchase price:",
+            'sale_price': "💰 Enter the new sale price:"
+        }
+    await message.answer(prompts[field])
+
+@router.message(ProductStates.editing_field)
+async def process_edit_value(message: Message, state: FSMContext, db: AsyncSession, user: CachedUser):
+    data = await state.get_data()
+    language = data.get('language', 'ru')
+    field = data.get('field')
+    
+    if message.text == ("❌ Отмена" if language == 'ru' else "❌ Cancel"):
+        await cancel_edit(message, state, language)
+        return
+    
+    value = (message.text or '').strip()
+    if field == 'name':
+        if len(value) < 2:
+            error_text = "❌ Название должно содержать минимум 2 символа:" if language == 'ru' else "❌ Name must be at least 2 characters:"
+            await message.answer(error_text)
+            return
+    elif field == 'quantity':
+        if not is_valid_quantity(value):
+            error_text = "❌ Пожалуйста, введите корректное количество (целое число):" if language == 'ru' else "❌ Please enter a valid quantity (whole number):"
+            await message.answer(error_text)
+            return
+        value = int(value)
+    elif field in ('purchase_price', 'sale_price'):
+        if not is_valid_price(value):
+            error_text = "❌ Пожалуйста, введите корректную цену:" if language == 'ru' else "❌ Please enter a valid price:"
+            await message.answer(error_text)
+            return
+        value = float(value)
+    else:
+        # The category is picked with the inline keyboard
+        await message.answer("📁 Выберите категорию кнопкой выше" if language == 'ru' else "📁 Pick a category with the buttons above")
+        return
+    
+    await save_product_field(message, state, db, user, field, value)
+
+@dispatch.callback(CategoryPick, ProductStates.editing_field)
+async def process_edit_category(callback: CallbackQuery, callback_data: CategoryPick, state: FSMContext, db: AsyncSession, user: CachedUser):
+    data = await state.get_data()
+    if data.get('field') != 'category_id':
+        await callback.answer()
+        return
+    
+    category_id = await db.scalar(select(Category.id).where(
+        Category.id == callback_data.id,
+        Category.user_id == user.id
+    ))
+    await callback.message.delete_reply_markup()
+    await save_product_field(callback.message, state, db, user, 'category_id', category_id)
+    await callback.answer()
+
+async def save_product_field(message: Message, state: FSMContext, db: AsyncSession, user: CachedUser, field: str, value):
+    data = await state.get_data()
+    language = data.get('language', 'ru')
+    
+    product = await get_user_product(db, user, data.get('product_id'))
+    if not product:
+        await state.clear()
+        await message.answer(
+            "❌ Товар не найден" if language == 'ru' else "❌ Product not found",
+            reply_markup=get_main_menu_keyboard(language)
+        )
+        return
+    
+    # Profit is recalculated before the update
+    setattr(product, field, value)
+    await db.commit()
+    
+    if language == 'ru':
+        text = f"""✅ Товар обновлен!
+
+📦 Название: {product.name}
+🔢 Количество: {product.quantity}
+💰 Закупочная цена: ${product.purchase_price:.2f}
+💰 Цена продажи: ${product.sale_price:.2f}
+📈 Прибыль: ${product.profit:.2f}"""
+    else:
+        text = f"""✅ Product updated!
+
+📦 Name: {product.name}
+🔢 Quantity: {product.quantity}
+💰 Purchase price: ${product.purchase_price:.2f}
+💰 Sale price: ${product.sale_price:.2f}
+📈 Profit: ${product.profit:.2f}"""
+    
+    await message.answer(text, reply_markup=get_main_menu_keyboard(language))
+    await state.clear()
+
+async def delete_product_start(callback: CallbackQuery, state: FSMContext, db: AsyncSession, user: CachedUser, product_id: int):
+    if not user:
+        await callback.answer()
+        return
+    
+    product = await get_user_product(db, user, product_id)
+    if not product:
+        await answer_not_found(callback, user.language)
+        return
+    
+    if user.language == 'ru':
+        text = f"🗑️ Удалить товар «{product.name}»? Заказы с ним сохранятся."
+    else:
+        text = f"🗑️ Delete the product \"{product.name}\"? Orders with it are kept."
+    
+    await callback.message.answer(text, reply_markup=get_yes_no_keyboard(user.language))
+    await state.set_state(ProductStates.deleting_product)
+    await state.update_data(language=user.language, product_id=product_id)
+    await callback.answer()
+
+@dispatch.callback(Confirm, ProductStates.deleting_product)
+async def confirm_delete_product(callback: CallbackQuery, callback_data: Confirm, state: FSMContext, db: AsyncSession, user: CachedUser):
+    data = await state.get_data()
+    language = data.get('language', 'ru')
+    product_id = data.get('product_id')
+    await state.clear()
+    await callback.message.delete_reply_markup()
+    
+    if not callback_data.answer:
+        await callback.message.answer(
+            "🚫 Удаление отменено" if language == 'ru' else "🚫 Deletion cancelled",
+            reply_markup=get_main_menu_keyboard(language)
+        )
+        await callback.answer()
+        return
+    
+    if await get_user_product(db, user, product_id):
+        # Order lines keep their prices and costs, only the link goes
+        await db.execute(update(OrderItem).where(OrderItem.product_id == product_id).values(product_id=None))
+        await db.execute(delete(Product).where(Product.id == product_id))
+        mark_store_changed(db, user.id)
+        await db.commit()
+        text = "✅ Товар удален" if language == 'ru' else "✅ Product deleted"
+    else:
+        text = "❌ Товар не найден" if language == 'ru' else "❌ Product not found"
+    
+    await callback.message.answer(text, reply_markup=get_main_menu_keyboard(language))
+    await callback.answer()
+
+async def sell_product_start(callback: CallbackQuery, state: FSMContext, db: AsyncSession, user: CachedUser, product_id: int):
+    """Starts an order of this one product at the quantity step of the
+    order flow."""
+    if not user:
+        await callback.answer()
+        return
+    
+    product = await get_user_product(db, user, product_id)
+    if not product:
+        await answer_not_found(callback, user.language)
+        return
+    
+    if product.quantity <= 0:
+        await callback.message.answer(
+            f"❌ Товара «{product.name}» нет в наличии" if user.language == 'ru' else f"❌ \"{product.name}\" is out of stock"
+        )
+        await callback.answer()
+        return
+    
+    if user.language == 'ru':
+        text = f"🔢 Введите количество: {product.name} (макс: {product.quantity})"
+    else:
+        text = f"🔢 Enter the quantity: {product.name} (max: {product.quantity})"
+    
+    await callback.message.answer(text)
+    await state.set_state(OrderStates.entering_quantities)
+    await state.update_data(
+        language=user.language,
+        selected_products={str(product.id): {"product": product_snapshot(product), "quantity": None}}
+    )
+    await callback.answer()
@@ -1,12 +1,16 @@
-from aiogram import Router, F
+from aiogram import Router
 from aiogram.types import Message, ReplyKeyboardRemove
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from database import get_db, User
+import config
+from database import User
 from keyboards.builders import get_main_menu_keyboard, get_cancel_keyboard
+from services.users import invalidate_user
 from utils.validators import is_valid_email
+from handlers.dispatch import dispatch
 
 router = Router()
 
@@ -14,7 +18,7 @@ class RegistrationStates(StatesGroup):
     waiting_for_email = State()
     waiting_for_store_name = State()
 
-@router.message(F.text.in_(["🇷🇺 Русский", "🇬🇧 English"]))
+@dispatch.text(*config.LANGUAGES.values())
 async def process_language_selection(message: Message, state: FSMContext):
     language_map = {
         "🇷🇺 Русский": "ru",
@@ -39,7 +43,7 @@ async def process_language_selection(message: Message, state: FSMContext):
     await state.set_state(RegistrationStates.waiting_for_email)
 
 @router.message(RegistrationStates.waiting_for_email)
-async def process_email(message: Message, state: FSMContext):
+async def process_email(message: Message, state: FSMContext, db: AsyncSession):
     data = await state.get_data()
     language = data.get('language', 'ru')
     
@@ -58,9 +62,8 @@ async def process_email(message: Message, state: FSMContext):
         await message.answer(error_text)
         return
     
-    db: Session = next(get_db())
-    existing_user = db.query(User).filter(User.email == email).first()
-    
+    existing_user = await db.scalar(select(User.id).where(User.email == email))
+
     if existing_user:
         error_text = "❌ Этот email уже зарегистрирован. Введите другой:" if language == 'ru' else "❌ This email is already registered. Enter another one:"
         await message.answer(error_text)
@@ -77,7 +80,7 @@ async def process_email(message: Message, state: FSMContext):
     await state.set_state(RegistrationStates.waiting_for_store_name)
 
 @router.message(RegistrationStates.waiting_for_store_name)
-async def process_store_name(message: Message, state: FSMContext):
+async def process_store_name(message: Message, state: FSMContext, db: AsyncSession):
     data = await state.get_data()
     language = data.get('language', 'ru')
     email = data.get('email')
@@ -89,8 +92,6 @@ async def process_store_name(message: Message, state: FSMContext):
         await message.answer(error_text)
         return
     
-    db: Session = next(get_db())
-    
     user = User(
         telegram_id=message.from_user.id,
         email=email,
@@ -99,8 +100,9 @@ async def process_store_name(message: Message, state: FSMContext):
     )
     
     db.add(user)
-    db.commit()
-    
+    await db.commit()
+    invalidate_user(message.from_user.id)
+
     if language == 'ru':
         success_text = f"""✅ Регистрация завершена!
 
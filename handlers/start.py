@@ -1,18 +1,13 @@
-from aiogram import Router, F
+from aiogram import Router
 from aiogram.types import Message
 from aiogram.filters import CommandStart
-from sqlalchemy.orm import Session
-from database import get_db, User
-from keyboards.builders import get_language_keyboard
+from services.users import CachedUser
+from keyboards.builders import get_language_keyboard, get_main_menu_keyboard
 
 router = Router()
 
 @router.message(CommandStart())
-async def cmd_start(message: Message):
-    db: Session = next(get_db())
-    
-    user = db.query(User).filter(User.telegram_id == message.from_user.id).first()
-    
+async def cmd_start(message: Message, user: CachedUser):
     if user:
         from handlers.language import get_main_menu_text
         await message.answer(
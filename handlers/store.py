@@ -1,10 +1,14 @@
-from aiogram import Router, F
+from aiogram import Router
+from aiogram.filters import Command, CommandObject
 from aiogram.types import Message
-from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from database import get_db, User
+from database import User, Product, Order
+from services.users import CachedUser
+from keyboards.builders import MAIN_MENU_TEXTS, button_texts
+from handlers.dispatch import dispatch
 
 router = Router()
 
@@ -12,33 +16,65 @@ class StoreStates(StatesGroup):
     changing_name = State()
     changing_email = State()
 
-@router.message(F.text.in_(["🏪 Мой магазин", "🏪 My Store"]))
-async def store_info(message: Message):
-    db: Session = next(get_db())
-    user = db.query(User).filter(User.telegram_id == message.from_user.id).first()
-    
+@dispatch.text(*button_texts(MAIN_MENU_TEXTS, 'store'))
+async def store_info(message: Message, db: AsyncSession, user: CachedUser):
     if not user:
         return
     
+    profile = await db.get(User, user.id)
+    products_count = await db.scalar(select(func.count(Product.id)).where(Product.user_id == user.id))
+    orders_count = await db.scalar(select(func.count(Order.id)).where(Order.user_id == user.id))
+
     if user.language == 'ru':
         text = f"""🏪 Информация о магазине:
 
 📋 Название: {user.store_name}
-📧 Email: {user.email}
+📧 Email: {profile.email}
 🌍 Язык: {'🇷🇺 Русский' if user.language == 'ru' else '🇬🇧 English'}
-📅 Дата регистрации: {user.created_at.strftime('%d.%m.%Y')}
+📅 Дата регистрации: {profile.created_at.strftime('%d.%m.%Y')}
 
-Всего товаров: {len(user.products)}
-Всего заказов: {len(user.orders)}"""
+Всего товаров: {products_count}
+Всего заказов: {orders_count}
+⚠️ Порог остатка: {profile.low_stock_threshold or 'выкл.'} (/lowstock)"""
     else:
         text = f"""🏪 Store Information:
 
 📋 Name: {user.store_name}
-📧 Email: {user.email}
+📧 Email: {profile.email}
 🌍 Language: {'🇷🇺 Russian' if user.language == 'ru' else '🇬🇧 English'}
-📅 Registration date: {user.created_at.strftime('%d.%m.%Y')}
+📅 Registration date: {profile.created_at.strftime('%d.%m.%Y')}
 
-Total products: {len(user.products)}
-Total orders: {len(user.orders)}"""
+Total products: {products_count}
+Total orders: {orders_count}
+⚠️ Low-stock threshold: {profile.low_stock_threshold or 'off'} (/lowstock)"""
     
     await message.answer(text)
+
+@router.message(Command("lowstock"))
+async def set_low_stock_threshold(message: Message, command: CommandObject, db: AsyncSession, user: CachedUser):
+    if not user:
+        return
+    
+    profile = await db.get(User, user.id)
+    args = (command.args or '').strip()
+    if not args.isdigit():
+        if user.language == 'ru':
+            text = f"""⚠️ Порог остатка: {profile.low_stock_threshold or 'выкл.'}
+
+Бот пришлет уведомление, когда количество товара станет меньше порога.
+/lowstock 5 — установить порог, /lowstock 0 — отключить уведомления"""
+        else:
+            text = f"""⚠️ Low-stock threshold: {profile.low_stock_threshold or 'off'}
+
+The bot notifies you when a product's quantity drops below the threshold.
+/lowstock 5 sets the threshold, /lowstock 0 turns alerts off"""
+        await message.answer(text)
+        return
+    
+    profile.low_stock_threshold = int(args)
+    await db.commit()
+    
+    if user.language == 'ru':
+        await message.answer(f"✅ Порог остатка: {profile.low_stock_threshold or 'выкл.'}")
+    else:
+        await message.answer(f"✅ Low-stock threshold: {profile.low_stock_threshold or 'off'}")
@@ -0,0 +1,49 @@
+from typing import Optional
+
+from aiogram import Bot
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+import config
+from services.notifications import Notifier
+from .maintenance import wal_checkpoint, analyze, incremental_vacuum
+from .low_stock import check_low_stock
+
+def create_scheduler(engine: AsyncEngine, bot: Optional[Bot] = None) -> AsyncIOScheduler:
+    """Background jobs of the bot. Call start() once the event loop runs.
+    Jobs that message users are only scheduled when `bot` is given."""
+    scheduler = AsyncIOScheduler()
+    job_options = {'coalesce': True, 'max_instances': 1}
+    
+    if bot is not None and config.LOW_STOCK_INTERVAL:
+        scheduler.add_job(
+            check_low_stock, 'interval', args=[engine, Notifier(bot), config.LOW_STOCK_BATCH_SIZE],
+            seconds=config.LOW_STOCK_INTERVAL, id='low_stock', **job_options
+        )
+    
+    if engine.dialect.name == 'sqlite':
+        if config.WAL_CHECKPOINT_INTERVAL:
+            scheduler.add_job(
+                wal_checkpoint, 'interval', args=[engine],
+                seconds=config.WAL_CHECKPOINT_INTERVAL, id='wal_checkpoint', **job_options
+            )
+        if config.ANALYZE_INTERVAL:
+            scheduler.add_job(
+                analyze, 'interval', args=[engine],
+                seconds=config.ANALYZE_INTERVAL, id='analyze', **job_options
+            )
+        if config.VACUUM_INTERVAL:
+            scheduler.add_job(
+                incremental_vacuum, 'interval', args=[engine, config.VACUUM_PAGES],
+                seconds=config.VACUUM_INTERVAL, id='incremental_vacuum', **job_options
+            )
+    
+    return scheduler
+
+__all__ = [
+    'create_scheduler',
+    'wal_checkpoint',
+    'analyze',
+    'incremental_vacuum',
+    'check_low_stock'
+]
@@ -0,0 +1,148 @@
+import html
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from sqlalchemy import select, insert, delete, exists, tuple_
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from database import LowStockAlert, Product, User
+from services.notifications import Delivery, Notifier
+from services.users import set_users_active
+
+logger = logging.getLogger(__name__)
+
+# Products listed in one alert; the rest are summarized
+ALERT_ITEMS_SHOWN = 20
+# Product names are cut to this many characters in alerts
+ALERT_NAME_LENGTH = 100
+# Telegram's limit on message text
+MAX_MESSAGE_LENGTH = 4096
+# Room kept for the "...and N more" line
+SUMMARY_RESERVE = 40
+
+@dataclass
+class StoreAlert:
+    telegram_id: int
+    language: str
+    products: List[tuple] = field(default_factory=list)
+
+    def text(self) -> str:
+        """The alert, listing up to ALERT_ITEMS_SHOWN products and never
+        longer than a Telegram message, so it can't fail on every run."""
+        if self.language == 'ru':
+            text, line, more = "⚠️ Заканчиваются товары:\n", "\n• {name} — {quantity} шт.", "\n\n...и еще {hidden}"
+        else:
+            text, line, more = "⚠️ Running low on stock:\n", "\n• {name} — {quantity} left", "\n\n...and {hidden} more"
+
+        shown = 0
+        for _, name, quantity in self.products[:ALERT_ITEMS_SHOWN]:
+            if len(name) > ALERT_NAME_LENGTH:
+                name = name[:ALERT_NAME_LENGTH - 1] + "…"
+            entry = line.format(name=html.escape(name), quantity=quantity)
+            if len(text) + len(entry) > MAX_MESSAGE_LENGTH - SUMMARY_RESERVE:
+                break
+            text += entry
+            shown += 1
+
+        hidden = len(self.products) - shown
+        if hidden:
+            text += more.format(hidden=hidden)
+        return text
+
+def low_stock_query(after_user_id: int, after_product_id: int, limit: int):
+    """Products under their store's threshold that were not alerted yet,
+    across all stores, in (user_id, id) order from the given keyset cursor.
+
+    Each store is read with a range scan of ix_products_user_id_quantity
+    and the matches are then sorted (a temp B-tree on SQLite): no index can
+    give both the quantity range and the id order. Only products under the
+    threshold are sorted, which keeps the sort small."""
+    return (
+        select(Product.user_id, Product.id, Product.name, Product.quantity, User.telegram_id, User.language)
+        .join(User, User.id == Product.user_id)
+        .outerjoin(LowStockAlert, LowStockAlert.product_id == Product.id)
+        .where(
+            User.is_active.is_(True),
+            User.low_stock_threshold > 0,
+            Product.quantity < User.low_stock_threshold,
+            LowStockAlert.product_id.is_(None),
+            tuple_(Product.user_id, Product.id) > tuple_(after_user_id, after_product_id)
+        )
+        .order_by(Product.user_id, Product.id)
+        .limit(limit)
+    )
+
+def restocked_alerts_query():
+    """Alerts whose product was restocked, deleted or is no longer watched."""
+    still_low = (
+        select(Product.id)
+        .join(User, User.id == Product.user_id)
+        .where(
+            Product.id == LowStockAlert.product_id,
+            Product.quantity < User.low_stock_threshold
+        )
+    )
+    return delete(LowStockAlert).where(~exists(still_low))
+
+async def check_low_stock(engine: AsyncEngine, notifier: Notifier, batch_size: int):
+    """Alerts every store about products that dropped below its threshold.
+
+    Reads `batch_size` products per query and notifies the stores completed
+    by each page before reading the next one, so a run holds no long
+    transaction and only one page of stores in memory.
+    """
+    async with engine.begin() as conn:
+        reset = (await conn.execute(restocked_alerts_query())).rowcount
+
+    stores: Dict[int, StoreAlert] = {}
+    cursor = (0, 0)
+    alerted = stores_alerted = 0
+
+    while True:
+        async with engine.connect() as conn:
+            rows = (await conn.execute(low_stock_query(*cursor, batch_size))).all()
+
+        for user_id, product_id, name, quantity, telegram_id, language in rows:
+            store = stores.setdefault(user_id, StoreAlert(telegram_id, language))
+            store.products.append((product_id, name, quantity))
+
+        last_page = len(rows) < batch_size
+        if rows:
+            cursor = (rows[-1].user_id, rows[-1].id)
+        # The last store of a full page may continue on the next one
+        ready = stores if last_page else {
+            user_id: store for user_id, store in stores.items() if user_id != cursor[0]
+        }
+
+        if ready:
+            alerted += await _notify(engine, notifier, ready)
+            stores_alerted += len(ready)
+            stores = {user_id: store for user_id, store in stores.items() if user_id not in ready}
+
+        if last_page:
+            break
+
+    logger.info(f"Low-stock check: {alerted} products alerted in {stores_alerted} stores, {reset} alerts reset")
+
+async def _notify(engine: AsyncEngine, notifier: Notifier, stores: Dict[int, StoreAlert]) -> int:
+    user_ids = list(stores)
+    deliveries = await notifier.send_many((stores[user_id].telegram_id, stores[user_id].text()) for user_id in user_ids)
+
+    # Failed stores are retried by the next run; blocked ones are skipped
+    # until their owner writes to the bot again
+    alerts = [
+        {'product_id': product_id, 'user_id': user_id, 'quantity': quantity}
+        for user_id, delivery in zip(user_ids, deliveries) if delivery is Delivery.SENT
+        for product_id, _, quantity in stores[user_id].products
+    ]
+    blocked = [
+        stores[user_id].telegram_id
+        for user_id, delivery in zip(user_ids, deliveries) if delivery is Delivery.BLOCKED
+    ]
+    if alerts or blocked:
+        async with engine.begin() as conn:
+            if alerts:
+                await conn.execute(insert(LowStockAlert), alerts)
+            await set_users_active(conn, blocked, False)
+    return len(alerts)
@@ -0,0 +1,39 @@
+import logging
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+async def wal_checkpoint(engine: AsyncEngine):
+    """Folds the WAL back into the database file and truncates it, so it
+    does not grow without bound while readers keep old snapshots open."""
+    async with engine.connect() as conn:
+        busy, log_frames, checkpointed = (await conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")).one()
+    if busy:
+        logger.warning(f"WAL checkpoint blocked by readers: {checkpointed}/{log_frames} frames written")
+    else:
+        logger.debug(f"WAL checkpoint: {checkpointed}/{log_frames} frames written")
+
+async def analyze(engine: AsyncEngine):
+    """Refreshes planner statistics for tables whose contents changed."""
+    async with engine.connect() as conn:
+        await conn.exec_driver_sql("PRAGMA analysis_limit=1000")
+        await conn.exec_driver_sql("PRAGMA optimize")
+    logger.debug("Planner statistics refreshed")
+
+async def incremental_vacuum(engine: AsyncEngine, pages: int):
+    """Returns up to `pages` free pages to the file system. Needs
+    auto_vacuum=INCREMENTAL: new databases are created with it and older
+    ones are switched by migration 6."""
+    async with engine.connect() as conn:
+        mode = (await conn.exec_driver_sql("PRAGMA auto_vacuum")).scalar()
+        if mode != 2:
+            logger.debug("Incremental vacuum skipped: auto_vacuum is not INCREMENTAL")
+            return
+        freelist = (await conn.exec_driver_sql("PRAGMA freelist_count")).scalar()
+        if freelist:
+            # A prepared statement only frees one page per step; executescript
+            # runs the pragma to completion
+            raw = await conn.get_raw_connection()
+            await raw.driver_connection.executescript(f"PRAGMA incremental_vacuum({int(pages)});")
+            logger.debug(f"Incremental vacuum: {min(freelist, pages)} of {freelist} free pages released")
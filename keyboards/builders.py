@@ -0,0 +1,171 @@
+from aiogram.utils.keyboard import ReplyKeyboardBuilder, InlineKeyboardBuilder
+from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup
+from typing import Dict, List
+import config
+from keyboards.callbacks import AnalyticsPeriod, Confirm, CategoryPick, AddCategory, ProductAction, ProductsPage
+
+MAIN_MENU_TEXTS = {
+    'ru': {
+        'store': '🏪 Мой магазин',
+        'products': '📦 Товары',
+        'categories': '📁 Категории',
+        'orders': '💰 Заказы',
+        'analytics': '📊 Аналитика',
+        'settings': '⚙️ Настройки'
+    },
+    'en': {
+        'store': '🏪 My Store',
+        'products': '📦 Products',
+        'categories': '📁 Categories',
+        'orders': '💰 Orders',
+        'analytics': '📊 Analytics',
+        'settings': '⚙️ Settings'
+    }
+}
+
+CANCEL_TEXTS = {
+    'ru': '❌ Отмена',
+    'en': '❌ Cancel'
+}
+
+ANALYTICS_PERIOD_TEXTS = {
+    'ru': {
+        'day': '📅 День',
+        'week': '📆 Неделя',
+        'month': '📊 Месяц',
+        'year': '📈 Год',
+        'all': '⏳ Все время',
+        'custom': '📅 Выбрать период'
+    },
+    'en': {
+        'day': '📅 Day',
+        'week': '📆 Week',
+        'month': '📊 Month',
+        'year': '📈 Year',
+        'all': '⏳ All time',
+        'custom': '📅 Custom period'
+    }
+}
+
+YES_NO_TEXTS = {
+    'ru': {'yes': '✅ Да', 'no': '❌ Нет'},
+    'en': {'yes': '✅ Yes', 'no': '❌ No'}
+}
+
+ADD_CATEGORY_TEXTS = {
+    'ru': '➕ Добавить категорию',
+    'en': '➕ Add category'
+}
+
+def button_texts(texts: Dict[str, Dict[str, str]], key: str) -> List[str]:
+    """All translations of one button, e.g. for routing its text."""
+    return [text_dict[key] for text_dict in texts.values()]
+
+def get_language_keyboard() -> ReplyKeyboardMarkup:
+    builder = ReplyKeyboardBuilder()
+    for lang_code, lang_name in config.LANGUAGES.items():
+        builder.add(KeyboardButton(text=lang_name))
+    builder.adjust(2)
+    return builder.as_markup(resize_keyboard=True)
+
+def get_main_menu_keyboard(language: str = 'ru') -> ReplyKeyboardMarkup:
+    builder = ReplyKeyboardBuilder()
+    text_dict = MAIN_MENU_TEXTS.get(language, MAIN_MENU_TEXTS['ru'])
+    
+    builder.add(KeyboardButton(text=text_dict['store']))
+    builder.add(KeyboardButton(text=text_dict['products']))
+    builder.add(KeyboardButton(text=text_dict['categories']))
+    builder.add(KeyboardButton(text=text_dict['orders']))
+    builder.add(KeyboardButton(text=text_dict['analytics']))
+    builder.add(KeyboardButton(text=text_dict['settings']))
+    builder.adjust(2, 2, 2)
+    
+    return builder.as_markup(resize_keyboard=True)
+
+def get_cancel_keyboard(language: str = 'ru') -> ReplyKeyboardMarkup:
+    builder = ReplyKeyboardBuilder()
+    builder.add(KeyboardButton(text=CANCEL_TEXTS.get(language, CANCEL_TEXTS['ru'])))
+    return builder.as_markup(resize_keyboard=True)
+
+def get_analytics_period_keyboard(language: str = 'ru') -> InlineKeyboardMarkup:
+    builder = InlineKeyboardBuilder()
+    text_dict = ANALYTICS_PERIOD_TEXTS.get(language, ANALYTICS_PERIOD_TEXTS['ru'])
+    
+    for period, text in text_dict.items():
+        builder.button(text=text, callback_data=AnalyticsPeriod(period=period))
+    
+    builder.adjust(2, 2, 2)
+    return builder.as_markup()
+
+def get_yes_no_keyboard(language: str = 'ru') -> InlineKeyboardMarkup:
+    builder = InlineKeyboardBuilder()
+    text_dict = YES_NO_TEXTS.get(language, YES_NO_TEXTS['ru'])
+    
+    builder.button(text=text_dict['yes'], callback_data=Confirm(answer=True))
+    builder.button(text=text_dict['no'], callback_data=Confirm(answer=False))
+    builder.adjust(2)
+    
+    return builder.as_markup()
+
+PRODUCT_ACTION_TEXTS = {
+    'ru': {
+        'edit': '✏️ Редактировать',
+        'delete': '🗑️ Удалить',
+        'sell': '💰 Продать'
+    },
+    'en': {
+        'edit': '✏️ Edit',
+        'delete': '🗑️ Delete',
+        'sell': '💰 Sell'
+    }
+}
+
+PAGINATION_TEXTS = {
+    'ru': {'prev': '⬅️ Назад', 'next': 'Далее ➡️'},
+    'en': {'prev': '⬅️ Back', 'next': 'Next ➡️'}
+}
+
+def get_products_page_keyboard(
+    product_ids: List[int],
+    first_number: int,
+    page: int,
+    has_prev: bool,
+    has_next: bool,
+    language: str = 'ru'
+) -> InlineKeyboardMarkup:
+    """One row of action buttons per listed product (labelled with its number
+    in the list) followed by the prev/next buttons, which carry the keyset
+    cursor: the first id of the page going back, the last one going forward."""
+    builder = InlineKeyboardBuilder()
+    text_dict = PRODUCT_ACTION_TEXTS.get(language, PRODUCT_ACTION_TEXTS['ru'])
+    nav_dict = PAGINATION_TEXTS.get(language, PAGINATION_TEXTS['ru'])
+    
+    for number, product_id in enumerate(product_ids, first_number):
+        for action in ('edit', 'delete', 'sell'):
+            icon = text_dict[action].split()[0]
+            builder.button(text=f"{number}. {icon}", callback_data=ProductAction(action=action, id=product_id))
+    
+    nav_buttons = 0
+    if has_prev:
+        builder.button(text=nav_dict['prev'], callback_data=ProductsPage(cursor=product_ids[0], backwards=True, page=page - 1))
+        nav_buttons += 1
+    if has_next:
+        builder.button(text=nav_dict['next'], callback_data=ProductsPage(cursor=product_ids[-1], backwards=False, page=page + 1))
+        nav_buttons += 1
+    
+    builder.adjust(*([3] * len(product_ids)), *([nav_buttons] if nav_buttons else []))
+    return builder.as_markup()
+
+def get_categories_keyboard(categories: List, language: str = 'ru') -> InlineKeyboardMarkup:
+    builder = InlineKeyboardBuilder()
+    
+    for category in categories:
+        builder.button(text=category.name, callback_data=CategoryPick(id=category.id))
+    
+    builder.button(
+        text=ADD_CATEGORY_TEXTS.get(language, ADD_CATEGORY_TEXTS['ru']),
+        callback_data=AddCategory()
+    )
+    
+    builder.adjust(1)
+    return builder.as_markup()
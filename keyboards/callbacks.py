@@ -0,0 +1,25 @@
+from aiogram.filters.callback_data import CallbackData
+
+# Prefixes are kept to one or two characters: callback data is limited
+# to 64 bytes and every prefix is a key of the dispatch table.
+
+class AnalyticsPeriod(CallbackData, prefix='ap'):
+    period: str
+
+class Confirm(CallbackData, prefix='y'):
+    answer: bool
+
+class CategoryPick(CallbackData, prefix='c'):
+    id: int
+
+class AddCategory(CallbackData, prefix='ac'):
+    pass
+
+class ProductAction(CallbackData, prefix='p'):
+    action: str
+    id: int
+
+class ProductsPage(CallbackData, prefix='pg'):
+    cursor: int
+    backwards: bool
+    page: int
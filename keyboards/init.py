@@ -3,7 +3,6 @@ from .builders import (
     get_main_menu_keyboard,
     get_cancel_keyboard,
     get_analytics_period_keyboard,
-    get_product_actions_keyboard,
     get_categories_keyboard,
     get_yes_no_keyboard
 )
@@ -13,7 +12,6 @@ __all__ = [
     'get_main_menu_keyboard',
     'get_cancel_keyboard',
     'get_analytics_period_keyboard',
-    'get_product_actions_keyboard',
     'get_categories_keyboard',
     'get_yes_no_keyboard'
 ]
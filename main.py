@@ -1,12 +1,28 @@
 import asyncio
 import logging
 import os
+import signal
+from contextlib import suppress
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
-from aiogram.fsm.storage.memory import MemoryStorage
-from database import create_tables
-from handlers import routers
+import config
+from database import create_tables, engine, SessionLocal
+from handlers import dispatch, routers
+from jobs import create_scheduler
+from migrations import run_migrations
+from services.broadcasts import resume_broadcasts, stop_broadcasts
+from services.notifications import Notifier
+from keyboards import callbacks
+from keyboards.builders import MAIN_MENU_TEXTS, button_texts
+from middlewares import (
+    ApiMetricsMiddleware, DbSessionMiddleware, HandlerMetricsMiddleware, OutboundQueue,
+    QueryBudgetMiddleware, QueryTagMiddleware, TraceApiMiddleware, TraceHandlerMiddleware,
+    TraceMiddleware, UpdateMetricsMiddleware, UserMiddleware
+)
+import monitoring
+from storage import create_storage
+from web import create_app, start_server
 
 logging.basicConfig(
     level=logging.INFO,
@@ -14,9 +30,91 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def create_dispatcher() -> Dispatcher:
+    storage = create_storage()
+    dp = Dispatcher(storage=storage)
+    monitoring.install_db_metrics(engine)
+    monitoring.install_tracing(engine)
+    # Outermost, so the dispatch span covers every other middleware
+    dp.update.outer_middleware(TraceMiddleware())
+    dp.update.outer_middleware(UpdateMetricsMiddleware())
+    for name, observer in dp.observers.items():
+        if name not in ('update', 'error'):
+            observer.middleware(HandlerMetricsMiddleware())
+            observer.middleware(TraceHandlerMiddleware())
+    if config.QUERY_MONITORING:
+        monitoring.install(engine)
+        dp.update.outer_middleware(QueryBudgetMiddleware(
+            config.QUERY_BUDGET, config.QUERY_REPEAT_THRESHOLD, config.QUERY_BUDGET_RAISE
+        ))
+        for name, observer in dp.observers.items():
+            if name not in ('update', 'error'):
+                observer.middleware(QueryTagMiddleware())
+    dp.update.outer_middleware(DbSessionMiddleware(SessionLocal))
+    dp.update.outer_middleware(UserMiddleware())
+    
+    dispatch.validate(
+        required_texts=[
+            *config.LANGUAGES.values(),
+            *(text for key in MAIN_MENU_TEXTS['ru'] for text in button_texts(MAIN_MENU_TEXTS, key))
+        ],
+        required_callbacks=[
+            callbacks.AnalyticsPeriod, callbacks.Confirm, callbacks.CategoryPick,
+            callbacks.AddCategory, callbacks.ProductAction, callbacks.ProductsPage
+        ]
+    )
+    for router in routers:
+        dp.include_router(router)
+    
+    return dp
+
+async def run_webhook(dp: Dispatcher, bot: Bot):
+    webhook_url = config.WEBHOOK_URL + config.WEBHOOK_PATH
+    
+    async def on_startup(bot: Bot):
+        await bot.set_webhook(
+            webhook_url,
+            secret_token=config.WEBHOOK_SECRET or None,
+            allowed_updates=dp.resolve_used_update_types()
+        )
+        logger.info(f"Webhook set to {webhook_url}")
+    
+    dp.startup.register(on_startup)
+    runner = await start_server(create_app(dp, bot, config.WEBHOOK_PATH, config.WEBHOOK_SECRET), config.WEB_HOST, config.PORT)
+    logger.info(f"Listening for webhook updates on {config.WEB_HOST}:{config.PORT}")
+    # Same stop path as polling: the redeploy's SIGTERM ends the wait, and
+    # cleanup runs the dispatcher's shutdown, which flushes the FSM storage
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        with suppress(NotImplementedError):
+            loop.add_signal_handler(sig, stop_event.set)
+    try:
+        await stop_event.wait()
+        logger.info("Stop signal received, shutting down")
+    finally:
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            with suppress(NotImplementedError):
+                loop.remove_signal_handler(sig)
+        await runner.cleanup()
+        await bot.session.close()
+
+async def run_polling(dp: Dispatcher, bot: Bot):
+    # Keep the health check answering while polling
+    runner = await start_server(create_app(dp, bot), config.WEB_HOST, config.PORT)
+    try:
+        await bot.delete_webhook()
+        await dp.start_polling(bot)
+    finally:
+        await runner.cleanup()
+
+async def prepare_database():
+    await create_tables()
+    applied = await run_migrations(engine)
+    logger.info(f"Database ready, applied migrations: {applied or 'none'}")
+
 async def main():
-    create_tables()
-    logger.info("Database tables created")
+    await prepare_database()
     
     bot_token = os.getenv("BOT_TOKEN")
     if not bot_token:
@@ -24,14 +122,34 @@ async def main():
         return
     
     bot = Bot(token=bot_token, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
-    storage = MemoryStorage()
-    dp = Dispatcher(storage=storage)
+    outbound = OutboundQueue()
+    bot.session.middleware(outbound)
+    # Inside the queue, so API latency excludes the wait for a token
+    bot.session.middleware(ApiMetricsMiddleware())
+    bot.session.middleware(TraceApiMiddleware())
     
-    for router in routers:
-        dp.include_router(router)
+    async def collect_outbound():
+        for stat, value in outbound.stats().items():
+            monitoring.metrics.OUTBOUND.set(value, stat=stat)
+    monitoring.registry.add_collector(collect_outbound)
+    dp = create_dispatcher()
+    scheduler = create_scheduler(engine, bot)
+    scheduler.start()
+    resumed = await resume_broadcasts(engine, Notifier(bot))
+    if resumed:
+        logger.info(f"Resumed broadcasts: {resumed}")
     
     logger.info("Bot starting...")
-    await dp.start_polling(bot)
+    try:
+        if config.WEBHOOK_URL:
+            await run_webhook(dp, bot)
+        else:
+            await run_polling(dp, bot)
+    finally:
+        scheduler.shutdown(wait=False)
+        await stop_broadcasts()
+        await outbound.close()
+        await engine.dispose()
 
 if __name__ == "__main__":
     asyncio.run(main())
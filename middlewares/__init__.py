@@ -0,0 +1,22 @@
+from .database import DbSessionMiddleware
+from .queries import QueryBudgetMiddleware, QueryTagMiddleware
+from .user import UserMiddleware
+from .metrics import ApiMetricsMiddleware, HandlerMetricsMiddleware, UpdateMetricsMiddleware
+from .outbound import OutboundQueue, Priority, background_priority
+from .tracing import TraceApiMiddleware, TraceHandlerMiddleware, TraceMiddleware
+
+__all__ = [
+    'DbSessionMiddleware',
+    'QueryBudgetMiddleware',
+    'QueryTagMiddleware',
+    'UserMiddleware',
+    'ApiMetricsMiddleware',
+    'HandlerMetricsMiddleware',
+    'UpdateMetricsMiddleware',
+    'OutboundQueue',
+    'Priority',
+    'background_priority',
+    'TraceApiMiddleware',
+    'TraceHandlerMiddleware',
+    'TraceMiddleware'
+]
@@ -0,0 +1,74 @@
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import TelegramObject, Update
+
+from monitoring.metrics import API_DURATION, API_ERRORS, HANDLER_DURATION, HANDLER_ERRORS, UPDATES
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """Outer update middleware counting every update by type."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        UPDATES.inc(type=event.event_type if isinstance(event, Update) else type(event).__name__)
+        return await handler(event, data)
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Inner middleware timing the handler that took the event.
+
+    Labelled by the handler's module (one router per module) and name; for
+    the dispatch table that is the resolved route, not the dispatcher.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        handler_object = data.get('route') or data.get('handler')
+        callback = handler_object.callback if handler_object is not None else handler
+        labels = {
+            'router': callback.__module__.rsplit('.', 1)[-1],
+            'handler': getattr(callback, '__name__', type(callback).__name__)
+        }
+
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            HANDLER_ERRORS.inc(**labels)
+            raise
+        finally:
+            HANDLER_DURATION.observe(time.perf_counter() - started, **labels)
+
+class ApiMetricsMiddleware(BaseRequestMiddleware):
+    """Request middleware timing Bot API calls and counting their errors.
+
+    Register after OutboundQueue so queueing time is not counted.
+    """
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType]
+    ) -> Response[TelegramType]:
+        name = type(method).__name__
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as error:
+            # Telegram errors and network failures alike
+            API_ERRORS.inc(method=name, error=type(error).__name__)
+            raise
+        finally:
+            API_DURATION.observe(time.perf_counter() - started, method=name)
@@ -0,0 +1,214 @@
+import asyncio
+import itertools
+import logging
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Dict, Optional
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+
+import config
+from utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+class Priority(IntEnum):
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+# Priority of the API calls made by the current task
+send_priority: ContextVar[Priority] = ContextVar('send_priority', default=Priority.INTERACTIVE)
+
+@contextmanager
+def background_priority():
+    """Marks the sends inside the block as background traffic."""
+    token = send_priority.set(Priority.BACKGROUND)
+    try:
+        yield
+    finally:
+        send_priority.reset(token)
+
+class TokenBucket:
+    """`rate` tokens per second, holding at most `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self) -> float:
+        """Seconds until a token is available."""
+        self._refill()
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+    def consume(self):
+        self.tokens -= 1
+
+    def reserve(self) -> float:
+        """Takes a token now, possibly on credit; returns how long to wait for it."""
+        self._refill()
+        self.tokens -= 1
+        return max(0.0, -self.tokens / self.rate)
+
+    def pause(self, seconds: float):
+        """No token is available until `seconds` from now."""
+        self._refill()
+        self.tokens = min(self.tokens, 1 - seconds * self.rate)
+
+class OutboundQueue(BaseRequestMiddleware):
+    """Request middleware that queues every API call addressed to a chat.
+
+    A call first waits for its chat's bucket (Telegram allows about one
+    message per second per chat, with short bursts), then for a token of
+    the bot-wide bucket. Global tokens are handed out by one pump task in
+    priority order, so interactive replies overtake queued background
+    notifications. RetryAfter pauses that chat's bucket for the requested
+    time and the call is queued again; only when several chats hit it
+    within a short window, i.e. the whole bot is flooding, does it pause
+    the bot-wide bucket too.
+
+    Register with `bot.session.middleware(...)`; close() stops the pump.
+    """
+
+    def __init__(
+        self,
+        rate: float = config.OUTBOUND_RATE,
+        chat_rate: float = config.OUTBOUND_CHAT_RATE,
+        chat_burst: int = config.OUTBOUND_CHAT_BURST,
+        max_retries: int = 3,
+        flood_chats: int = config.OUTBOUND_FLOOD_CHATS,
+        flood_window: float = config.OUTBOUND_FLOOD_WINDOW
+    ):
+        self.global_bucket = TokenBucket(rate, capacity=rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self.flood_chats = flood_chats
+        self.flood_window = flood_window
+        # (monotonic time, chat id) of recent RetryAfter errors
+        self._retry_afters: deque = deque()
+        # An evicted bucket was idle long enough to be full again
+        self.chat_buckets = TTLCache(maxsize=config.OUTBOUND_CHATS_TRACKED)
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._pump_task: Optional[asyncio.Task] = None
+        self._order = itertools.count()
+
+        # Metrics
+        self.queued: Counter = Counter()
+        self.sent: Counter = Counter()
+        self.wait_seconds: Counter = Counter()
+        self.retries = 0
+        self.failures = 0
+        self.global_pauses = 0
+
+    def _chat_bucket(self, chat_id) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(self.chat_rate, capacity=self.chat_burst)
+            self.chat_buckets.set(chat_id, bucket)
+        return bucket
+
+    def _is_flood(self, chat_id) -> bool:
+        """Records a RetryAfter; true once enough chats got one in the window."""
+        now = time.monotonic()
+        self._retry_afters.append((now, chat_id))
+        while self._retry_afters[0][0] < now - self.flood_window:
+            self._retry_afters.popleft()
+        return len({chat for _, chat in self._retry_afters}) >= self.flood_chats
+
+    async def _pump(self):
+        while True:
+            item = await self._queue.get()
+            delay = self.global_bucket.delay()
+            if delay > 0:
+                # Put it back so a higher priority call that arrives
+                # meanwhile gets the next token
+                self._queue.put_nowait(item)
+                await asyncio.sleep(delay)
+                continue
+
+            future = item[-1]
+            if not future.done():
+                self.global_bucket.consume()
+                future.set_result(None)
+
+    async def _acquire(self, chat_id, priority: Priority):
+        started = time.monotonic()
+        self.queued[priority] += 1
+        try:
+            delay = self._chat_bucket(chat_id).reserve()
+            if delay:
+                await asyncio.sleep(delay)
+
+            if self._pump_task is None or self._pump_task.done():
+                self._queue = asyncio.PriorityQueue()
+                self._pump_task = asyncio.create_task(self._pump())
+            future = asyncio.get_running_loop().create_future()
+            self._queue.put_nowait((priority, next(self._order), future))
+            await future
+        finally:
+            self.queued[priority] -= 1
+            self.wait_seconds[priority] += time.monotonic() - started
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType]
+    ) -> Response[TelegramType]:
+        chat_id = getattr(method, 'chat_id', None)
+        if chat_id is None:
+            return await make_request(bot, method)
+
+        priority = send_priority.get()
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(chat_id, priority)
+            try:
+                response = await make_request(bot, method)
+            except TelegramRetryAfter as error:
+                if attempt == self.max_retries:
+                    self.failures += 1
+                    raise
+                self.retries += 1
+                self._chat_bucket(chat_id).pause(error.retry_after)
+                if self._is_flood(chat_id):
+                    self.global_pauses += 1
+                    self.global_bucket.pause(error.retry_after)
+                    logger.warning(f"RetryAfter from several chats, pausing all sends for {error.retry_after}s")
+                else:
+                    logger.warning(f"RetryAfter on {type(method).__name__} to {chat_id}, pausing the chat for {error.retry_after}s")
+                continue
+            self.sent[priority] += 1
+            return response
+
+    def stats(self) -> Dict[str, float]:
+        stats = {
+            'retries': self.retries,
+            'failures': self.failures,
+            'global_pauses': self.global_pauses,
+            'chats_tracked': len(self.chat_buckets)
+        }
+        for priority in Priority:
+            name = priority.name.lower()
+            stats[f'{name}_queued'] = self.queued[priority]
+            stats[f'{name}_sent'] = self.sent[priority]
+            stats[f'{name}_wait_seconds'] = round(self.wait_seconds[priority], 3)
+        return stats
+
+    async def close(self):
+        if self._pump_task is not None:
+            self._pump_task.cancel()
+            self._pump_task = None
@@ -0,0 +1,46 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from monitoring.queries import check_budget, current_stats, track_queries
+
+class QueryBudgetMiddleware(BaseMiddleware):
+    """Counts the database statements run for each update and checks them
+    against the query budget once the update is handled.
+    
+    Must be registered before DbSessionMiddleware so the commit is counted.
+    """
+    
+    def __init__(self, budget: int, repeat_threshold: int, raise_on_exceed: bool = False):
+        self.budget = budget
+        self.repeat_threshold = repeat_threshold
+        self.raise_on_exceed = raise_on_exceed
+    
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        with track_queries() as stats:
+            result = await handler(event, data)
+        check_budget(stats, self.budget, self.repeat_threshold, self.raise_on_exceed)
+        return result
+
+class QueryTagMiddleware(BaseMiddleware):
+    """Inner middleware that tags the current query stats with the handler name."""
+    
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        stats = current_stats.get()
+        # Routes of the dispatch table are more telling than its own handler
+        handler_object = data.get('route') or data.get('handler')
+        if stats is not None and handler_object is not None:
+            callback = handler_object.callback
+            stats.handler = f"{callback.__module__}.{callback.__qualname__}"
+        return await handler(event, data)
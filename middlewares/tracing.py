@@ -0,0 +1,104 @@
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import TelegramObject, Update
+
+from monitoring.tracing import Tracer, current_trace, start_trace, tracer as default_tracer
+
+class TraceMiddleware(BaseMiddleware):
+    """Outermost update middleware starting a trace for sampled updates.
+
+    The trace is held in a context variable for the DB and API hooks and
+    gets a 'dispatch' span covering all middlewares, filters and the handler.
+    Unsampled updates pass straight through.
+    """
+
+    def __init__(self, tracer: Tracer = None):
+        self.tracer = tracer or default_tracer
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        if not self.tracer.sampled():
+            return await handler(event, data)
+
+        update_type = event.event_type if isinstance(event, Update) else type(event).__name__
+        trace = start_trace(getattr(event, 'update_id', 0), update_type)
+        token = current_trace.set(trace)
+        started = time.perf_counter()
+        error = None
+        try:
+            return await handler(event, data)
+        except Exception as exc:
+            error = type(exc).__name__
+            raise
+        finally:
+            trace.add_span('dispatch', update_type, started, error)
+            current_trace.reset(token)
+            self.tracer.finish(trace)
+
+class TraceHandlerMiddleware(BaseMiddleware):
+    """Inner middleware recording the handler's latency for the rolling
+    percentiles and, in a sampled update, a 'handler' span."""
+
+    def __init__(self, tracer: Tracer = None):
+        self.tracer = tracer or default_tracer
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        handler_object = data.get('route') or data.get('handler')
+        callback = handler_object.callback if handler_object is not None else handler
+        name = f"{callback.__module__.rsplit('.', 1)[-1]}.{getattr(callback, '__name__', type(callback).__name__)}"
+
+        started = time.perf_counter()
+        error = None
+        try:
+            return await handler(event, data)
+        except Exception as exc:
+            error = type(exc).__name__
+            raise
+        finally:
+            self.tracer.record_latency(name, time.perf_counter() - started)
+            trace = current_trace.get()
+            if trace is not None:
+                trace.handler = name
+                trace.add_span('handler', name, started, error)
+
+class TraceApiMiddleware(BaseRequestMiddleware):
+    """Request middleware adding an 'api' span for Bot API calls made while
+    handling a sampled update.
+
+    Register after OutboundQueue so the span is the call itself; the wait
+    for a token shows as the gap before it.
+    """
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType]
+    ) -> Response[TelegramType]:
+        trace = current_trace.get()
+        if trace is None:
+            return await make_request(bot, method)
+
+        started = time.perf_counter()
+        error = None
+        try:
+            return await make_request(bot, method)
+        except Exception as exc:
+            error = type(exc).__name__
+            raise
+        finally:
+            trace.add_span('api', type(method).__name__, started, error)
@@ -0,0 +1,30 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from services.users import get_cached_user, set_users_active
+
+class UserMiddleware(BaseMiddleware):
+    """Resolves the store owner of the update and passes it to handlers as `user`.
+    
+    Must run after DbSessionMiddleware. `user` is None for unregistered senders.
+    Owners marked inactive after blocking the bot are active again as soon
+    as they write to it.
+    """
+    
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        from_user = data.get('event_from_user')
+        db = data['db']
+        user = await get_cached_user(db, from_user.id) if from_user else None
+        if user is not None and not user.is_active:
+            await set_users_active(db, [user.telegram_id], True)
+            await db.commit()
+            user = await get_cached_user(db, from_user.id)
+        data['user'] = user
+        return await handler(event, data)
@@ -0,0 +1,80 @@
+"""Versioned schema migrations.
+
+create_tables() builds missing tables from the models, then
+run_migrations() applies every migration newer than the recorded schema
+version. Models always describe the latest schema, so migrations must be
+idempotent: on a fresh database their changes already exist.
+
+To add a migration, create `mNNNN_<name>.py` with VERSION and a sync
+`upgrade(conn)` and append it to MIGRATIONS. Migrations that cannot run
+in a transaction (VACUUM) set TRANSACTIONAL = False; they run afterwards,
+each on its own autocommit connection.
+"""
+import logging
+from datetime import datetime
+from typing import List
+
+from sqlalchemy import select, insert, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from database import SchemaVersion
+from . import (
+    m0001_production_indexes, m0002_order_item_unit_cost, m0003_product_name_index, m0004_low_stock_threshold,
+    m0005_daily_sales_backfill, m0006_sqlite_incremental_vacuum
+)
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS = [
+    m0001_production_indexes,
+    m0002_order_item_unit_cost,
+    m0003_product_name_index,
+    m0004_low_stock_threshold,
+    m0005_daily_sales_backfill,
+    m0006_sqlite_incremental_vacuum,
+]
+
+# Serializes migrations of replicas starting at once (PostgreSQL only)
+ADVISORY_LOCK_KEY = 7204
+
+assert [m.VERSION for m in MIGRATIONS] == sorted({m.VERSION for m in MIGRATIONS}), "migration versions must be unique and ordered"
+
+def migration_name(migration) -> str:
+    return migration.__name__.rsplit('.', 1)[-1]
+
+def is_transactional(migration) -> bool:
+    return getattr(migration, 'TRANSACTIONAL', True)
+
+async def apply_migration(conn, migration):
+    logger.info(f"Applying migration {migration.VERSION}: {migration_name(migration)}")
+    await conn.run_sync(migration.upgrade)
+    await conn.execute(insert(SchemaVersion).values(
+        version=migration.VERSION,
+        name=migration_name(migration),
+        applied_at=datetime.utcnow()
+    ))
+
+async def run_migrations(engine: AsyncEngine) -> List[int]:
+    """Applies pending migrations, the transactional ones in one transaction;
+    returns their versions."""
+    async with engine.begin() as conn:
+        if conn.dialect.name == 'postgresql':
+            await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {'key': ADVISORY_LOCK_KEY})
+        
+        applied = set((await conn.scalars(select(SchemaVersion.version))).all())
+        pending = [m for m in MIGRATIONS if m.VERSION not in applied]
+        
+        for migration in pending:
+            if is_transactional(migration):
+                await apply_migration(conn, migration)
+    
+    for migration in pending:
+        if is_transactional(migration):
+            continue
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level='AUTOCOMMIT')
+            # Another replica may have applied it since the check above
+            if await conn.scalar(select(SchemaVersion.version).where(SchemaVersion.version == migration.VERSION)) is None:
+                await apply_migration(conn, migration)
+    
+    return [m.VERSION for m in pending]
@@ -0,0 +1,25 @@
+"""Indexes for the hot filters: per-store lists, analytics date ranges,
+stock queries and order item lookups."""
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+VERSION = 1
+
+INDEXES = [
+    ('ix_orders_user_id_created_at', 'orders', 'user_id, created_at'),
+    ('ix_products_user_id_id', 'products', 'user_id, id'),
+    ('ix_products_user_id_quantity', 'products', 'user_id, quantity'),
+    ('ix_products_category_id', 'products', 'category_id'),
+    ('ix_categories_user_id', 'categories', 'user_id'),
+    ('ix_order_items_order_id', 'order_items', 'order_id'),
+    ('ix_order_items_product_id', 'order_items', 'product_id'),
+]
+
+def upgrade(conn: Connection):
+    for name, table, columns in INDEXES:
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"))
+    
+    if conn.dialect.name == 'sqlite':
+        conn.execute(text("ANALYZE"))
+    else:
+        conn.execute(text("ANALYZE orders, products, categories, order_items"))
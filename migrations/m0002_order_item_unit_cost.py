@@ -0,0 +1,30 @@
+"""Snapshots the unit cost on order items so reports never read products.
+
+Existing rows get the cost implied by their stored profit where there is
+one. Items saved before this change mostly have profit 0: it was computed
+from `item.product`, which is not loaded on a new item. Those, and rows
+without a usable profit, fall back to the product's current purchase
+price, which is what the reports used until now.
+"""
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+VERSION = 2
+
+def upgrade(conn: Connection):
+    columns = {column['name'] for column in inspect(conn).get_columns('order_items')}
+    if 'unit_cost' not in columns:
+        conn.execute(text("ALTER TABLE order_items ADD COLUMN unit_cost FLOAT"))
+    
+    conn.execute(text("""
+        UPDATE order_items
+        SET unit_cost = CASE
+            WHEN quantity > 0 AND profit IS NOT NULL AND profit != 0 AND price IS NOT NULL
+                THEN price - profit / quantity
+            ELSE COALESCE(
+                (SELECT purchase_price FROM products WHERE products.id = order_items.product_id),
+                0
+            )
+        END
+        WHERE unit_cost IS NULL
+    """))
@@ -0,0 +1,8 @@
+"""Index for looking products up by name within a store (bulk import upserts)."""
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+VERSION = 3
+
+def upgrade(conn: Connection):
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_products_user_id_name ON products (user_id, name)"))
@@ -0,0 +1,15 @@
+"""Per-store low-stock threshold. The low_stock_alerts table itself is new
+and comes from create_tables()."""
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+import config
+
+VERSION = 4
+
+def upgrade(conn: Connection):
+    columns = {column['name'] for column in inspect(conn).get_columns('users')}
+    if 'low_stock_threshold' not in columns:
+        conn.execute(text(
+            f"ALTER TABLE users ADD COLUMN low_stock_threshold INTEGER DEFAULT {int(config.LOW_STOCK_THRESHOLD)}"
+        ))
@@ -0,0 +1,14 @@
+"""Fills daily_sales from the orders placed before the rollup existed.
+
+Reports read whole days only from the rollup, so without this an upgraded
+database shows no history. Runs after m0002, which the expenses need.
+"""
+from sqlalchemy.engine import Connection
+
+from services.rollup import rebuild_statements
+
+VERSION = 5
+
+def upgrade(conn: Connection):
+    for statement in rebuild_statements():
+        conn.execute(statement)
@@ -0,0 +1,19 @@
+"""Switches an existing SQLite database to auto_vacuum=INCREMENTAL.
+
+The connect pragma only applies to databases created with it; older ones
+need a full VACUUM to change mode, or the incremental_vacuum job has
+nothing to release. VACUUM rewrites the whole file and cannot run inside
+a transaction, so this migration runs on its own autocommit connection.
+"""
+from sqlalchemy.engine import Connection
+
+VERSION = 6
+TRANSACTIONAL = False
+
+def upgrade(conn: Connection):
+    if conn.dialect.name != 'sqlite':
+        return
+    if conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() == 2:
+        return
+    conn.exec_driver_sql("PRAGMA auto_vacuum=INCREMENTAL")
+    conn.exec_driver_sql("VACUUM")
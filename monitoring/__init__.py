@@ -0,0 +1,26 @@
+from .queries import (
+    QueryBudgetExceeded,
+    QueryStats,
+    check_budget,
+    current_stats,
+    install,
+    track_queries
+)
+from .metrics import registry, install_db_metrics
+from .tracing import Trace, Tracer, current_trace, install_tracing, tracer
+
+__all__ = [
+    'QueryBudgetExceeded',
+    'QueryStats',
+    'check_budget',
+    'current_stats',
+    'install',
+    'track_queries',
+    'registry',
+    'install_db_metrics',
+    'Trace',
+    'Tracer',
+    'current_trace',
+    'install_tracing',
+    'tracer'
+]
@@ -0,0 +1,177 @@
+import bisect
+import logging
+import resource
+import time
+from typing import Awaitable, Callable, Dict, List, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+# Seconds; covers fast handlers and queries up to slow Telegram calls
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Sequence, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _number(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    type = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values: Dict[Tuple, object] = {}
+
+    def _key(self, labels: Dict[str, object]) -> Tuple:
+        return tuple(labels.get(name, '') for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in self.values.items()]
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines += self.samples()
+        return "\n".join(lines)
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+class Gauge(Metric):
+    type = 'gauge'
+
+    def set(self, value: float, **labels):
+        self.values[self._key(labels)] = value
+
+    def clear(self):
+        self.values.clear()
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        state = self.values.get(key)
+        if state is None:
+            # per-bucket counts (the last one is +Inf), sum
+            state = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        state[0][bisect.bisect_left(self.buckets, value)] += 1
+        state[1] += value
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total) in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+class Registry:
+    """Metrics of this process in the Prometheus text format.
+
+    Collectors are async callables run before each scrape to refresh gauges
+    that are cheaper to read on demand than to keep up to date.
+    """
+
+    def __init__(self):
+        self.metrics: List[Metric] = []
+        self.collectors: List[Callable[[], Awaitable[None]]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], Awaitable[None]]):
+        self.collectors.append(collector)
+
+    async def collect(self):
+        for collector in self.collectors:
+            try:
+                await collector()
+            except Exception:
+                logger.exception(f"Metrics collector {collector.__qualname__} failed")
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self.metrics) + "\n"
+
+registry = Registry()
+
+UPDATES = registry.register(Counter('bot_updates_total', 'Updates received, by update type.', ['type']))
+HANDLER_DURATION = registry.register(Histogram(
+    'bot_handler_duration_seconds', 'Time spent in handlers, by router module and handler.', ['router', 'handler']
+))
+HANDLER_ERRORS = registry.register(Counter('bot_handler_errors_total', 'Handlers that raised.', ['router', 'handler']))
+DB_QUERY_DURATION = registry.register(Histogram(
+    'bot_db_query_duration_seconds', 'Database statements, by statement kind.', ['statement']
+))
+FSM_ACTIVE_STATES = registry.register(Gauge('bot_fsm_active_states', 'Users currently inside an FSM state.'))
+API_DURATION = registry.register(Histogram(
+    'bot_api_request_duration_seconds', 'Telegram Bot API calls, by method.', ['method']
+))
+API_ERRORS = registry.register(Counter('bot_api_errors_total', 'Failed Telegram Bot API calls.', ['method', 'error']))
+OUTBOUND = registry.register(Gauge('bot_outbound_queue', 'Outbound queue statistics (see OutboundQueue.stats()).', ['stat']))
+MEMORY = registry.register(Gauge('process_resident_memory_bytes', 'Resident memory of the process.'))
+MAX_MEMORY = registry.register(Gauge('process_resident_memory_max_bytes', 'Peak resident memory of the process.'))
+CPU = registry.register(Gauge('process_cpu_seconds', 'User and system CPU time of the process.'))
+
+async def collect_process():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    # ru_maxrss is in KiB on Linux
+    MAX_MEMORY.set(usage.ru_maxrss * 1024)
+    CPU.set(usage.ru_utime + usage.ru_stime)
+    try:
+        with open('/proc/self/statm') as statm:
+            MEMORY.set(int(statm.read().split()[1]) * resource.getpagesize())
+    except OSError:
+        pass
+
+registry.add_collector(collect_process)
+
+def _statement_kind(statement: str) -> str:
+    kind = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ''
+    return kind if kind in ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'PRAGMA') else 'OTHER'
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_start', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if conn.info.get('metrics_start'):
+        DB_QUERY_DURATION.observe(time.perf_counter() - conn.info['metrics_start'].pop(), statement=_statement_kind(statement))
+
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute
+    if context.connection is not None and context.connection.info.get('metrics_start'):
+        context.connection.info['metrics_start'].pop()
+
+def install_db_metrics(engine) -> None:
+    """Times every statement of `engine` into bot_db_query_duration_seconds."""
+    sync_engine: Engine = engine.sync_engine if isinstance(engine, AsyncEngine) else engine
+    if not event.contains(sync_engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(sync_engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(sync_engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(sync_engine, 'handle_error', _handle_error)
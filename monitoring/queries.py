@@ -0,0 +1,93 @@
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+@dataclass
+class QueryStats:
+    """Statements executed while handling one update."""
+    handler: Optional[str] = None
+    count: int = 0
+    duration: float = 0.0
+    statements: Counter = field(default_factory=Counter)
+    
+    def repeated(self, threshold: int) -> List[str]:
+        """Statements run at least `threshold` times: the N+1 suspects."""
+        return [statement for statement, count in self.statements.items() if count >= threshold]
+    
+    def summary(self) -> str:
+        return f"{self.handler or 'no handler'}: {self.count} queries in {self.duration * 1000:.1f} ms"
+
+current_stats: ContextVar[Optional[QueryStats]] = ContextVar('current_stats', default=None)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_stats.get() is not None:
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_stats.get()
+    if stats is None or not conn.info.get('query_start'):
+        return
+    stats.count += 1
+    stats.duration += time.perf_counter() - conn.info['query_start'].pop()
+    stats.statements[statement] += 1
+
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute
+    if context.connection is not None and context.connection.info.get('query_start'):
+        context.connection.info['query_start'].pop()
+
+def install(engine) -> None:
+    """Starts counting statements of `engine` into the current QueryStats."""
+    sync_engine: Engine = engine.sync_engine if isinstance(engine, AsyncEngine) else engine
+    if not event.contains(sync_engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(sync_engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(sync_engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(sync_engine, 'handle_error', _handle_error)
+
+@contextmanager
+def track_queries(handler: Optional[str] = None) -> Iterator[QueryStats]:
+    """Collects the statements run inside the block, e.g. in tests:
+    
+        with track_queries() as stats:
+            await dp.feed_update(bot, update)
+        assert stats.count <= 5
+    """
+    stats = QueryStats(handler=handler)
+    token = current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        current_stats.reset(token)
+
+def check_budget(stats: QueryStats, budget: int, repeat_threshold: int, raise_on_exceed: bool = False) -> None:
+    """Logs (or raises QueryBudgetExceeded for) a handler that ran more than
+    `budget` statements or repeated one statement `repeat_threshold` times.
+    A zero budget or threshold disables that check."""
+    problems = []
+    if budget and stats.count > budget:
+        problems.append(f"exceeded the budget of {budget} queries")
+    if repeat_threshold:
+        for statement in stats.repeated(repeat_threshold):
+            problems.append(f"ran {stats.statements[statement]}x: {' '.join(statement.split())[:200]}")
+    
+    if not problems:
+        logger.debug(stats.summary())
+        return
+    
+    message = f"{stats.summary()}; " + "; ".join(problems)
+    if raise_on_exceed:
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
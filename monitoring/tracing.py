@@ -0,0 +1,194 @@
+import json
+import logging
+import random
+import time
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from typing import Deque, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+import config
+from .metrics import Gauge, registry
+
+logger = logging.getLogger(__name__)
+
+# Spans kept per trace; later ones are counted in `dropped_spans`
+MAX_SPANS = 200
+
+@dataclass
+class Span:
+    kind: str
+    name: str
+    # Milliseconds from the start of the trace
+    start: float
+    duration: float
+    error: Optional[str] = None
+
+@dataclass
+class Trace:
+    """One sampled update: the dispatch and every DB statement and Bot API
+    call made while handling it."""
+    update_id: int
+    update_type: str
+    started_at: str
+    handler: Optional[str] = None
+    duration: float = 0.0
+    spans: List[Span] = field(default_factory=list)
+    dropped_spans: int = 0
+    _started: float = field(default_factory=time.perf_counter, repr=False)
+
+    def offset(self) -> float:
+        return (time.perf_counter() - self._started) * 1000
+
+    def add_span(self, kind: str, name: str, started: float, error: Optional[str] = None):
+        """`started` is a perf_counter() value."""
+        if len(self.spans) >= MAX_SPANS:
+            self.dropped_spans += 1
+            return
+        self.spans.append(Span(
+            kind=kind,
+            name=name,
+            start=round((started - self._started) * 1000, 3),
+            duration=round((time.perf_counter() - started) * 1000, 3),
+            error=error
+        ))
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data.pop('_started')
+        # Spans are added as they end; list them as they started
+        data['spans'].sort(key=lambda span: span['start'])
+        return data
+
+current_trace: ContextVar[Optional[Trace]] = ContextVar('current_trace', default=None)
+
+class LatencyWindow:
+    """The last `size` durations of a handler, for rolling percentiles."""
+
+    def __init__(self, size: int):
+        self.samples: Deque[float] = deque(maxlen=size)
+        self.count = 0
+
+    def add(self, duration: float):
+        self.samples.append(duration)
+        self.count += 1
+
+    def percentiles(self, *quantiles: float) -> List[float]:
+        ordered = sorted(self.samples)
+        if not ordered:
+            return [0.0 for _ in quantiles]
+        return [ordered[min(len(ordered) - 1, int(q * len(ordered)))] for q in quantiles]
+
+class Tracer:
+    """Samples updates into traces and keeps rolling handler latencies.
+
+    Latencies are recorded for every update (one deque append). Spans are
+    only collected for the TRACE_SAMPLE_RATE share of updates; with sampling
+    off the DB and API hooks cost a context variable lookup. Finished traces
+    are kept in memory (the last TRACE_KEEP) and, if TRACE_FILE is set,
+    appended to it as JSON lines.
+    """
+
+    def __init__(
+        self,
+        sample_rate: float = config.TRACE_SAMPLE_RATE,
+        window: int = config.TRACE_WINDOW,
+        keep: int = config.TRACE_KEEP,
+        path: str = config.TRACE_FILE
+    ):
+        self.sample_rate = sample_rate
+        self.window = window
+        self.path = path
+        self.latencies: Dict[str, LatencyWindow] = {}
+        self.traces: Deque[Trace] = deque(maxlen=keep)
+
+    def sampled(self) -> bool:
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def record_latency(self, handler: str, duration: float):
+        latency = self.latencies.get(handler)
+        if latency is None:
+            latency = self.latencies[handler] = LatencyWindow(self.window)
+        latency.add(duration)
+
+    def finish(self, trace: Trace):
+        trace.duration = round(trace.offset(), 3)
+        self.traces.append(trace)
+        if self.path:
+            try:
+                with open(self.path, 'a', encoding='utf-8') as file:
+                    file.write(json.dumps(trace.to_dict(), ensure_ascii=False) + "\n")
+            except OSError as error:
+                logger.warning(f"Could not write trace to {self.path}: {error}")
+
+    def report(self) -> List[dict]:
+        """p50/p95/p99 in milliseconds per handler, slowest p95 first."""
+        rows = []
+        for handler, latency in self.latencies.items():
+            p50, p95, p99 = latency.percentiles(0.5, 0.95, 0.99)
+            rows.append({
+                'handler': handler,
+                'count': latency.count,
+                'p50': round(p50 * 1000, 2),
+                'p95': round(p95 * 1000, 2),
+                'p99': round(p99 * 1000, 2)
+            })
+        return sorted(rows, key=lambda row: row['p95'], reverse=True)
+
+    def dump(self, path: str) -> int:
+        """Writes the retained traces to `path` as JSON lines; returns their count."""
+        traces = list(self.traces)
+        with open(path, 'w', encoding='utf-8') as file:
+            for trace in traces:
+                file.write(json.dumps(trace.to_dict(), ensure_ascii=False) + "\n")
+        return len(traces)
+
+tracer = Tracer()
+
+def start_trace(update_id: int, update_type: str) -> Trace:
+    return Trace(update_id=update_id, update_type=update_type, started_at=datetime.utcnow().isoformat())
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_trace.get() is not None:
+        conn.info.setdefault('trace_start', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    trace = current_trace.get()
+    if trace is not None and conn.info.get('trace_start'):
+        trace.add_span('db', ' '.join(statement.split())[:120], conn.info['trace_start'].pop())
+
+def _handle_error(context):
+    trace = current_trace.get()
+    connection = context.connection
+    if trace is not None and connection is not None and connection.info.get('trace_start'):
+        trace.add_span(
+            'db', ' '.join((context.statement or '').split())[:120],
+            connection.info['trace_start'].pop(), error=type(context.original_exception).__name__
+        )
+
+def install_tracing(engine) -> None:
+    """Adds a span for every statement `engine` runs inside a sampled update."""
+    sync_engine: Engine = engine.sync_engine if isinstance(engine, AsyncEngine) else engine
+    if not event.contains(sync_engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(sync_engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(sync_engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(sync_engine, 'handle_error', _handle_error)
+
+HANDLER_LATENCY = registry.register(Gauge(
+    'bot_handler_latency_quantile_seconds',
+    'Rolling handler latency percentiles over the last TRACE_WINDOW updates.',
+    ['handler', 'quantile']
+))
+
+async def collect_latency():
+    HANDLER_LATENCY.clear()
+    for handler, latency in tracer.latencies.items():
+        for quantile, value in zip(('0.5', '0.95', '0.99'), latency.percentiles(0.5, 0.95, 0.99)):
+            HANDLER_LATENCY.set(value, handler=handler, quantile=quantile)
+
+registry.add_collector(collect_latency)
@@ -0,0 +1,84 @@
+"""Prints the query plans of the hot queries and flags full table scans.
+
+Run from the repository root against the configured DATABASE_URL:
+
+    python -m scripts.check_query_plans [--migrate] [--strict]
+
+--migrate shows the plans before and after applying pending migrations,
+--strict exits with status 1 if any query still scans a whole table.
+"""
+import argparse
+import asyncio
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, func, text
+
+from database import engine, create_tables, Category, Product, Order, OrderItem
+from migrations import run_migrations
+from jobs.low_stock import low_stock_query
+
+def hot_queries():
+    now = datetime.utcnow()
+    return {
+        'orders of a period': select(func.count(Order.id), func.sum(Order.total_amount)).where(
+            Order.user_id == 1, Order.created_at >= now - timedelta(days=7), Order.created_at <= now
+        ),
+        'recent orders': select(Order).where(Order.user_id == 1).order_by(Order.created_at.desc()).limit(10),
+        'products page': select(Product.id).where(Product.user_id == 1, Product.id > 0).order_by(Product.id).limit(11),
+        'inventory': select(func.sum(Product.quantity * Product.purchase_price)).where(
+            Product.user_id == 1, Product.quantity > 0
+        ),
+        'products by name': select(Product.id).where(Product.user_id == 1, Product.name.in_(['a', 'b'])),
+        'low stock': low_stock_query(0, 0, 500),
+        'products of a category': select(Product.name).where(Product.category_id == 1),
+        'categories of a store': select(Category.name).where(Category.user_id == 1),
+        'items of an order': select(OrderItem).where(OrderItem.order_id == 1),
+        'sales of a product': select(func.sum(OrderItem.quantity)).where(OrderItem.product_id == 1),
+    }
+
+def is_full_scan(dialect: str, plan: str) -> bool:
+    if dialect == 'sqlite':
+        return any(line.strip().startswith('SCAN ') for line in plan.splitlines())
+    return 'Seq Scan' in plan
+
+async def explain_all() -> int:
+    scans = 0
+    dialect = engine.dialect.name
+    prefix = "EXPLAIN QUERY PLAN " if dialect == 'sqlite' else "EXPLAIN "
+
+    async with engine.connect() as conn:
+        for name, query in hot_queries().items():
+            sql = str(query.compile(engine.sync_engine, compile_kwargs={'literal_binds': True}))
+            rows = (await conn.execute(text(prefix + sql))).all()
+            plan = "\n".join(str(row[-1]) for row in rows)
+            full_scan = is_full_scan(dialect, plan)
+            scans += full_scan
+            print(f"{'SCAN ' if full_scan else 'ok   '} {name}")
+            for line in plan.splitlines():
+                print(f"        {line}")
+
+    return scans
+
+async def run(migrate: bool, strict: bool) -> int:
+    await create_tables()
+
+    if migrate:
+        print("== before ==")
+        await explain_all()
+        applied = await run_migrations(engine)
+        print(f"== after migrations {applied or '(none pending)'} ==")
+
+    scans = await explain_all()
+    await engine.dispose()
+    return 1 if strict and scans else 0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--migrate", action="store_true", help="apply pending migrations between two reports")
+    parser.add_argument("--strict", action="store_true", help="fail if a query scans a whole table")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.migrate, args.strict)))
+
+if __name__ == "__main__":
+    main()
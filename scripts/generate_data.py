@@ -0,0 +1,276 @@
+"""Fills the database with synthetic stores, products and orders for scale testing.
+
+The data is deterministic for a given --seed, --end date and set of options. Product
+popularity follows a Zipf law within each store, store activity follows
+one across stores (the --heavy-stores largest catalogues get the most
+orders), and order dates follow a yearly season with a peak, a weekly
+cycle and year-over-year growth. Rows are written with bulk inserts and
+the daily_sales rollup is rebuilt at the end. Point DATABASE_URL at a
+scratch database and run from the repository root:
+
+    DATABASE_URL=sqlite:///scale.db python -m scripts.generate_data --orders 3300000
+"""
+import argparse
+import asyncio
+import bisect
+import itertools
+import math
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Sequence
+
+from sqlalchemy import func, insert, select, text
+
+from database import engine, SessionLocal, create_tables, Category, Order, OrderItem, Product, User
+from migrations import run_migrations
+from services.rollup import rebuild_daily_sales
+
+# Generated users get telegram ids from here on
+TELEGRAM_IDS = 5_000_000_000
+# Orders generated and written per transaction
+ORDERS_PER_CHUNK = 20_000
+MAX_ITEMS_PER_ORDER = 20
+# Units per order line: mostly one
+QUANTITY_WEIGHTS = [50, 25, 12, 8, 5]
+# Share of orders placed in each hour of the day (UTC)
+HOUR_WEIGHTS = [1, 1, 1, 1, 1, 2, 3, 5, 7, 8, 9, 9, 10, 9, 9, 9, 9, 10, 10, 9, 7, 5, 3, 2]
+
+def zipf_cum_weights(count: int, exponent: float) -> List[float]:
+    """Cumulative weights of ranks 1..count, for random.choices()."""
+    return list(itertools.accumulate(1 / rank ** exponent for rank in range(1, count + 1)))
+
+def day_cum_weights(days: Sequence[datetime], seasonality: float, peak_day: int, weekend: float, growth: float) -> List[float]:
+    first = days[0]
+    weights = []
+    for day in days:
+        season = 1 + seasonality * math.cos(2 * math.pi * (day.timetuple().tm_yday - peak_day) / 365.25)
+        weights.append(
+            season
+            * (weekend if day.weekday() >= 5 else 1.0)
+            * (1 + growth) ** ((day - first).days / 365.25)
+        )
+    return list(itertools.accumulate(weights))
+
+def items_cum_weights(mean: float) -> List[float]:
+    """Geometric distribution of lines per order with the given mean, truncated."""
+    p = 1 / max(mean, 1)
+    return list(itertools.accumulate((1 - p) ** (k - 1) * p for k in range(1, MAX_ITEMS_PER_ORDER + 1)))
+
+def allocate(total: int, weights: Sequence[float]) -> List[int]:
+    """Splits `total` proportionally to `weights`; the counts add up to `total`."""
+    scale = total / sum(weights)
+    counts = [int(weight * scale) for weight in weights]
+    remainders = sorted(range(len(weights)), key=lambda index: weights[index] * scale - counts[index], reverse=True)
+    for index in remainders[:total - sum(counts)]:
+        counts[index] += 1
+    return counts
+
+async def next_ids(*models) -> Dict[type, int]:
+    async with engine.connect() as conn:
+        return {model: (await conn.scalar(select(func.max(model.id))) or 0) + 1 for model in models}
+
+class Generator:
+    def __init__(self, args):
+        self.args = args
+        self.rnd = random.Random(args.seed)
+        self.end = datetime.combine(args.end, datetime.min.time())
+        self.days = [self.end - timedelta(days=offset) for offset in range(int(args.years * 365) - 1, -1, -1)]
+        self.day_weights = day_cum_weights(self.days, args.seasonality, args.peak_day, args.weekend, args.growth)
+        self.hour_weights = list(itertools.accumulate(HOUR_WEIGHTS))
+        self.items_weights = items_cum_weights(args.items_per_order)
+        self.quantity_weights = list(itertools.accumulate(QUANTITY_WEIGHTS))
+        self.orders_written = self.items_written = 0
+        self.started = self.reported = time.perf_counter()
+
+    def catalogue_sizes(self) -> List[int]:
+        args = self.args
+        sizes = [args.heavy_products] * min(args.heavy_stores, args.stores)
+        sizes += [max(1, round(self.rnd.expovariate(1 / args.products))) for _ in range(args.stores - len(sizes))]
+        return sizes
+
+    async def stores(self, ids: Dict[type, int]):
+        args = self.args
+        sizes = self.catalogue_sizes()
+        # Largest catalogues are the busiest stores
+        ranked = sorted(range(len(sizes)), key=lambda index: -sizes[index])
+        store_weights = [0.0] * len(sizes)
+        for rank, index in enumerate(ranked, 1):
+            store_weights[index] = 1 / rank ** args.store_zipf
+        order_counts = allocate(args.orders, store_weights)
+
+        user_id, telegram_id = ids[User], TELEGRAM_IDS + ids[User]
+        for size, orders_count in zip(sizes, order_counts):
+            products = await self.store(user_id, telegram_id, size, ids)
+            await self.orders(user_id, products, orders_count, ids)
+            user_id += 1
+            telegram_id += 1
+        self.reported = 0
+        self.progress()
+        print(f"\n{len(sizes)} stores, {sum(sizes)} products")
+
+    async def store(self, user_id: int, telegram_id: int, size: int, ids: Dict[type, int]) -> List[tuple]:
+        """Writes a user with categories and products; returns (id, sale price, purchase price)
+        of the products, most popular first."""
+        rnd = self.rnd
+        created_at = self.days[0] - timedelta(days=rnd.randint(0, 90))
+        categories = [ids[Category] + index for index in range(rnd.randint(3, 20))]
+        ids[Category] += len(categories)
+
+        products, rows = [], []
+        for index in range(size):
+            purchase_price = round(rnd.lognormvariate(2.5, 0.8), 2)
+            sale_price = round(purchase_price * rnd.uniform(1.1, 2.0), 2)
+            product_id = ids[Product] + index
+            rows.append({
+                "id": product_id,
+                "name": f"Product {index + 1}",
+                "quantity": rnd.randint(0, 300),
+                "purchase_price": purchase_price,
+                "sale_price": sale_price,
+                "profit": round(sale_price - purchase_price, 2),
+                "category_id": rnd.choice(categories),
+                "user_id": user_id,
+                "created_at": created_at,
+                "updated_at": created_at
+            })
+            products.append((product_id, sale_price, purchase_price))
+        ids[Product] += size
+        rnd.shuffle(products)
+
+        async with engine.begin() as conn:
+            await conn.execute(insert(User), [{
+                "id": user_id,
+                "telegram_id": telegram_id,
+                "email": f"store{telegram_id}@example.com",
+                "language": rnd.choice(("ru", "en")),
+                "store_name": f"Store {user_id}",
+                "created_at": created_at
+            }])
+            await conn.execute(insert(Category), [
+                {"id": category_id, "name": f"Category {index + 1}", "user_id": user_id, "created_at": created_at}
+                for index, category_id in enumerate(categories)
+            ])
+            await conn.execute(insert(Product), rows)
+        return products
+
+    async def orders(self, user_id: int, products: List[tuple], count: int, ids: Dict[type, int]):
+        rnd, choices = self.rnd, self.rnd.choices
+        popularity = zipf_cum_weights(len(products), self.args.zipf)
+        total_popularity = popularity[-1]
+
+        while count > 0:
+            chunk = min(count, ORDERS_PER_CHUNK)
+            count -= chunk
+            # Sorted, so order ids follow time as they do in production
+            created = sorted(
+                day + timedelta(hours=hour, seconds=rnd.randrange(3600))
+                for day, hour in zip(
+                    choices(self.days, cum_weights=self.day_weights, k=chunk),
+                    choices(range(24), cum_weights=self.hour_weights, k=chunk)
+                )
+            )
+            lines_per_order = choices(range(1, MAX_ITEMS_PER_ORDER + 1), cum_weights=self.items_weights, k=chunk)
+
+            orders, items = [], []
+            order_id = ids[Order]
+            for created_at, lines in zip(created, lines_per_order):
+                amount = profit = 0.0
+                for _ in range(lines):
+                    product_id, sale_price, purchase_price = products[
+                        bisect.bisect(popularity, rnd.random() * total_popularity, 0, len(popularity) - 1)
+                    ]
+                    quantity = bisect.bisect(self.quantity_weights, rnd.random() * self.quantity_weights[-1]) + 1
+                    line_profit = round((sale_price - purchase_price) * quantity, 2)
+                    items.append({
+                        "order_id": order_id,
+                        "product_id": product_id,
+                        "quantity": quantity,
+                        "price": sale_price,
+                        "unit_cost": purchase_price,
+                        "profit": line_profit
+                    })
+                    amount += sale_price * quantity
+                    profit += line_profit
+                orders.append({
+                    "id": order_id,
+                    "order_number": f"G{order_id:09d}",
+                    "total_amount": round(amount, 2),
+                    "total_profit": round(profit, 2),
+                    "user_id": user_id,
+                    "created_at": created_at
+                })
+                order_id += 1
+            ids[Order] = order_id
+
+            async with engine.begin() as conn:
+                await conn.execute(insert(Order), orders)
+                await conn.execute(insert(OrderItem), items)
+            self.orders_written += len(orders)
+            self.items_written += len(items)
+            self.progress()
+
+    def progress(self):
+        now = time.perf_counter()
+        if now - self.reported < 1:
+            return
+        self.reported = now
+        elapsed = now - self.started
+        print(
+            f"\r{self.orders_written} orders, {self.items_written} items "
+            f"({self.items_written / elapsed:,.0f} items/s)", end="", flush=True
+        )
+
+async def run(args) -> int:
+    await create_tables()
+    await run_migrations(engine)
+    async with engine.connect() as conn:
+        users = await conn.scalar(select(func.count(User.id)))
+    if users and not args.append:
+        print(f"The database already has {users} users; use --append to add to it.")
+        await engine.dispose()
+        return 1
+
+    generator = Generator(args)
+    ids = await next_ids(User, Category, Product, Order)
+    await generator.stores(ids)
+    print(f"Data written in {time.perf_counter() - generator.started:.1f} s")
+
+    started = time.perf_counter()
+    async with SessionLocal() as db:
+        rows = await rebuild_daily_sales(db)
+        await db.commit()
+    async with engine.begin() as conn:
+        if conn.dialect.name == 'sqlite':
+            await conn.execute(text("ANALYZE"))
+        else:
+            await conn.execute(text("ANALYZE users, categories, products, orders, order_items, daily_sales"))
+    print(f"daily_sales rebuilt ({rows} rows) and statistics refreshed in {time.perf_counter() - started:.1f} s")
+
+    await engine.dispose()
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--stores", type=int, default=2000)
+    parser.add_argument("--heavy-stores", type=int, default=10, help="stores with --heavy-products products")
+    parser.add_argument("--heavy-products", type=int, default=10000)
+    parser.add_argument("--products", type=int, default=50, help="mean catalogue size of the other stores")
+    parser.add_argument("--orders", type=int, default=1_000_000, help="orders across all stores")
+    parser.add_argument("--items-per-order", type=float, default=3.0, help="mean order lines per order")
+    parser.add_argument("--years", type=float, default=3.0, help="span of order history, ending at --end")
+    parser.add_argument("--end", type=date.fromisoformat, default=date.today(), help="last day of orders, YYYY-MM-DD (default: today)")
+    parser.add_argument("--zipf", type=float, default=1.1, help="exponent of product popularity within a store")
+    parser.add_argument("--store-zipf", type=float, default=0.8, help="exponent of order volume across stores")
+    parser.add_argument("--seasonality", type=float, default=0.4, help="yearly swing of the order rate, 0..1")
+    parser.add_argument("--peak-day", type=int, default=350, help="day of the year with the most orders")
+    parser.add_argument("--weekend", type=float, default=1.3, help="order rate on weekends relative to weekdays")
+    parser.add_argument("--growth", type=float, default=0.5, help="year-over-year growth of the order rate")
+    parser.add_argument("--append", action="store_true", help="add to a database that already has users")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+"""Rebuilds the daily_sales rollup from the orders table.
+
+Run from the repository root after deploying the rollup, or whenever orders
+were written outside the bot:
+
+    python -m scripts.rebuild_daily_sales [--user-id ID]
+"""
+import argparse
+import asyncio
+
+from database import engine, SessionLocal, create_tables
+from services.rollup import rebuild_daily_sales
+
+async def run(user_id):
+    await create_tables()
+    
+    async with SessionLocal() as db:
+        rows = await rebuild_daily_sales(db, user_id)
+        await db.commit()
+    
+    await engine.dispose()
+    print(f"daily_sales rebuilt: {rows} rows")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--user-id", type=int, default=None, help="rebuild a single store (users.id)")
+    args = parser.parse_args()
+    asyncio.run(run(args.user_id))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+from .users import CachedUser, get_cached_user, invalidate_user, set_users_active
+from .categories import CategoriesPicker, get_categories_picker, invalidate_categories
+from .analytics import AnalyticsReport, build_report, get_report, mark_store_changed
+
+__all__ = [
+    'CachedUser',
+    'get_cached_user',
+    'invalidate_user',
+    'set_users_active',
+    'CategoriesPicker',
+    'get_categories_picker',
+    'invalidate_categories',
+    'AnalyticsReport',
+    'build_report',
+    'get_report',
+    'mark_store_changed'
+]
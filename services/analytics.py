@@ -0,0 +1,159 @@
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+from itertools import chain, count
+from typing import Optional
+
+from sqlalchemy import select, func, and_, or_, event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+import config
+from database import Order, OrderItem, Product
+from services.rollup import SalesTotals, rollup_totals, split_whole_days
+from utils.cache import TTLCache
+
+@dataclass(frozen=True)
+class AnalyticsReport:
+    total_orders: int
+    total_amount: float
+    total_profit: float
+    total_items_sold: int
+    total_expenses: float
+    inventory_items: int
+    inventory_value: float
+
+async def _order_totals(db: AsyncSession, filters: list) -> SalesTotals:
+    orders = (await db.execute(
+        select(
+            func.count(Order.id),
+            func.coalesce(func.sum(Order.total_amount), 0),
+            func.coalesce(func.sum(Order.total_profit), 0)
+        ).where(*filters)
+    )).one()
+    
+    items = (await db.execute(
+        select(
+            func.coalesce(func.sum(OrderItem.quantity), 0),
+            func.coalesce(func.sum(OrderItem.quantity * OrderItem.unit_cost), 0)
+        )
+        .select_from(OrderItem)
+        .join(Order, OrderItem.order_id == Order.id)
+        .where(*filters)
+    )).one()
+    
+    return SalesTotals(
+        orders_count=orders[0],
+        items_sold=items[0],
+        revenue=orders[1],
+        profit=orders[2],
+        expenses=items[1]
+    )
+
+async def _sales_totals(db: AsyncSession, user_id: int, start_date: Optional[datetime], end_date: Optional[datetime]) -> SalesTotals:
+    """Whole days come from the daily_sales rollup, partial days from orders."""
+    first_day, last_day = split_whole_days(start_date, end_date) if end_date else (None, None)
+    
+    if last_day is None:
+        filters = [Order.user_id == user_id]
+        if start_date:
+            filters.append(Order.created_at >= start_date)
+        if end_date:
+            filters.append(Order.created_at <= end_date)
+        return await _order_totals(db, filters)
+    
+    totals = await rollup_totals(db, user_id, first_day, last_day)
+    
+    edges = []
+    if first_day is not None and start_date < datetime.combine(first_day, time.min):
+        edges.append(and_(
+            Order.created_at >= start_date,
+            Order.created_at < datetime.combine(first_day, time.min)
+        ))
+    if last_day < end_date.date():
+        edges.append(and_(
+            Order.created_at >= datetime.combine(last_day + timedelta(days=1), time.min),
+            Order.created_at <= end_date
+        ))
+    
+    if edges:
+        totals += await _order_totals(db, [Order.user_id == user_id, or_(*edges)])
+    
+    return totals
+
+async def build_report(db: AsyncSession, user_id: int, start_date: Optional[datetime], end_date: Optional[datetime]) -> AnalyticsReport:
+    sales = await _sales_totals(db, user_id, start_date, end_date)
+    
+    inventory = (await db.execute(
+        select(
+            func.coalesce(func.sum(Product.quantity), 0),
+            func.coalesce(func.sum(Product.quantity * Product.purchase_price), 0)
+        ).where(Product.user_id == user_id)
+    )).one()
+    
+    return AnalyticsReport(
+        total_orders=sales.orders_count,
+        total_amount=sales.revenue,
+        total_profit=sales.profit,
+        total_items_sold=sales.items_sold,
+        total_expenses=sales.expenses,
+        inventory_items=inventory[0],
+        inventory_value=inventory[1]
+    )
+
+# Versions come from one counter, so a store whose entry was evicted gets
+# a version no cached report has
+version_counter = count(1)
+store_versions = TTLCache(maxsize=config.ANALYTICS_VERSIONS_SIZE, ttl=config.ANALYTICS_CACHE_TTL)
+report_cache = TTLCache(maxsize=config.ANALYTICS_CACHE_SIZE, ttl=config.ANALYTICS_CACHE_TTL)
+
+def get_store_version(user_id: int) -> int:
+    version = store_versions.get(user_id)
+    if version is None:
+        version = next(version_counter)
+        store_versions.set(user_id, version)
+    return version
+
+def bump_store_version(user_id: int):
+    store_versions.set(user_id, next(version_counter))
+
+def mark_store_changed(db: AsyncSession, user_id: int):
+    """Bumps the store version once the session commits.
+    
+    Needed only for Core statements; ORM changes to orders and products are
+    picked up automatically.
+    """
+    db.sync_session.info.setdefault('changed_stores', set()).add(user_id)
+
+@event.listens_for(Session, 'before_flush')
+def collect_changed_stores(session, flush_context, instances):
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, (Order, Product)) and obj.user_id is not None:
+            session.info.setdefault('changed_stores', set()).add(obj.user_id)
+
+@event.listens_for(Session, 'after_commit')
+def bump_changed_stores(session):
+    for user_id in session.info.pop('changed_stores', ()):
+        bump_store_version(user_id)
+
+@event.listens_for(Session, 'after_rollback')
+def discard_changed_stores(session):
+    session.info.pop('changed_stores', None)
+
+async def get_report(db: AsyncSession, user_id: int, start_date: Optional[datetime], end_date: Optional[datetime], open_ended: bool = False) -> AnalyticsReport:
+    """Cached build_report.
+    
+    Entries are keyed by the store version, so any change committed by this
+    process makes older results unreachable. Open-ended periods (ending
+    "now") are keyed without their end and kept for ANALYTICS_OPEN_CACHE_TTL
+    only; other entries for ANALYTICS_CACHE_TTL. The TTLs bound staleness
+    from changes versions can't see: other replicas, and orders placed
+    after an open-ended period was cached near midnight.
+    """
+    key = (user_id, start_date, None if open_ended else end_date, get_store_version(user_id))
+    report = report_cache.get(key)
+    
+    if report is None:
+        report = await build_report(db, user_id, start_date, end_date)
+        report_cache.set(key, report, ttl=config.ANALYTICS_OPEN_CACHE_TTL if open_ended else None)
+    
+    return report
@@ -0,0 +1,101 @@
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+import config
+from database import Broadcast, User
+from services.notifications import Delivery, Notifier
+from services.users import set_users_active
+
+logger = logging.getLogger(__name__)
+
+# broadcast id -> task delivering it in this process
+running_broadcasts: Dict[int, asyncio.Task] = {}
+
+def start_broadcast(engine: AsyncEngine, notifier: Notifier, broadcast_id: int) -> asyncio.Task:
+    task = asyncio.create_task(run_broadcast(engine, notifier, broadcast_id))
+    running_broadcasts[broadcast_id] = task
+    task.add_done_callback(lambda _: running_broadcasts.pop(broadcast_id, None))
+    return task
+
+async def resume_broadcasts(engine: AsyncEngine, notifier: Notifier) -> List[int]:
+    """Restarts the broadcasts a previous process left unfinished."""
+    async with engine.connect() as conn:
+        broadcast_ids = (await conn.scalars(
+            select(Broadcast.id).where(Broadcast.status == 'running').order_by(Broadcast.id)
+        )).all()
+    for broadcast_id in broadcast_ids:
+        start_broadcast(engine, notifier, broadcast_id)
+    return list(broadcast_ids)
+
+async def stop_broadcasts():
+    """Cancels the delivery tasks; their checkpoints let the next start resume."""
+    tasks = list(running_broadcasts.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+async def run_broadcast(engine: AsyncEngine, notifier: Notifier, broadcast_id: int, batch_size: int = None):
+    """Delivers a broadcast to every active user, in user id order.
+
+    Users are read one keyset page at a time, sent through `notifier` and
+    the page is checkpointed (last user id and counters) before the next
+    one is read, so memory is bounded by a page and a restart resends at
+    most the page in flight. Users who blocked the bot are marked inactive.
+    """
+    batch_size = batch_size or config.BROADCAST_BATCH_SIZE
+    async with engine.connect() as conn:
+        broadcast = (await conn.execute(select(Broadcast).where(Broadcast.id == broadcast_id))).one()
+    cursor = broadcast.last_user_id or 0
+    logger.info(f"Broadcast {broadcast_id} running from user {cursor}")
+
+    while True:
+        async with engine.connect() as conn:
+            users = (await conn.execute(
+                select(User.id, User.telegram_id)
+                .where(User.is_active.is_(True), User.id > cursor)
+                .order_by(User.id)
+                .limit(batch_size)
+            )).all()
+        if not users:
+            break
+
+        # Sent as plain text: the admin's message is not HTML
+        deliveries = await notifier.send_many(
+            ((user.telegram_id, broadcast.text) for user in users), parse_mode=None
+        )
+        counts = Counter(deliveries)
+        cursor = users[-1].id
+
+        async with engine.begin() as conn:
+            await set_users_active(
+                conn, [user.telegram_id for user, delivery in zip(users, deliveries) if delivery is Delivery.BLOCKED], False
+            )
+            await conn.execute(
+                update(Broadcast).where(Broadcast.id == broadcast_id).values(
+                    last_user_id=cursor,
+                    sent=Broadcast.sent + counts[Delivery.SENT],
+                    failed=Broadcast.failed + counts[Delivery.FAILED],
+                    blocked=Broadcast.blocked + counts[Delivery.BLOCKED]
+                )
+            )
+
+    async with engine.begin() as conn:
+        broadcast = (await conn.execute(
+            update(Broadcast).where(Broadcast.id == broadcast_id)
+            .values(status='done', finished_at=datetime.utcnow())
+            .returning(Broadcast.sent, Broadcast.failed, Broadcast.blocked, Broadcast.admin_telegram_id)
+        )).one()
+
+    logger.info(f"Broadcast {broadcast_id} done: {broadcast.sent} sent, {broadcast.failed} failed, {broadcast.blocked} blocked")
+    await notifier.send(
+        broadcast.admin_telegram_id,
+        f"📣 Broadcast #{broadcast_id} done\n\n"
+        f"✅ Sent: {broadcast.sent}\n❌ Failed: {broadcast.failed}\n🚫 Blocked the bot: {broadcast.blocked}",
+        parse_mode=None
+    )
@@ -0,0 +1,53 @@
+from itertools import chain
+from typing import NamedTuple
+
+from aiogram.types import InlineKeyboardMarkup
+from sqlalchemy import select, event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+import config
+from database import Category
+from keyboards.builders import get_categories_keyboard
+from utils.cache import TTLCache
+
+class CategoriesPicker(NamedTuple):
+    count: int
+    markup: InlineKeyboardMarkup
+
+# (user_id, language) -> CategoriesPicker
+categories_keyboard_cache = TTLCache(maxsize=config.CATEGORIES_KEYBOARD_CACHE_SIZE)
+
+async def get_categories_picker(db: AsyncSession, user_id: int, language: str) -> CategoriesPicker:
+    """The user's category keyboard, rebuilt only after their categories change."""
+    picker = categories_keyboard_cache.get((user_id, language))
+    if picker is not None:
+        return picker
+    
+    categories = (await db.scalars(
+        select(Category).where(Category.user_id == user_id).order_by(Category.id)
+    )).all()
+    picker = CategoriesPicker(len(categories), get_categories_keyboard(categories, language))
+    categories_keyboard_cache.set((user_id, language), picker)
+    return picker
+
+def invalidate_categories(user_id: int):
+    for language in config.LANGUAGES:
+        categories_keyboard_cache.pop((user_id, language))
+
+# Cleared on commit rather than at flush: until then another session could
+# cache the old rows again, and a rollback would leave nothing to clear
+@event.listens_for(Session, 'before_flush')
+def collect_changed_categories(session, flush_context, instances):
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, Category) and obj.user_id is not None:
+            session.info.setdefault('changed_categories', set()).add(obj.user_id)
+
+@event.listens_for(Session, 'after_commit')
+def invalidate_changed_categories(session):
+    for user_id in session.info.pop('changed_categories', ()):
+        invalidate_categories(user_id)
+
+@event.listens_for(Session, 'after_rollback')
+def discard_changed_categories(session):
+    session.info.pop('changed_categories', None)
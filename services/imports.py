@@ -0,0 +1,280 @@
+import asyncio
+import codecs
+import csv
+import math
+import os
+import zipfile
+import zlib
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import select, insert, update, bindparam, case, Boolean, Integer
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import config
+from database import Category, Product
+from models.models import ProductCreate
+from services.analytics import mark_store_changed
+from services.categories import invalidate_categories
+
+# Header spellings accepted for each column, compared lowercased
+COLUMNS = {
+    'name': ('name', 'название', 'товар'),
+    'quantity': ('quantity', 'qty', 'количество'),
+    'purchase_price': ('purchase_price', 'purchase price', 'закупочная цена', 'закупка'),
+    'sale_price': ('sale_price', 'sale price', 'price', 'цена продажи', 'цена'),
+    'category': ('category', 'категория'),
+}
+REQUIRED_COLUMNS = ('name', 'quantity', 'purchase_price', 'sale_price')
+SUPPORTED_EXTENSIONS = ('.csv', '.xlsx')
+# Tried in order for CSV files; Excel in the ru locale saves Windows-1251
+CSV_ENCODINGS = ('utf-8-sig', 'cp1251')
+
+class ImportFormatError(ValueError):
+    """The file can't be imported at all (unknown format, missing columns)."""
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    updated: int = 0
+    categories_created: int = 0
+    # (row number in the file, message); capped, see `errors_count`
+    errors: List[Tuple[int, str]] = field(default_factory=list)
+    errors_count: int = 0
+
+    @property
+    def imported(self) -> int:
+        return self.created + self.updated
+
+    def add_error(self, row_number: int, message: str):
+        self.errors_count += 1
+        if len(self.errors) < config.IMPORT_MAX_REPORTED_ERRORS:
+            self.errors.append((row_number, message))
+
+def _header_map(header: List) -> Dict[str, int]:
+    aliases = {alias: column for column, names in COLUMNS.items() for alias in names}
+    positions = {}
+    for position, title in enumerate(header):
+        column = aliases.get(str(title or '').strip().lower())
+        if column and column not in positions:
+            positions[column] = position
+
+    missing = [column for column in REQUIRED_COLUMNS if column not in positions]
+    if missing:
+        raise ImportFormatError(f"missing columns: {', '.join(missing)}")
+    return positions
+
+def _records(rows: Iterator[List], first_row: int = 2) -> Iterator[Tuple[int, Dict]]:
+    """(row number, {column: value}) for every non-empty row after the header."""
+    header = next(rows, None)
+    if header is None:
+        raise ImportFormatError("the file is empty")
+    positions = _header_map(header)
+
+    for row_number, row in enumerate(rows, first_row):
+        if not any(value not in (None, '') for value in row):
+            continue
+        yield row_number, {
+            column: row[position] if position < len(row) else None
+            for column, position in positions.items()
+        }
+
+def _csv_encoding(path: str) -> str:
+    """The first of CSV_ENCODINGS that decodes the whole file. Checked
+    before the import starts, so a bad byte can't stop it halfway."""
+    for encoding in CSV_ENCODINGS:
+        decoder = codecs.getincrementaldecoder(encoding)()
+        try:
+            with open(path, 'rb') as file:
+                for block in iter(lambda: file.read(1 << 20), b''):
+                    decoder.decode(block)
+            decoder.decode(b'', final=True)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    raise ImportFormatError("the file is neither UTF-8 nor Windows-1251 text")
+
+def _read_csv(path: str, encoding: str) -> Iterator[List]:
+    with open(path, encoding=encoding, newline='') as file:
+        sample = file.read(4096)
+        file.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+        except csv.Error:
+            dialect = csv.excel
+        yield from csv.reader(file, dialect)
+
+def _open_xlsx(path: str):
+    try:
+        from openpyxl import load_workbook
+        from openpyxl.utils.exceptions import InvalidFileException
+    except ImportError:
+        raise ImportFormatError("XLSX import needs the optional `openpyxl` package")
+
+    try:
+        # Checks every member's CRC up front; read_only mode would only
+        # hit a damaged sheet halfway through the import
+        with zipfile.ZipFile(path) as archive:
+            damaged = archive.testzip()
+        if damaged:
+            raise ImportFormatError(f"the workbook is damaged ({damaged})")
+        # read_only streams rows from the sheet XML instead of loading the workbook
+        return load_workbook(path, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, zlib.error, EOFError, InvalidFileException, KeyError, OSError):
+        raise ImportFormatError("the file is not a valid XLSX workbook")
+
+def _read_xlsx(workbook) -> Iterator[List]:
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+def read_records(path: str, filename: str) -> Iterator[Tuple[int, Dict]]:
+    """Streams the rows of an uploaded CSV/XLSX file as column dicts.
+
+    Raises ImportFormatError right away for files that can't be decoded or
+    opened, before any row is read. Blocking: checking the file reads all
+    of it, so call it in a worker thread.
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.csv':
+        return _records(_read_csv(path, _csv_encoding(path)))
+    if extension == '.xlsx':
+        return _records(_read_xlsx(_open_xlsx(path)))
+    raise ImportFormatError(f"unsupported file type {extension or filename!r}")
+
+def _number(value):
+    # Spreadsheets in ru locale write decimals with a comma
+    if isinstance(value, str):
+        return value.strip().replace(' ', '').replace(',', '.')
+    return value
+
+def _error_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(map(str, item['loc'])) or 'row'}: {item['msg']}" for item in error.errors()
+    )
+
+def _validate(row_number: int, record: Dict, result: ImportResult) -> Optional[Tuple[ProductCreate, Optional[str]]]:
+    name = str(record['name'] or '').strip()
+    if not name:
+        result.add_error(row_number, "name: empty")
+        return None
+
+    try:
+        product = ProductCreate(
+            name=name[:255],
+            quantity=_number(record['quantity']),
+            purchase_price=_number(record['purchase_price']),
+            sale_price=_number(record['sale_price'])
+        )
+    except ValidationError as error:
+        result.add_error(row_number, _error_message(error))
+        return None
+
+    # Same rule as the add-product dialog, and no nan/inf
+    for column in ('purchase_price', 'sale_price'):
+        price = getattr(product, column)
+        if not (math.isfinite(price) and price >= 0):
+            result.add_error(row_number, f"{column}: must be a non-negative number")
+            return None
+
+    category = str(record.get('category') or '').strip()[:255] or None
+    return product, category
+
+async def _category_ids(db: AsyncSession, user_id: int, names: set, known: Dict[str, int], result: ImportResult) -> Dict[str, int]:
+    missing = names - known.keys()
+    if missing:
+        rows = await db.execute(
+            insert(Category).returning(Category.id, Category.name),
+            [{'name': name, 'user_id': user_id} for name in sorted(missing)]
+        )
+        known.update({name: category_id for category_id, name in rows.all()})
+        result.categories_created += len(missing)
+    return known
+
+async def _upsert_chunk(db: AsyncSession, user_id: int, chunk: Dict[str, Tuple[ProductCreate, Optional[str]]], categories: Dict[str, int], result: ImportResult):
+    await _category_ids(db, user_id, {category for _, category in chunk.values() if category}, categories, result)
+
+    existing = dict((await db.execute(
+        select(Product.name, Product.id).where(Product.user_id == user_id, Product.name.in_(list(chunk)))
+    )).all())
+
+    inserts, updates = [], []
+    for name, (product, category) in chunk.items():
+        values = {
+            'quantity': product.quantity,
+            'purchase_price': product.purchase_price,
+            'sale_price': product.sale_price,
+            'profit': product.profit,
+        }
+        if name in existing:
+            # Keep the current category unless the file names one
+            values['category_id'] = categories[category] if category else None
+            values['keep_category'] = category is None
+            updates.append(dict(values, product_id=existing[name]))
+        else:
+            inserts.append(dict(values, name=name, user_id=user_id, category_id=categories.get(category)))
+
+    # Core statements on the table skip the ORM's per-row bookkeeping
+    products = Product.__table__
+    if inserts:
+        await db.execute(insert(products), inserts)
+    if updates:
+        await db.execute(
+            update(products)
+            .where(products.c.id == bindparam('product_id'))
+            .values(
+                quantity=bindparam('quantity'),
+                purchase_price=bindparam('purchase_price'),
+                sale_price=bindparam('sale_price'),
+                profit=bindparam('profit'),
+                category_id=case(
+                    (bindparam('keep_category', type_=Boolean), products.c.category_id),
+                    else_=bindparam('category_id', type_=Integer)
+                )
+            ),
+            updates
+        )
+
+    result.created += len(inserts)
+    result.updated += len(updates)
+
+async def import_products(db: AsyncSession, user_id: int, records: Iterator[Tuple[int, Dict]], chunk_size: int = None) -> ImportResult:
+    """Upserts products by name from `records` (see read_records()).
+
+    Rows are validated with ProductCreate and written in chunks of
+    IMPORT_CHUNK_SIZE, one transaction per chunk: a lookup of the names
+    that already exist, then one executemany INSERT and one executemany
+    UPDATE. Only one chunk is held in memory. Invalid rows are skipped and
+    reported; a later row with the same name overrides an earlier one.
+    Rows are parsed in a worker thread so a large file doesn't block the
+    event loop.
+    """
+    chunk_size = chunk_size or config.IMPORT_CHUNK_SIZE
+    result = ImportResult()
+    # Descending, so duplicate category names resolve to the oldest one
+    categories = dict((await db.execute(
+        select(Category.name, Category.id).where(Category.user_id == user_id).order_by(Category.id.desc())
+    )).all())
+
+    while True:
+        batch = await asyncio.to_thread(lambda: list(islice(records, chunk_size)))
+        if not batch:
+            break
+
+        chunk = {}
+        for row_number, record in batch:
+            validated = _validate(row_number, record, result)
+            if validated:
+                chunk[validated[0].name] = validated
+
+        if chunk:
+            await _upsert_chunk(db, user_id, chunk, categories, result)
+            mark_store_changed(db, user_id)
+            await db.commit()
+
+    if result.categories_created:
+        invalidate_categories(user_id)
+    return result
@@ -0,0 +1,71 @@
+import asyncio
+import logging
+import time
+from enum import Enum
+from typing import Any, Iterable, List, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError, TelegramBadRequest, TelegramForbiddenError
+
+import config
+from middlewares.outbound import background_priority
+
+logger = logging.getLogger(__name__)
+
+# Descriptions of the 400 errors meaning the chat is gone for good
+GONE_CHAT_ERRORS = ('chat not found', 'user not found')
+
+class Delivery(Enum):
+    SENT = 'sent'
+    # The user blocked the bot, deleted the account or the chat is gone
+    BLOCKED = 'blocked'
+    FAILED = 'failed'
+
+class Notifier:
+    """Sends bot-initiated messages without exceeding `rate` per second.
+
+    Messages go out in batches of `rate` sent concurrently, one batch per
+    second, at background priority so the outbound queue serves user
+    replies first. Flood control (RetryAfter) is retried by the outbound
+    queue; a message it gives up on counts as failed. Chats that blocked the
+    bot (403) or no longer exist (400 "chat not found") are reported as
+    blocked.
+    """
+
+    def __init__(self, bot: Bot, rate: int = config.NOTIFY_RATE):
+        self.bot = bot
+        self.rate = max(1, rate)
+
+    async def send(self, chat_id: int, text: str, **kwargs: Any) -> Delivery:
+        with background_priority():
+            return await self._send(chat_id, text, **kwargs)
+
+    async def _send(self, chat_id: int, text: str, **kwargs: Any) -> Delivery:
+        try:
+            await self.bot.send_message(chat_id, text, **kwargs)
+            return Delivery.SENT
+        except TelegramForbiddenError:
+            logger.info(f"Chat {chat_id} blocked the bot")
+            return Delivery.BLOCKED
+        except TelegramBadRequest as error:
+            if any(text in error.message.lower() for text in GONE_CHAT_ERRORS):
+                logger.info(f"Chat {chat_id} no longer exists")
+                return Delivery.BLOCKED
+            logger.warning(f"Notification to {chat_id} failed: {error}")
+            return Delivery.FAILED
+        except TelegramAPIError as error:
+            logger.warning(f"Notification to {chat_id} failed: {error}")
+            return Delivery.FAILED
+
+    async def send_many(self, messages: Iterable[Tuple[int, str]], **kwargs: Any) -> List[Delivery]:
+        """Sends (chat_id, text) pairs; returns the outcome of each."""
+        messages = list(messages)
+        deliveries = []
+        for start in range(0, len(messages), self.rate):
+            started = time.monotonic()
+            deliveries += await asyncio.gather(*(
+                self.send(chat_id, text, **kwargs) for chat_id, text in messages[start:start + self.rate]
+            ))
+            if start + self.rate < len(messages):
+                await asyncio.sleep(max(0.0, 1 - (time.monotonic() - started)))
+        return deliveries
@@ -0,0 +1,130 @@
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import select, update, insert, case
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import Order, OrderItem, Product
+from services.analytics import mark_store_changed
+from services.rollup import record_sale
+
+@dataclass(frozen=True)
+class ItemFailure:
+    product_id: int
+    name: Optional[str]
+    requested: int
+    available: int
+
+@dataclass
+class OrderResult:
+    order_id: Optional[int] = None
+    order_number: Optional[str] = None
+    created_at: Optional[datetime] = None
+    total_amount: float = 0
+    total_profit: float = 0
+    items_count: int = 0
+    failures: List[ItemFailure] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return self.order_id is not None
+
+async def place_order(db: AsyncSession, user_id: int, quantities: Dict[int, int]) -> OrderResult:
+    """Sells `quantities` (product id -> units) from the store's stock and
+    commits the order, or rolls everything back and reports the items that
+    are short.
+
+    Stock is taken by one conditional UPDATE over all items, so concurrent
+    orders can never oversell: a row is only decremented if it still holds
+    enough units at write time. Order, items and the daily rollup are
+    written in the same transaction.
+    """
+    needed = case(quantities, value=Product.id)
+    sold = (await db.execute(
+        update(Product)
+        .where(
+            Product.user_id == user_id,
+            Product.id.in_(quantities),
+            Product.quantity >= needed
+        )
+        .values(quantity=Product.quantity - needed)
+        .returning(Product.id, Product.sale_price, Product.purchase_price),
+        execution_options={'synchronize_session': False}
+    )).all()
+
+    if len(sold) < len(quantities):
+        await db.rollback()
+        return OrderResult(failures=await _stock_failures(db, user_id, quantities))
+
+    created_at = datetime.utcnow()
+    order_number = str(uuid.uuid4())[:8].upper()
+    items = []
+    total_amount = total_profit = expenses = 0
+
+    for product_id, sale_price, purchase_price in sold:
+        quantity = quantities[product_id]
+        profit = (sale_price - purchase_price) * quantity
+        items.append({
+            'product_id': product_id,
+            'quantity': quantity,
+            'price': sale_price,
+            'unit_cost': purchase_price,
+            'profit': profit
+        })
+        total_amount += sale_price * quantity
+        total_profit += profit
+        expenses += purchase_price * quantity
+
+    order_id = await db.scalar(
+        insert(Order).values(
+            order_number=order_number,
+            total_amount=total_amount,
+            total_profit=total_profit,
+            user_id=user_id,
+            created_at=created_at
+        ).returning(Order.id)
+    )
+    await db.execute(insert(OrderItem), [dict(item, order_id=order_id) for item in items])
+
+    await record_sale(
+        db,
+        user_id,
+        created_at.date(),
+        items_sold=sum(quantities.values()),
+        revenue=total_amount,
+        profit=total_profit,
+        expenses=expenses
+    )
+    mark_store_changed(db, user_id)
+    await db.commit()
+
+    return OrderResult(
+        order_id=order_id,
+        order_number=order_number,
+        created_at=created_at,
+        total_amount=total_amount,
+        total_profit=total_profit,
+        items_count=len(items)
+    )
+
+async def _stock_failures(db: AsyncSession, user_id: int, quantities: Dict[int, int]) -> List[ItemFailure]:
+    available = {
+        row.id: row for row in (await db.execute(
+            select(Product.id, Product.name, Product.quantity)
+            .where(Product.user_id == user_id, Product.id.in_(quantities))
+        )).all()
+    }
+
+    failures = []
+    for product_id, requested in quantities.items():
+        row = available.get(product_id)
+        if row is None or row.quantity < requested:
+            failures.append(ItemFailure(
+                product_id=product_id,
+                name=row.name if row else None,
+                requested=requested,
+                available=row.quantity if row else 0
+            ))
+    return failures
@@ -0,0 +1,131 @@
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from typing import Optional, Tuple
+
+from sqlalchemy import select, delete, func, insert, Delete, Insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import DailySales, Order, OrderItem, get_upsert
+
+END_OF_DAY = time(23, 59, 59)
+
+@dataclass(frozen=True)
+class SalesTotals:
+    orders_count: int = 0
+    items_sold: int = 0
+    revenue: float = 0
+    profit: float = 0
+    expenses: float = 0
+    
+    def __add__(self, other: 'SalesTotals') -> 'SalesTotals':
+        return SalesTotals(
+            orders_count=self.orders_count + other.orders_count,
+            items_sold=self.items_sold + other.items_sold,
+            revenue=self.revenue + other.revenue,
+            profit=self.profit + other.profit,
+            expenses=self.expenses + other.expenses
+        )
+
+async def record_sale(db: AsyncSession, user_id: int, day: date, items_sold: int, revenue: float, profit: float, expenses: float):
+    """Adds one confirmed order to the rollup row of its day, in the caller's transaction."""
+    stmt = get_upsert(db.get_bind().dialect.name)(DailySales).values(
+        user_id=user_id,
+        day=day,
+        orders_count=1,
+        items_sold=items_sold,
+        revenue=revenue,
+        profit=profit,
+        expenses=expenses
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DailySales.user_id, DailySales.day],
+        set_={
+            'orders_count': DailySales.orders_count + stmt.excluded.orders_count,
+            'items_sold': DailySales.items_sold + stmt.excluded.items_sold,
+            'revenue': DailySales.revenue + stmt.excluded.revenue,
+            'profit': DailySales.profit + stmt.excluded.profit,
+            'expenses': DailySales.expenses + stmt.excluded.expenses
+        }
+    )
+    await db.execute(stmt)
+
+def rebuild_statements(user_id: Optional[int] = None) -> Tuple[Delete, Insert]:
+    """The DELETE and INSERT ... SELECT that recompute rollup rows from orders."""
+    items = (
+        select(
+            OrderItem.order_id.label('order_id'),
+            func.sum(OrderItem.quantity).label('items_sold'),
+            func.sum(OrderItem.quantity * OrderItem.unit_cost).label('expenses')
+        )
+        .group_by(OrderItem.order_id)
+        .subquery()
+    )
+    day = func.date(Order.created_at)
+    source = (
+        select(
+            Order.user_id,
+            day,
+            func.count(Order.id),
+            func.coalesce(func.sum(items.c.items_sold), 0),
+            func.coalesce(func.sum(Order.total_amount), 0),
+            func.coalesce(func.sum(Order.total_profit), 0),
+            func.coalesce(func.sum(items.c.expenses), 0)
+        )
+        .outerjoin(items, items.c.order_id == Order.id)
+        .group_by(Order.user_id, day)
+    )
+    
+    clear = delete(DailySales)
+    if user_id is not None:
+        source = source.where(Order.user_id == user_id)
+        clear = clear.where(DailySales.user_id == user_id)
+    
+    return clear, insert(DailySales).from_select(
+        ['user_id', 'day', 'orders_count', 'items_sold', 'revenue', 'profit', 'expenses'],
+        source
+    )
+
+async def rebuild_daily_sales(db: AsyncSession, user_id: Optional[int] = None) -> int:
+    """Recomputes rollup rows from orders. Returns the number of rows written."""
+    clear, fill = rebuild_statements(user_id)
+    await db.execute(clear)
+    result = await db.execute(fill)
+    return result.rowcount
+
+def split_whole_days(start_date: Optional[datetime], end_date: datetime) -> Tuple[Optional[date], Optional[date]]:
+    """Returns the first and last calendar day fully covered by the period.
+    
+    The first day is None when the period is open-ended. Returns (None, None)
+    when no whole day is covered.
+    """
+    if start_date is None:
+        first_day = None
+    elif start_date.time() == time.min:
+        first_day = start_date.date()
+    else:
+        first_day = start_date.date() + timedelta(days=1)
+    
+    if end_date.time() >= END_OF_DAY:
+        last_day = end_date.date()
+    else:
+        last_day = end_date.date() - timedelta(days=1)
+    
+    if first_day is not None and first_day > last_day:
+        return None, None
+    return first_day, last_day
+
+async def rollup_totals(db: AsyncSession, user_id: int, first_day: Optional[date], last_day: date) -> SalesTotals:
+    filters = [DailySales.user_id == user_id, DailySales.day <= last_day]
+    if first_day is not None:
+        filters.append(DailySales.day >= first_day)
+    
+    row = (await db.execute(
+        select(
+            func.coalesce(func.sum(DailySales.orders_count), 0),
+            func.coalesce(func.sum(DailySales.items_sold), 0),
+            func.coalesce(func.sum(DailySales.revenue), 0),
+            func.coalesce(func.sum(DailySales.profit), 0),
+            func.coalesce(func.sum(DailySales.expenses), 0)
+        ).where(*filters)
+    )).one()
+    return SalesTotals(*row)
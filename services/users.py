@@ -0,0 +1,80 @@
+from dataclasses import dataclass
+from itertools import chain
+from typing import Iterable, Optional
+
+from sqlalchemy import select, update, event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+import config
+from database import User
+from utils.cache import TTLCache
+
+@dataclass(frozen=True)
+class CachedUser:
+    id: int
+    telegram_id: int
+    language: str
+    store_name: str
+    is_active: bool
+
+user_cache = TTLCache(maxsize=config.USER_CACHE_SIZE, ttl=config.USER_CACHE_TTL)
+
+async def get_cached_user(db: AsyncSession, telegram_id: int) -> Optional[CachedUser]:
+    user = user_cache.get(telegram_id)
+    if user is not None:
+        return user
+    
+    row = (await db.execute(
+        select(User.id, User.language, User.store_name, User.is_active)
+        .where(User.telegram_id == telegram_id)
+    )).first()
+    
+    if row is None:
+        return None
+    
+    user = CachedUser(
+        id=row.id,
+        telegram_id=telegram_id,
+        language=row.language,
+        store_name=row.store_name,
+        is_active=row.is_active
+    )
+    user_cache.set(telegram_id, user)
+    return user
+
+def invalidate_user(telegram_id: int):
+    user_cache.pop(telegram_id)
+
+async def set_users_active(db, telegram_ids: Iterable[int], active: bool):
+    """Flags users who blocked (or unblocked) the bot. Runs on a session or
+    a connection; the caller commits. On a session the cached users are
+    dropped when it commits."""
+    telegram_ids = list(telegram_ids)
+    if not telegram_ids:
+        return
+    
+    await db.execute(update(User).where(User.telegram_id.in_(telegram_ids)).values(is_active=active))
+    # Core UPDATE skips the ORM events below
+    if isinstance(db, AsyncSession):
+        db.sync_session.info.setdefault('changed_users', set()).update(telegram_ids)
+    else:
+        for telegram_id in telegram_ids:
+            invalidate_user(telegram_id)
+
+# Dropped on commit rather than at flush, so no other request can cache
+# the old row again before it and a rollback keeps the cache consistent
+@event.listens_for(Session, 'before_flush')
+def collect_changed_users(session, flush_context, instances):
+    for obj in chain(session.dirty, session.deleted):
+        if isinstance(obj, User) and obj.telegram_id is not None:
+            session.info.setdefault('changed_users', set()).add(obj.telegram_id)
+
+@event.listens_for(Session, 'after_commit')
+def invalidate_changed_users(session):
+    for telegram_id in session.info.pop('changed_users', ()):
+        invalidate_user(telegram_id)
+
+@event.listens_for(Session, 'after_rollback')
+def discard_changed_users(session):
+    session.info.pop('changed_users', None)
@@ -0,0 +1,55 @@
+from typing import Optional
+
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder
+from aiogram.fsm.storage.memory import MemoryStorage
+
+import config
+from database import engine
+from .sql import SqlStorage
+
+def create_storage(url: str = config.FSM_STORAGE_URL) -> BaseStorage:
+    """Builds the FSM storage selected by FSM_STORAGE_URL.
+    
+    Empty: the bot database (fsm_records table). redis://...: Redis, needs
+    the optional `redis` package (requirements-redis.txt). memory://:
+    process memory, for local runs.
+    """
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        try:
+            from aiogram.fsm.storage.redis import RedisStorage
+        except ImportError as error:
+            raise RuntimeError(
+                "FSM_STORAGE_URL points at Redis, which needs the optional `redis` package: "
+                "pip install -r requirements-redis.txt"
+            ) from error
+        return RedisStorage.from_url(
+            url,
+            key_builder=DefaultKeyBuilder(with_destiny=True),
+            state_ttl=config.FSM_STATE_TTL,
+            data_ttl=config.FSM_STATE_TTL
+        )
+    
+    if url.startswith('memory://'):
+        return MemoryStorage()
+    
+    return SqlStorage(
+        engine,
+        state_ttl=config.FSM_STATE_TTL,
+        flush_interval=config.FSM_FLUSH_INTERVAL,
+        cache_size=config.FSM_CACHE_SIZE
+    )
+
+async def count_active_states(storage: BaseStorage) -> Optional[int]:
+    """Users currently inside an FSM state, or None if the storage can't tell
+    cheaply (Redis would need a keyspace scan)."""
+    if isinstance(storage, SqlStorage):
+        return await storage.count_states()
+    if isinstance(storage, MemoryStorage):
+        return sum(1 for record in storage.storage.values() if record.state is not None)
+    return None
+
+__all__ = [
+    'SqlStorage',
+    'count_active_states',
+    'create_storage'
+]
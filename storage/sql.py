@@ -0,0 +1,232 @@
+import asyncio
+import json
+import logging
+import time
+from contextlib import suppress
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+from sqlalchemy import select, delete, func
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from database import FsmRecord, get_upsert
+from utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+Record = Tuple[Optional[str], Dict[str, Any]]
+
+# Buffered keys looked up per query by count_states()
+COUNT_KEYS_PER_QUERY = 500
+# Failed flushes a record survives before it is dropped, and the cap on
+# the backoff between retries (seconds)
+FLUSH_MAX_ATTEMPTS = 8
+FLUSH_RETRY_MAX_DELAY = 60
+# Seconds a record read from the table is served from memory; bounds how
+# late an expired state is noticed
+CACHE_TTL = 600
+
+class SqlStorage(BaseStorage):
+    """FSM storage kept in the fsm_records table of the bot database.
+
+    Writes are coalesced: state and data changes made while handling updates
+    are buffered and written in one batch every `flush_interval` seconds
+    (0 writes through immediately). Reads see buffered writes. With a
+    flush interval the storage assumes it is the only writer and keeps up
+    to `cache_size` records in memory, so updates of users seen recently
+    (in a state or not) don't read the table. A failed
+    flush is retried with backoff; records that still fail after
+    FLUSH_MAX_ATTEMPTS flushes are logged and dropped. Records not touched
+    for `state_ttl` seconds are treated as empty and purged.
+    """
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        state_ttl: Optional[int] = None,
+        flush_interval: float = 0.5,
+        purge_interval: int = 600,
+        key_builder: Optional[KeyBuilder] = None,
+        cache_size: int = 10000
+    ):
+        self.engine = engine
+        self.state_ttl = state_ttl
+        self.flush_interval = flush_interval
+        self.purge_interval = purge_interval
+        self.key_builder = key_builder or DefaultKeyBuilder(with_destiny=True)
+        self._pending: Dict[str, Record] = {}
+        self._flushing: Dict[str, Record] = {}
+        self._cache = TTLCache(maxsize=cache_size, ttl=CACHE_TTL) if flush_interval > 0 else None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        # Failed flushes per buffered key, and in a row overall
+        self._attempts: Dict[str, int] = {}
+        self._flush_failures = 0
+        self._last_purge = time.monotonic()
+
+    def _is_expired(self, updated_at: Optional[datetime]) -> bool:
+        if self.state_ttl is None or updated_at is None:
+            return False
+        return updated_at < datetime.utcnow() - timedelta(seconds=self.state_ttl)
+
+    async def _load(self, key: str) -> Record:
+        for buffer in (self._pending, self._flushing):
+            if key in buffer:
+                return buffer[key]
+        if self._cache is not None:
+            record = self._cache.get(key)
+            if record is not None:
+                return record
+
+        async with self.engine.connect() as conn:
+            row = (await conn.execute(
+                select(FsmRecord.state, FsmRecord.data, FsmRecord.updated_at).where(FsmRecord.key == key)
+            )).first()
+
+        if row is None or self._is_expired(row.updated_at):
+            record = None, {}
+        else:
+            record = row.state, dict(row.data or {})
+        if self._cache is not None:
+            self._cache.set(key, record)
+        return record
+
+    async def _store(self, key: str, state: Optional[str], data: Dict[str, Any]):
+        self._pending[key] = (state, data)
+        self._attempts.pop(key, None)
+        if self._cache is not None:
+            self._cache.set(key, (state, data))
+
+        if self.flush_interval <= 0:
+            await self.flush()
+        elif self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later(self.flush_interval))
+
+    async def _flush_later(self, delay: float):
+        await asyncio.sleep(delay)
+        try:
+            await self.flush()
+            self._flush_failures = 0
+        except Exception:
+            self._flush_failures += 1
+            retry = min(FLUSH_RETRY_MAX_DELAY, max(self.flush_interval, 1) * 2 ** self._flush_failures)
+            if self._pending:
+                logger.exception(f"Failed to flush FSM records, retrying in {retry}s")
+                self._flush_task = asyncio.create_task(self._flush_later(retry))
+            else:
+                logger.exception("Failed to flush FSM records")
+
+    async def flush(self):
+        async with self._flush_lock:
+            if not self._pending:
+                return
+
+            self._flushing, self._pending = self._pending, {}
+            now = datetime.utcnow()
+            upserts = [
+                {'key': key, 'state': state, 'data': data, 'updated_at': now}
+                for key, (state, data) in self._flushing.items()
+                if state is not None or data
+            ]
+            deletes = [key for key, (state, data) in self._flushing.items() if state is None and not data]
+
+            try:
+                async with self.engine.begin() as conn:
+                    if deletes:
+                        await conn.execute(delete(FsmRecord).where(FsmRecord.key.in_(deletes)))
+
+                    if upserts:
+                        stmt = get_upsert(self.engine.dialect.name)(FsmRecord)
+                        stmt = stmt.on_conflict_do_update(
+                            index_elements=[FsmRecord.key],
+                            set_={
+                                'state': stmt.excluded.state,
+                                'data': stmt.excluded.data,
+                                'updated_at': stmt.excluded.updated_at
+                            }
+                        )
+                        await conn.execute(stmt, upserts)
+
+                    if self.state_ttl is not None and time.monotonic() - self._last_purge >= self.purge_interval:
+                        await conn.execute(delete(FsmRecord).where(
+                            FsmRecord.updated_at < now - timedelta(seconds=self.state_ttl)
+                        ))
+                        self._last_purge = time.monotonic()
+            except BaseException:
+                self._requeue_failed()
+                raise
+            else:
+                for key in self._flushing:
+                    self._attempts.pop(key, None)
+            finally:
+                self._flushing = {}
+
+    def _requeue_failed(self):
+        """Puts a failed batch back, unless newer writes replaced it, and
+        drops the records that failed too often."""
+        dropped = []
+        for key, record in self._flushing.items():
+            if key in self._pending:
+                continue
+            attempts = self._attempts.get(key, 0) + 1
+            if attempts >= FLUSH_MAX_ATTEMPTS:
+                self._attempts.pop(key, None)
+                if self._cache is not None:
+                    self._cache.pop(key)
+                dropped.append(key)
+            else:
+                self._attempts[key] = attempts
+                self._pending[key] = record
+        if dropped:
+            logger.error(f"Dropped {len(dropped)} FSM records after {FLUSH_MAX_ATTEMPTS} failed flushes: {dropped[:10]}")
+
+    async def count_states(self) -> int:
+        """Users currently in an FSM state, buffered writes included.
+
+        Doesn't flush, so scraping it keeps writes coalesced: buffered keys
+        are counted from the buffer and their stored rows are left out.
+        """
+        buffered = {**self._flushing, **self._pending}
+        live = FsmRecord.state.is_not(None)
+        if self.state_ttl is not None:
+            live = live & (FsmRecord.updated_at >= datetime.utcnow() - timedelta(seconds=self.state_ttl))
+        query = select(func.count()).select_from(FsmRecord)
+
+        keys = list(buffered)
+        async with self.engine.connect() as conn:
+            count = await conn.scalar(query.where(live))
+            for start in range(0, len(keys), COUNT_KEYS_PER_QUERY):
+                count -= await conn.scalar(query.where(live, FsmRecord.key.in_(keys[start:start + COUNT_KEYS_PER_QUERY])))
+        return count + sum(1 for state, _ in buffered.values() if state is not None)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        record_key = self.key_builder.build(key)
+        _, data = await self._load(record_key)
+        await self._store(record_key, state.state if isinstance(state, State) else state, data)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        state, _ = await self._load(self.key_builder.build(key))
+        return state
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        record_key = self.key_builder.build(key)
+        # Fail the handler that stores it, not a later batch write
+        try:
+            json.dumps(data)
+        except (TypeError, ValueError) as error:
+            raise TypeError(f"FSM data of {record_key} is not JSON serializable: {error}") from error
+        state, _ = await self._load(record_key)
+        await self._store(record_key, state, data.copy())
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        _, data = await self._load(self.key_builder.build(key))
+        return data.copy()
+
+    async def close(self) -> None:
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._flush_task
+        await self.flush()
@@ -0,0 +1,67 @@
+"""The Redis FSM storage built by create_storage(), against an in-memory fake
+Redis. Needs requirements-redis.txt and fakeredis."""
+import asyncio
+import os
+import sys
+
+import pytest
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("redis")
+fakeredis = pytest.importorskip("fakeredis")
+
+from aiogram.fsm.storage.base import StorageKey
+
+import config
+from storage import count_active_states, create_storage
+
+KEY = StorageKey(bot_id=1, chat_id=42, user_id=42)
+
+def redis_storage():
+    storage = create_storage("redis://localhost:6379/0")
+    storage.redis = fakeredis.FakeAsyncRedis()
+    return storage
+
+def test_state_and_data_round_trip():
+    async def run():
+        storage = redis_storage()
+        await storage.set_state(KEY, "ProductStates:adding_name")
+        await storage.set_data(KEY, {"language": "en", "quantity": 3})
+        assert await storage.get_state(KEY) == "ProductStates:adding_name"
+        assert await storage.get_data(KEY) == {"language": "en", "quantity": 3}
+
+        await storage.set_state(KEY, None)
+        await storage.set_data(KEY, {})
+        assert await storage.get_state(KEY) is None
+        assert await storage.get_data(KEY) == {}
+        await storage.close()
+    asyncio.run(run())
+
+def test_records_expire_after_state_ttl():
+    async def run():
+        storage = redis_storage()
+        await storage.set_state(KEY, "OrderStates:entering_quantities")
+        await storage.set_data(KEY, {"language": "ru"})
+        keys = await storage.redis.keys("*")
+        assert len(keys) == 2
+        for key in keys:
+            # Keys carry the destiny, as in the SQL storage
+            assert b":default:" in key
+            assert 0 < await storage.redis.ttl(key) <= config.FSM_STATE_TTL
+        await storage.close()
+    asyncio.run(run())
+
+def test_active_states_not_counted():
+    async def run():
+        storage = redis_storage()
+        assert await count_active_states(storage) is None
+        await storage.close()
+    asyncio.run(run())
+
+def test_missing_redis_package_is_named(monkeypatch):
+    # A None entry makes the import fail as if redis were not installed
+    monkeypatch.setitem(sys.modules, "aiogram.fsm.storage.redis", None)
+    with pytest.raises(RuntimeError, match="`redis` package"):
+        create_storage("redis://localhost:6379/0")
@@ -4,10 +4,12 @@ from .validators import (
     is_valid_quantity,
     parse_date
 )
+from .cache import TTLCache
 
 __all__ = [
     'is_valid_email',
     'is_valid_price',
     'is_valid_quantity',
-    'parse_date'
+    'parse_date',
+    'TTLCache'
 ]
@@ -0,0 +1,90 @@
+import asyncio
+import logging
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from sqlalchemy import text
+
+import config
+from database import engine
+from monitoring.metrics import FSM_ACTIVE_STATES, registry
+from storage import count_active_states
+
+logger = logging.getLogger(__name__)
+
+class DispatcherStatus:
+    """Whether the dispatcher is between its startup and shutdown events,
+    i.e. polling or accepting webhook updates."""
+
+    def __init__(self, dp: Dispatcher):
+        self.running = False
+        dp.startup.register(self._started)
+        dp.shutdown.register(self._stopped)
+
+    async def _started(self):
+        self.running = True
+
+    async def _stopped(self):
+        self.running = False
+
+DISPATCHER_STATUS = web.AppKey('dispatcher_status', DispatcherStatus)
+
+async def health(request: web.Request) -> web.Response:
+    return web.json_response({'status': 'ok'})
+
+async def check_database():
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+async def healthz(request: web.Request) -> web.Response:
+    """Readiness: the database answers and the dispatcher is running."""
+    checks = {}
+    try:
+        await asyncio.wait_for(check_database(), timeout=config.HEALTH_DB_TIMEOUT)
+        checks['database'] = 'ok'
+    except Exception as error:
+        logger.warning(f"Health check: database unavailable: {error!r}")
+        checks['database'] = 'unavailable'
+    checks['dispatcher'] = 'ok' if request.app[DISPATCHER_STATUS].running else 'stopped'
+
+    healthy = all(value == 'ok' for value in checks.values())
+    return web.json_response(
+        {'status': 'ok' if healthy else 'error', 'checks': checks},
+        status=200 if healthy else 503
+    )
+
+async def metrics(request: web.Request) -> web.Response:
+    await registry.collect()
+    return web.Response(
+        text=registry.render(),
+        headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+    )
+
+def create_app(dp: Dispatcher, bot: Bot, webhook_path: str = None, secret_token: str = None) -> web.Application:
+    """Builds the aiohttp app: health checks on `/` and `/healthz`, metrics
+    on `/metrics` and, if `webhook_path` is given, the Telegram webhook
+    endpoint feeding the dispatcher."""
+    app = web.Application()
+    app[DISPATCHER_STATUS] = DispatcherStatus(dp)
+    app.router.add_get('/', health)
+    app.router.add_get('/healthz', healthz)
+    app.router.add_get('/metrics', metrics)
+
+    async def collect_fsm_states():
+        count = await count_active_states(dp.fsm.storage)
+        if count is not None:
+            FSM_ACTIVE_STATES.set(count)
+    registry.add_collector(collect_fsm_states)
+
+    if webhook_path:
+        SimpleRequestHandler(dispatcher=dp, bot=bot, secret_token=secret_token or None).register(app, path=webhook_path)
+        setup_application(app, dp, bot=bot)
+
+    return app
+
+async def start_server(app: web.Application, host: str, port: int) -> web.AppRunner:
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner